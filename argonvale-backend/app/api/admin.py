@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.db.session import get_db
 from app.auth.security import get_admin_user
@@ -74,3 +74,53 @@ def get_audit_logs(
             "timestamp": l.timestamp.isoformat()
         } for l in logs
     ]
+
+
+def started_game_server():
+    """The game server, once its maps and zone workers are up"""
+    from app.websocket.router import game_server
+    if game_server.shards is None:
+        raise HTTPException(status_code=503, detail="Game server is starting")
+    return game_server
+
+
+class RebalanceZoneSchema(BaseModel):
+    zone: Optional[str] = None  # zone instance, e.g. "wilderness#1"; omit to move the hottest zone
+    worker: Optional[int] = None
+
+
+@router.get("/shards")
+def get_zone_shards(admin: User = Depends(get_admin_user)):
+    game_server = started_game_server()
+    return {"workers": game_server.shards.load()}
+
+
+@router.post("/shards/rebalance")
+async def rebalance_zone_shards(data: RebalanceZoneSchema, admin: User = Depends(get_admin_user)):
+    game_server = started_game_server()
+    shards = game_server.shards
+    if data.zone is None:
+        moved = await shards.rebalance_hottest()
+        return {"moved": moved, "workers": shards.load()}
+    if data.worker is None:
+        raise HTTPException(status_code=400, detail="worker is required when zone is given")
+    try:
+        await shards.rebalance(data.zone, data.worker)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"moved": {"zone": data.zone, "to": data.worker}, "workers": shards.load()}
+
+
+@router.get("/maps")
+def get_maps(admin: User = Depends(get_admin_user)):
+    game_server = started_game_server()
+    registry = game_server.maps
+    return {"version": registry.version, "maps": registry.versions}
+
+
+@router.post("/maps/reload")
+async def reload_maps(admin: User = Depends(get_admin_user)):
+    """Swaps in edited map files now instead of waiting for the watcher"""
+    game_server = started_game_server()
+    reloaded = await game_server.reload_maps()
+    return {"reloaded": reloaded, "version": game_server.maps.version}
@@ -6,9 +6,9 @@ from app.models.companion import Companion
 from app.auth.security import get_current_user
 from pydantic import BaseModel
 from typing import List
-import json
 from datetime import datetime
 from app.schemas.companion import CompanionResponse
+from app.core.content import get_catalog
 
 import random
 
@@ -19,11 +19,6 @@ class StarterCreate(BaseModel):
     custom_name: str
     element: str  # e.g., "Fire"
 
-
-# Load creature data
-with open("app/data/creatures.json", "r") as f:
-    CREATURES_DATA = json.load(f)
-
 @router.post("/create-starter", response_model=CompanionResponse)
 def create_starter_companion(
     starter_data: StarterCreate,
@@ -39,13 +34,8 @@ def create_starter_companion(
     if existing:
         raise HTTPException(status_code=400, detail=f"The name '{starter_data.custom_name}' is already taken by another companion in Argonvale.")
 
-    # Find creature data in starter_companions
-    starters = CREATURES_DATA.get("starter_companions", [])
-    creature = next((c for c in starters if c["name"] == starter_data.species), None)
-    
-    if not creature:
-        # Fallback to general list just in case
-        creature = next((c for c in CREATURES_DATA.get("common_creatures", []) if c["name"] == starter_data.species), None)
+    # Find creature data (starters first, common creatures as a fallback)
+    creature = get_catalog().creatures.by_name.get(starter_data.species)
         
     if not creature:
         raise HTTPException(status_code=404, detail="Creature not found")
@@ -96,8 +86,7 @@ def summon_companion(
         raise HTTPException(status_code=400, detail=f"The name '{summon_data.custom_name}' is already taken. Every companion in Argonvale must have a unique identity.")
 
     # Find creature data (could be starter or common for summons)
-    all_candidates = CREATURES_DATA.get("starter_companions", []) + CREATURES_DATA.get("common_creatures", [])
-    creature = next((c for c in all_candidates if c["name"] == summon_data.species), None)
+    creature = get_catalog().creatures.by_name.get(summon_data.species)
     
     if not creature:
         raise HTTPException(status_code=404, detail="Creature not found")
@@ -5,6 +5,7 @@ from app.models.user import User
 from app.models.item import Item
 from app.models.companion import Companion
 from app.auth.security import get_current_user
+from app.services.inventory_service import consume
 from pydantic import BaseModel
 from typing import List
 
@@ -23,7 +24,8 @@ def get_inventory(current_user: User = Depends(get_current_user)):
             "category": item.category,
             "weapon_stats": item.weapon_stats,
             "effect": item.effect,
-            "is_equipped": item.is_equipped
+            "is_equipped": item.is_equipped,
+            "quantity": item.quantity
         } for item in current_user.items
     ]
 
@@ -58,10 +60,13 @@ def use_item(item_id: int, db: Session = Depends(get_db), current_user = Depends
     # Simple heal logic: restore 50 HP to first companion
     companion = current_user.companions[0] if current_user.companions else None
     if companion:
+        # Consume one potion off the stack
+        left = consume(db, current_user.id, item.id)
+        if left is None:
+            raise HTTPException(status_code=404, detail="Potion not found")
         companion.hp = min(companion.hp + 50, 100) # Assuming 100 max for now
-        db.delete(item) # Consume potion
         db.commit()
-        return {"status": "healed", "new_hp": companion.hp}
+        return {"status": "healed", "new_hp": companion.hp, "quantity": left}
     
     raise HTTPException(status_code=400, detail="No companion to heal")
 
@@ -78,7 +83,11 @@ def feed_companion(item_id: int, companion_id: int, db: Session = Depends(get_db
     if not companion:
         raise HTTPException(status_code=404, detail="Companion not found")
     
-    effect = item.effect or {}
+    # One unit off the stack; the row goes with the last one
+    name, effect = item.name, item.effect or {}
+    left = consume(db, current_user.id, item.id)
+    if left is None:
+        raise HTTPException(status_code=404, detail="Food item not found")
     hunger_restore = effect.get("hunger", effect.get("value", 0))
     hp_restore = effect.get("heal", 0)
     
@@ -86,14 +95,14 @@ def feed_companion(item_id: int, companion_id: int, db: Session = Depends(get_db
     if hp_restore > 0:
         companion.hp = min(companion.max_hp, companion.hp + hp_restore)
     
-    db.delete(item)
     db.commit()
     
     return {
         "status": "success", 
-        "message": f"Fed {item.name} to {companion.name}!",
+        "message": f"Fed {name} to {companion.name}!",
         "new_hunger": companion.hunger,
-        "new_hp": companion.hp
+        "new_hp": companion.hp,
+        "quantity": left
     }
 
 @router.delete("/{item_id}")
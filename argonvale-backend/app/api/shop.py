@@ -1,14 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import delete, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.db.session import get_db
 from app.auth.security import get_current_user
 from app.models.user import User
-from app.models.item import Item
-from pydantic import BaseModel
+from app.models.item import Item, SHOP_LISTING
+from app.services.inventory_service import OWNED_FIELDS, consume, grant, loose
+from app.services.shop_catalog import shop_catalog
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
+# Bulk orders: lines per request, units per line
+MAX_ORDER_LINES = 50
+MAX_LINE_QUANTITY = 99
+
+class OrderLine(BaseModel):
+    item_id: int
+    quantity: int = Field(1, ge=1, le=MAX_LINE_QUANTITY)
+
+class BulkOrder(BaseModel):
+    lines: List[OrderLine] = Field(..., min_length=1, max_length=MAX_ORDER_LINES)
+
 class ShopItemResponse(BaseModel):
     id: int
     name: str
@@ -23,24 +38,36 @@ class ShopItemResponse(BaseModel):
     stock: int
 
 @router.get("/items", response_model=List[ShopItemResponse])
-def get_shop_items(db: Session = Depends(get_db)):
-    # Shop items are those with owner_id = None (System items)
-    items = db.query(Item).filter(Item.owner_id == None).all()
-    return [
-        ShopItemResponse(
-            id=i.id,
-            name=i.name,
-            item_type=i.item_type,
-            price=i.price,
-            category=i.category,
-            description=i.description,
-            image_url=i.image_url,
-            stats=i.weapon_stats,
-            effect=i.effect,
-            rarity=i.rarity,
-            stock=i.stock
-        ) for i in items if i.owner_id is None and not i.is_template and i.stock > 0
-    ]
+def get_shop_items(if_none_match: Optional[str] = Header(None)):
+    # Shop items are those with owner_id = None (System items), served from the shared snapshot
+    shop_catalog.refresh()
+    etag, body = shop_catalog.body()
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@router.get("/stock")
+def get_stock_changes(since: int):
+    """Listing changes after catalog generation `since` (the /items ETag)"""
+    shop_catalog.refresh()
+    changes = shop_catalog.changes_since(since)
+    if changes is None:
+        return Response(status_code=304, headers={"ETag": shop_catalog.etag})
+    return JSONResponse(changes, headers={"ETag": f'"{changes["generation"]}"'})
+
+def _take_stock(db: Session, item_id: int, quantity: int):
+    """Conditional stock decrement of a system listing; the listing's fields, or None when short"""
+    return db.execute(
+        update(Item)
+        .where(Item.id == item_id, SHOP_LISTING, Item.stock >= quantity)
+        .values(stock=Item.stock - quantity)
+        .returning(*(getattr(Item, field) for field in OWNED_FIELDS), Item.stock)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def _sell_price(item: Item) -> int:
+    # Sell for 50% of price
+    return max(1, item.price // 2)
 
 @router.post("/buy/{item_id}")
 def buy_item(
@@ -48,53 +75,43 @@ def buy_item(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Find the system item listing (not template) with stock
-    item_listing = db.query(Item).filter(
-        Item.id == item_id, 
-        Item.owner_id == None, 
-        Item.is_template == False,
-        Item.stock > 0
-    ).first()
-    if not item_listing:
+    # Buyers of a sold-out listing, or beyond the stock already being bought, never reach the database
+    shop_catalog.refresh()
+    if not shop_catalog.reserve(item_id):
         raise HTTPException(status_code=404, detail="Item out of stock or not found")
-    
-    if current_user.coins < item_listing.price:
-        raise HTTPException(status_code=400, detail="Insufficient coins")
-    
-    # Use a transaction to ensure atomicity
     try:
-        # We don't use db.begin() here because Depends(get_db) 
-        # already provides a session that is managed.
-        # However, we can use a nested transaction or just ensure we commit at once.
-        # For maximum safety, we'll manually manage the transaction for this critical path.
-        
-        # Deduct coins and decrease stock
-        current_user.coins -= item_listing.price
-        item_listing.stock -= 1
-        
-        # Create new item for user (copy from listing)
-        new_item = Item(
-            name=item_listing.name,
-            item_type=item_listing.item_type,
-            category=item_listing.category,
-            description=item_listing.description,
-            image_url=item_listing.image_url,
-            weapon_stats=item_listing.weapon_stats,
-            effect=item_listing.effect,
-            price=item_listing.price,
-            rarity=item_listing.rarity,
-            owner_id=current_user.id,
-            is_template=False,
-            stock=1 
-        )
-        db.add(new_item)
+        # Conditional updates: the stock and coins checks happen in the same statement as the
+        # write, so concurrent buyers can't oversell. Stock goes first, so the transaction
+        # takes SQLite's writer lock straight away and holds it for three short statements.
+        listing = _take_stock(db, item_id, 1)
+        if listing is None:
+            db.rollback()
+            shop_catalog.set_stock(item_id, 0)
+            raise HTTPException(status_code=404, detail="Item out of stock or not found")
+
+        paid = db.execute(
+            update(User)
+            .where(User.id == current_user.id, User.coins >= listing.price)
+            .values(coins=User.coins - listing.price)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not paid:
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Insufficient coins")
+
+        # Into the buyer's inventory (stackable kinds top up their stack)
+        item_ids = grant(db, current_user.id, listing._asdict())
         db.commit()
-        db.refresh(new_item)
-        
-        return {"message": f"Successfully purchased {item_listing.name}", "item_id": new_item.id}
+        shop_catalog.set_stock(item_id, listing.stock)
+
+        return {"message": f"Successfully purchased {listing.name}", "item_id": item_ids[0]}
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+    finally:
+        shop_catalog.release(item_id)
 
 @router.post("/sell/{item_id}")
 def sell_item(
@@ -112,11 +129,147 @@ def sell_item(
     if item.trade_lot_id is not None:
         raise HTTPException(status_code=400, detail="Cannot sell items currently in a trade lot")
 
-    # Sell for 50% of price
-    sell_price = max(1, item.price // 2)
+    sell_price, name = _sell_price(item), item.name
+    # One unit (the whole row for unstackable items)
+    if consume(db, current_user.id, item.id) is None:
+        raise HTTPException(status_code=400, detail="Cannot sell items currently in a trade")
     current_user.coins += sell_price
-    
-    db.delete(item)
     db.commit()
     
-    return {"status": "success", "message": f"Sold {item.name} for {sell_price} coins", "new_balance": current_user.coins}
+    return {"status": "success", "message": f"Sold {name} for {sell_price} coins", "new_balance": current_user.coins}
+
+def _line(line: OrderLine, ok: bool, detail: str, coins: int = 0, **extra) -> dict:
+    return {"item_id": line.item_id, "quantity": line.quantity, "ok": ok, "detail": detail, "coins": coins, **extra}
+
+def _order_status(results: List[dict]) -> str:
+    done = sum(r["ok"] for r in results)
+    return "success" if done == len(results) else "partial" if done else "failed"
+
+@router.post("/buy")
+def buy_items(
+    order: BulkOrder,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Buys several listings in one transaction with one balance update. Lines are settled in
+    order; a line that can't be (sold out, short of stock, over the remaining coins) is
+    reported and skipped, the others go through.
+    """
+    shop_catalog.refresh()
+    results, reserved, stock_left, short = [], [], {}, []
+    budget, spent = current_user.coins, 0
+    try:
+        for line in order.lines:
+            if not shop_catalog.reserve(line.item_id, line.quantity):
+                results.append(_line(line, False, "Item out of stock or not found"))
+                continue
+            reserved.append(line)
+            listing = _take_stock(db, line.item_id, line.quantity)
+            if listing is None:
+                # Sold out, or short of this line's quantity: the snapshot learns after the commit
+                short.append(line.item_id)
+                results.append(_line(line, False, "Item out of stock or not found"))
+                continue
+            cost = listing.price * line.quantity
+            if cost > budget - spent:
+                # Put the stock back: the line is skipped, the transaction goes on
+                db.execute(update(Item).where(Item.id == line.item_id).values(stock=Item.stock + line.quantity)
+                           .execution_options(synchronize_session=False))
+                results.append(_line(line, False, "Insufficient coins"))
+                continue
+            item_ids = grant(db, current_user.id, listing._asdict(), line.quantity)
+            spent += cost
+            stock_left[line.item_id] = listing.stock
+            results.append(_line(line, True, f"Purchased {line.quantity}x {listing.name}", cost, item_ids=item_ids))
+
+        if spent:
+            paid = db.execute(
+                update(User)
+                .where(User.id == current_user.id, User.coins >= spent)
+                .values(coins=User.coins - spent)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not paid:
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Insufficient coins")
+        db.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+    finally:
+        for line in reserved:
+            shop_catalog.release(line.item_id, line.quantity)
+
+    for item_id, stock in stock_left.items():
+        shop_catalog.set_stock(item_id, stock)
+    if short:
+        # Current stock of the listings a line couldn't take from (0 for gone ones), like buy_item
+        left = dict(db.query(Item.id, Item.stock).filter(Item.id.in_(short), SHOP_LISTING).all())
+        for item_id in short:
+            shop_catalog.set_stock(item_id, left.get(item_id, 0))
+    db.refresh(current_user)
+    return {"status": _order_status(results), "lines": results, "spent": spent, "new_balance": current_user.coins}
+
+@router.post("/sell")
+def sell_items(
+    order: BulkOrder,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Sells several owned items in one transaction with one balance update; lines that can't be sold are reported and skipped"""
+    ids = {line.item_id for line in order.lines}
+    owned = {i.id: i for i in db.query(Item).filter(Item.id.in_(ids), Item.owner_id == current_user.id)}
+    results, sold = [], {}
+    for line in order.lines:
+        item = owned.get(line.item_id)
+        held = item.quantity if item is not None else 0
+        if item is None:
+            results.append(_line(line, False, "Item not found"))
+        elif item.is_equipped:
+            results.append(_line(line, False, "Cannot sell equipped items"))
+        elif item.trade_lot_id is not None:
+            results.append(_line(line, False, "Cannot sell items currently in a trade lot"))
+        elif item.trade_offer_id is not None:
+            results.append(_line(line, False, "Cannot sell items currently in a trade"))
+        elif sold.get(item.id, 0) + line.quantity > held:
+            results.append(_line(line, False, f"Only {held - sold.get(item.id, 0)} left to sell"))
+        else:
+            sold[item.id] = sold.get(item.id, 0) + line.quantity
+            results.append(_line(line, True, "", _sell_price(item) * line.quantity))
+
+    try:
+        # Conditional on the item still being sellable (the same loose() as single sales): a
+        # concurrent sale, equip or trade wins
+        sellable = (*loose(current_user.id), Item.is_equipped == False)
+        gone = [i for i, n in sold.items() if n >= owned[i].quantity]
+        done = set()
+        if gone:
+            done.update(db.execute(delete(Item).where(Item.id.in_(gone), *sellable).returning(Item.id)
+                                   .execution_options(synchronize_session=False)).scalars())
+        for item_id, n in sold.items():
+            if item_id not in gone:
+                done.update(db.execute(update(Item).where(Item.id == item_id, Item.quantity > n, *sellable)
+                                       .values(quantity=Item.quantity - n).returning(Item.id)
+                                       .execution_options(synchronize_session=False)).scalars())
+        earned = 0
+        for result in results:
+            if not result["ok"]:
+                continue
+            if result["item_id"] in done:
+                earned += result["coins"]
+                result["detail"] = f"Sold {result['quantity']}x {owned[result['item_id']].name} for {result['coins']} coins"
+            else:
+                result.update(ok=False, detail="Item not found", coins=0)
+        if earned:
+            db.execute(update(User).where(User.id == current_user.id).values(coins=User.coins + earned)
+                       .execution_options(synchronize_session=False))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+
+    db.refresh(current_user)
+    return {"status": _order_status(results), "lines": results, "earned": earned, "new_balance": current_user.coins}
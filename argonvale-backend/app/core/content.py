@@ -0,0 +1,177 @@
+"""
+Game content catalog, loaded once per process and shared read-only.
+
+    creatures   starters and common creatures from app/data/creatures.json, as frozen
+                mappings, indexed by name and by type (element)
+    items       item templates (Item rows with is_template=True), as ItemTemplate records,
+                indexed by id, by name and by rarity within each category
+
+Content is read-only, so everything is frozen (mappings become MappingProxyType, lists
+tuples); pass thaw(value) where a mutable copy is needed (event payloads, JSON columns).
+Each section has a `version` hash of its content, for cache keys that must change when
+the content does.
+
+Creatures load on first use of get_catalog(); item templates need the database and load
+on first access of `catalog.items`. Templates can be reseeded while the server runs (the
+seed scripts are separate processes): refresh_items(db) reloads them when their version
+changed, and every restock calls it. In-process seeding can call reload_catalog().
+"""
+import hashlib
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # argonvale-backend root
+CREATURES_PATH = os.path.join(BASE_DIR, "app", "data", "creatures.json")
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Plain (mutable, JSON-serializable) copy of frozen content"""
+    if isinstance(value, (MappingProxyType, dict)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+def _digest(data: Any) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:16]
+
+
+def _index(entries, key) -> MappingProxyType:
+    groups: Dict[Any, list] = {}
+    for entry in entries:
+        groups.setdefault(key(entry), []).append(entry)
+    return MappingProxyType({k: tuple(v) for k, v in groups.items()})
+
+
+class CreatureCatalog:
+    """Starter and common creatures (frozen creatures.json entries)"""
+    __slots__ = ("starters", "common", "by_name", "starters_by_name", "by_type", "version")
+
+    def __init__(self, data: dict):
+        self.starters: Tuple[MappingProxyType, ...] = freeze(data.get("starter_companions", []))
+        self.common: Tuple[MappingProxyType, ...] = freeze(data.get("common_creatures", []))
+        self.starters_by_name = MappingProxyType({c["name"]: c for c in self.starters})
+        # A starter wins over a common creature of the same name
+        self.by_name = MappingProxyType({c["name"]: c for c in self.common + self.starters})
+        self.by_type = _index(self.starters + self.common, lambda c: c["type"])
+        self.version = _digest(data)
+
+    @classmethod
+    def load(cls, path: str = CREATURES_PATH) -> "CreatureCatalog":
+        if not os.path.exists(path):
+            return cls({})
+        with open(path) as f:
+            return cls(json.load(f))
+
+
+class ItemTemplate(NamedTuple):
+    """An item template row, detached from the session"""
+    id: int
+    name: str
+    item_type: str
+    description: str
+    image_url: str
+    category: str
+    weapon_stats: MappingProxyType
+    effect: MappingProxyType
+    price: int
+    rarity: str
+    is_consumable: bool
+
+
+class ItemCatalog:
+    """Item templates, e.g. catalog.items.by_category_rarity["weapons"]["Rare"]"""
+    __slots__ = ("templates", "by_id", "by_name", "by_name_rarity", "by_category", "by_category_rarity", "version")
+
+    def __init__(self, templates):
+        self.templates: Tuple[ItemTemplate, ...] = tuple(templates)
+        self.by_id = MappingProxyType({t.id: t for t in self.templates})
+        self.by_name = MappingProxyType({t.name: t for t in self.templates})
+        # Templates are keyed by (name, rarity): a name can come in several rarities
+        self.by_name_rarity = MappingProxyType({(t.name, t.rarity): t for t in self.templates})
+        self.by_category = _index(self.templates, lambda t: t.category)
+        self.by_category_rarity = MappingProxyType({
+            category: _index(group, lambda t: t.rarity) for category, group in self.by_category.items()
+        })
+        self.version = _digest([thaw(t._asdict()) for t in self.templates])
+
+    @classmethod
+    def load(cls, db) -> "ItemCatalog":
+        from app.models.item import Item
+        rows = db.query(Item).filter(Item.is_template == True).order_by(Item.id).all()
+        return cls(ItemTemplate(
+            id=row.id, name=row.name, item_type=row.item_type, description=row.description or "",
+            image_url=row.image_url, category=row.category, weapon_stats=freeze(row.weapon_stats or {}),
+            effect=freeze(row.effect or {}), price=row.price, rarity=row.rarity, is_consumable=bool(row.is_consumable),
+        ) for row in rows)
+
+
+class ContentCatalog:
+    def __init__(self, creatures: CreatureCatalog, items: Optional[ItemCatalog] = None):
+        self.creatures = creatures
+        self._items = items
+        self._lock = threading.Lock()
+
+    @property
+    def items(self) -> ItemCatalog:
+        if self._items is None:
+            with self._lock:
+                if self._items is None:
+                    from app.db.session import SessionLocal
+                    db = SessionLocal()
+                    try:
+                        self._items = ItemCatalog.load(db)
+                    finally:
+                        db.close()
+        return self._items
+
+    @property
+    def version(self) -> str:
+        """Hash of all content (loads the item templates)"""
+        return hashlib.sha256(f"{self.creatures.version}:{self.items.version}".encode()).hexdigest()[:16]
+
+
+_catalog: Optional[ContentCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> ContentCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ContentCatalog(CreatureCatalog.load())
+    return _catalog
+
+
+def refresh_items(db) -> ItemCatalog:
+    """The item templates in `db`: installed in the shared catalog when their version differs
+    from the loaded one (e.g. reseeded since), otherwise the loaded ones are kept"""
+    fresh = ItemCatalog.load(db)
+    catalog = get_catalog()
+    with catalog._lock:
+        if catalog._items is not None and catalog._items.version == fresh.version:
+            return catalog._items
+        catalog._items = fresh
+    return fresh
+
+
+def reload_catalog(items: Optional[ItemCatalog] = None) -> ContentCatalog:
+    """Replaces the shared catalog (e.g. after seeding item templates); holders of the old one keep it.
+    `items` installs already loaded templates (e.g. ItemCatalog.load(db) for another database)"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = ContentCatalog(CreatureCatalog.load(), items)
+    return _catalog
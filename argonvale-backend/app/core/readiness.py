@@ -0,0 +1,72 @@
+"""
+Startup readiness, reported separately from liveness.
+
+The app starts serving as soon as it is imported; the slow parts of startup (schema,
+content, maps and zone workers) run in the background as named steps. `/health/live`
+only says the process answers; `/health/ready` stays 503 until every step has finished,
+so load balancers keep traffic on the old instances during a rolling deploy, and
+websockets that arrive early wait for readiness instead of failing.
+"""
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger("argonvale")
+
+STARTUP_STEPS = ("schema", "content", "maps")
+
+
+class Readiness:
+    def __init__(self, *steps: str):
+        self.pending = set(steps)
+        self.failed: Dict[str, str] = {}
+        # step -> seconds it took
+        self.timings: Dict[str, float] = {}
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return not self.pending and not self.failed
+
+    async def run(self, step: str, fn: Callable, *args):
+        """Runs a blocking startup step in a thread (coroutine functions run on the loop)"""
+        start = time.monotonic()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                await fn(*args)
+            else:
+                await asyncio.to_thread(fn, *args)
+        except Exception as e:
+            self.failed[step] = str(e)
+            logger.error(f"Startup step {step} failed: {e}")
+        finally:
+            self.timings[step] = round(time.monotonic() - start, 3)
+            self.pending.discard(step)
+        if self.ready:
+            self.ready_at = time.monotonic()
+            self._ready.set()
+            logger.info(f"Ready after {self.ready_at - self.started_at:.2f}s ({self.timings})")
+
+    async def wait(self, timeout: float) -> bool:
+        if self.ready:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "pending": sorted(self.pending),
+            "failed": self.failed,
+            "timings": self.timings,
+            "uptime": round(time.monotonic() - self.started_at, 3),
+        }
+
+
+readiness = Readiness(*STARTUP_STEPS)
@@ -12,6 +12,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def create_schema():
+    """Creates missing tables. Run as a migration step (init_db.py), or at startup when DB_AUTO_MIGRATE=1"""
+    import app.models  # noqa: F401  (registers every table)
+    Base.metadata.create_all(bind=engine)
+
 def get_db():
     db = SessionLocal()
     try:
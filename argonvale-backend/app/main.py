@@ -1,16 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.core.logging import setup_logging
 import asyncio
-from app.db.session import SessionLocal
+import logging
+import os
+from app.db.session import SessionLocal, create_schema
 from app.services.restock_service import restock_shop
+from app.services.shop_catalog import shop_catalog
+from app.core.content import get_catalog
+from app.core.readiness import readiness
 setup_logging()
+logger = logging.getLogger("argonvale")
 
 from app.auth import router as auth_router
-from app.db.session import engine, Base
 
-# Create tables on startup (for dev simplicity)
-Base.metadata.create_all(bind=engine)
+# Schema creation is a migration step (init_db.py); dev setups can let startup do it
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") == "1"
 
 app = FastAPI(title="Argonvale Backend")
 
@@ -23,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
@@ -45,27 +52,68 @@ app.include_router(trades.router, prefix="/api/trades", tags=["trades"])
 
 @app.on_event("startup")
 async def startup_event():
-    # Run initial restock
+    # Returns at once so the server starts listening; /health/ready tracks the rest
+    asyncio.create_task(warm_up())
+
+async def warm_up():
+    from app.websocket.router import game_server
+    from app.processors.map_registry import MAP_WATCH_SECONDS
+
+    async def data():
+        await readiness.run("schema", create_schema if DB_AUTO_MIGRATE else lambda: None)
+        # Creatures and item templates (the templates need the schema)
+        await readiness.run("content", lambda: get_catalog().items)
+        # Restocks (the first one now) run in the background: serving doesn't need them
+        asyncio.create_task(background_restock())
+
+    async def maps():
+        await readiness.run("maps", game_server.start)
+        if game_server.shards is not None:
+            asyncio.create_task(game_server.decay_shard_load())
+        # Hot-reload edited maps (MAP_WATCH_SECONDS=0 leaves it to POST /api/admin/maps/reload)
+        if MAP_WATCH_SECONDS > 0 and game_server.maps is not None:
+            asyncio.create_task(game_server.watch_maps())
+
+    # Each side starts its own periodic tasks: neither waits on the other
+    await asyncio.gather(data(), maps())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop zone worker processes (ZONE_WORKERS > 0)
+    from app.websocket.router import game_server
+    if game_server.shards is not None:
+        game_server.shards.close()
+
+def run_restock():
+    """Restocks the shop; a failure is logged and the next restock tries again"""
     db = SessionLocal()
     try:
         restock_shop(db)
+        # Everyone refreshes the shop now: serve them the new snapshot
+        shop_catalog.refresh(db, force=True)
+    except Exception:
+        logger.exception("Shop restock failed")
     finally:
         db.close()
-    
-    # Start background task
-    asyncio.create_task(background_restock())
 
 async def background_restock():
     while True:
+        # Off the loop: websocket traffic keeps flowing while the database works
+        await asyncio.to_thread(run_restock)
         # Restock every 20 minutes
         await asyncio.sleep(20 * 60)
-        db = SessionLocal()
-        try:
-            restock_shop(db)
-        finally:
-            db.close()
 
 @app.get("/")
 def read_root():
     return {"message": "Argonvale Backend Online"}
 
+@app.get("/health/live")
+def liveness():
+    """The process is up and serving (restart it if this fails)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness_check():
+    """Schema, content, maps and zone workers are loaded (route traffic here only when 200)"""
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
@@ -1,7 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Boolean, DateTime
+import logging
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Boolean, DateTime, Index, and_
+from sqlalchemy import event
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
 from app.db.session import Base
 
+logger = logging.getLogger(__name__)
+
 class Item(Base):
     __tablename__ = "items"
 
@@ -14,14 +19,19 @@ class Item(Base):
     
     # Stores the JSON representation of app.schemas.items.WeaponStats
     # e.g. {"attack": {"fire": 10}, "reflection": {"fire": 0.5}}
-    weapon_stats = Column(JSON, default={})
+    weapon_stats = Column(JSON(none_as_null=True), default={})
     
     # e.g. {"type": "freeze", "chance": 0.25}
-    effect = Column(JSON, default={})
+    effect = Column(JSON(none_as_null=True), default={})
     
     price = Column(Integer, default=0)
     rarity = Column(String, default="Common") # Common, Uncommon, Rare, Ultra Rare, Relic
     stock = Column(Integer, default=1)
+    # Units held; stackable kinds (app/services/inventory_service.py) keep one row per owner and template
+    quantity = Column(Integer, nullable=False, default=1, server_default="1")
+    # The template an owned item or listing was made from. Owned copies store NULL in the
+    # TEMPLATE_FIELDS they share with it; loading fills those in from the content catalog
+    template_id = Column(Integer, ForeignKey("items.id"), nullable=True, index=True)
     is_template = Column(Boolean, default=False)
     is_equipped = Column(Boolean, default=False)
     is_consumable = Column(Boolean, default=False)
@@ -34,3 +44,41 @@ class Item(Base):
 
     trade_offer_id = Column(Integer, ForeignKey("trade_offers.id"), nullable=True)
     trade_offer = relationship("TradeOffer", back_populates="items")
+
+# System shop listings: unowned, non-template rows, one per (name, rarity)
+SHOP_LISTING = and_(Item.owner_id.is_(None), Item.is_template == False)
+SHOP_LISTING_INDEX = Index(
+    "uq_items_shop_listing", Item.name, Item.rarity, unique=True,
+    sqlite_where=SHOP_LISTING, postgresql_where=SHOP_LISTING,
+)
+
+# Columns an owned copy takes from its template unless it overrides them (NULL = the template's)
+TEMPLATE_FIELDS = ("description", "image_url", "category", "weapon_stats", "effect", "price", "rarity", "is_consumable")
+# Template ids found missing while loading, logged once each
+_missing_templates = set()
+
+
+@event.listens_for(Item, "load")
+@event.listens_for(Item, "refresh")
+def _fill_from_template(item, *args):
+    """Loads a normalized copy's shared fields from the in-memory catalog (no JSON decoding, and
+    not marked dirty, so flushes never write them back)"""
+    if item.template_id is None:
+        return
+    state = item.__dict__
+    missing = [f for f in TEMPLATE_FIELDS if f in state and state[f] is None]
+    if not missing:
+        return
+    from app.core.content import get_catalog, thaw
+    template = get_catalog().items.by_id.get(item.template_id)
+    if template is None:
+        # Removed without detaching its copies (app/services/template_service.py), or seeded
+        # after the catalog loaded: the column defaults, rather than None for prices and stats
+        if item.template_id not in _missing_templates:
+            _missing_templates.add(item.template_id)
+            logger.error(f"Item template {item.template_id} not in the catalog; item {item.id} loads with defaults")
+        for field in missing:
+            set_committed_value(item, field, thaw(Item.__table__.c[field].default.arg))
+        return
+    for field in missing:
+        set_committed_value(item, field, thaw(getattr(template, field)))
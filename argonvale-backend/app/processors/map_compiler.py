@@ -0,0 +1,188 @@
+"""
+Compiles Tiled maps (.tmj/.json) for server-side validation.
+
+A compiled map is a collision bitset (one bit per tile, row-major) plus a warp table keyed
+by tile index and the map's custom properties, written as one file:
+
+    header  (magic, width, height, meta length)
+    bitset  ceil(width * height / 8) bytes, bit set = blocked
+    meta    JSON {"warps": {tile index: [target_zone, target_x, target_y]}, "properties": {...}}
+
+Artifacts are cached on disk under MAP_CACHE_DIR, named by map id and a hash of the source
+file (plus the compiler version), so a map is only recompiled when it changes. Loading
+memory-maps the artifact read-only: every worker process on the machine shares the same
+pages for the collision grids.
+
+Infinite or very large maps are compiled into a directory of fixed-size chunks instead
+(world_chunks.ChunkedWorld), loaded lazily.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("argonvale")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))  # argonvale-backend root
+MAP_CACHE_DIR = os.getenv("MAP_CACHE_DIR", os.path.join(BASE_DIR, ".map_cache"))
+
+COMPILER_VERSION = 2
+HEADER = struct.Struct("<8sIII")
+MAGIC = b"AVMAP\x00\x00\x02"
+
+
+def _is_collision_layer(layer: dict) -> bool:
+    if layer["name"].lower() == "collision":
+        return True
+    return any(p["name"] == "collision" and p["value"] is True for p in layer.get("properties", []))
+
+
+def compile_tiled_map(tiled_data: dict) -> bytes:
+    width, height = tiled_data["width"], tiled_data["height"]
+    bits = bytearray((width * height + 7) // 8)
+
+    for layer in tiled_data.get("layers", []):
+        # 1. Collision Layer (named "collision" or with the custom property)
+        if layer["type"] == "tilelayer" and "data" in layer and _is_collision_layer(layer):
+            for idx, gid in enumerate(layer["data"][:width * height]):
+                if gid != 0:  # 0 means empty in Tiled CSV
+                    bits[idx >> 3] |= 1 << (idx & 7)
+
+    meta = json.dumps({
+        "warps": build_warps(tiled_data, width, height),
+        "properties": map_properties(tiled_data),
+    }, separators=(",", ":")).encode()
+    return HEADER.pack(MAGIC, width, height, len(meta)) + bytes(bits) + meta
+
+
+def map_properties(tiled_data: dict) -> dict:
+    """Custom properties of the map itself (zone settings such as encounter_rate)"""
+    return {p["name"]: p["value"] for p in tiled_data.get("properties", [])}
+
+
+def build_warps(tiled_data: dict, width: int, height: int) -> Dict[int, list]:
+    """Warps: every tile a "warps" object covers (at least 1x1) warps to its target; first object wins"""
+    warps: Dict[int, list] = {}
+    tw, th = tiled_data["tilewidth"], tiled_data["tileheight"]
+    for layer in tiled_data.get("layers", []):
+        if layer["type"] != "objectgroup" or layer["name"].lower() != "warps":
+            continue
+        for obj in layer.get("objects", []):
+            props = {p["name"]: p["value"] for p in obj.get("properties", [])}
+            target = [props.get("target_zone", "town"), props.get("target_x", 0), props.get("target_y", 0)]
+            x_start, y_start = int(obj["x"] // tw), int(obj["y"] // th)
+            for dx in range(max(1, int(obj["width"] // tw))):
+                for dy in range(max(1, int(obj["height"] // th))):
+                    x, y = x_start + dx, y_start + dy
+                    if 0 <= x < width and 0 <= y < height:
+                        warps.setdefault(y * width + x, target)
+    return warps
+
+
+class CompiledMap:
+    """Collision and warps of one map, backed by a compiled artifact (usually memory-mapped)"""
+    __slots__ = ("width", "height", "bits", "warps", "properties", "source_hash", "_buffer")
+
+    def __init__(self, buffer, source_hash: str = ""):
+        magic, self.width, self.height, meta_len = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled map (or an older compiler version)")
+        nbytes = (self.width * self.height + 7) // 8
+        self._buffer = buffer
+        self.bits = memoryview(buffer)[HEADER.size:HEADER.size + nbytes]
+        start = HEADER.size + nbytes
+        meta = json.loads(bytes(buffer[start:start + meta_len]))
+        self.warps: Dict[int, tuple] = {int(k): tuple(v) for k, v in meta["warps"].items()}
+        self.properties: dict = meta["properties"]
+        self.source_hash = source_hash
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        idx = y * self.width + x
+        return bool(self.bits[idx >> 3] >> (idx & 7) & 1)
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        width = self.width
+        if not (0 <= x < width and 0 <= y < self.height):
+            return False
+        idx = y * width + x
+        return not self.bits[idx >> 3] >> (idx & 7) & 1
+
+    def warp_at(self, x: int, y: int) -> Optional[Tuple[str, int, int]]:
+        """(target_zone, target_x, target_y) of the warp on this tile, if any"""
+        return self.warps.get(y * self.width + x)
+
+    def blocked_count(self) -> int:
+        return sum(bin(b).count("1") for b in self.bits)
+
+
+def source_hash(source: bytes) -> str:
+    return hashlib.sha256(b"%d:" % COMPILER_VERSION + source).hexdigest()[:16]
+
+
+def _prune(cache_dir: str, map_id: str, keep: str):
+    """Drops artifacts of older versions of a map (workers still mapping them keep their pages)"""
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if path != keep and name.endswith((".avmap", ".chunks")) and name.rsplit("-", 1)[0] == map_id:
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def load_map(path: str, cache_dir: Optional[str] = MAP_CACHE_DIR):
+    """
+    Compiled map for a Tiled file, from the on-disk cache when its source hash matches.
+    Infinite or very large maps become a ChunkedWorld (see world_chunks), others a CompiledMap.
+    """
+    from app.processors.world_chunks import ChunkedWorld, compile_world, is_chunked_map
+
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = source_hash(source)
+    map_id = os.path.splitext(os.path.basename(path))[0]
+
+    if cache_dir:
+        world_dir = os.path.join(cache_dir, f"{map_id}-{digest}.chunks")
+        if os.path.isdir(world_dir):
+            return ChunkedWorld(world_dir, digest)
+    tiled_data = None
+    if not cache_dir or not os.path.exists(os.path.join(cache_dir, f"{map_id}-{digest}.avmap")):
+        tiled_data = json.loads(source)
+        if is_chunked_map(tiled_data):
+            if not cache_dir:
+                raise ValueError(f"Chunked map {map_id} needs a map cache directory")
+            compile_world(tiled_data, world_dir)
+            logger.info(f"Compiled chunked world {map_id} -> {world_dir}")
+            _prune(cache_dir, map_id, world_dir)
+            return ChunkedWorld(world_dir, digest)
+
+    if cache_dir:
+        artifact = os.path.join(cache_dir, f"{map_id}-{digest}.avmap")
+        if not os.path.exists(artifact):
+            compiled = compile_tiled_map(tiled_data)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # Write-then-rename so concurrent workers never map a partial file
+                fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(compiled)
+                os.replace(tmp, artifact)
+                logger.info(f"Compiled map {map_id} -> {artifact}")
+                _prune(cache_dir, map_id, artifact)
+            except OSError as e:
+                logger.warning(f"Map cache not writable ({e}); keeping {map_id} in memory")
+                return CompiledMap(compiled, digest)
+        with open(artifact, "rb") as f:
+            return CompiledMap(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), digest)
+
+    return CompiledMap(compile_tiled_map(tiled_data), digest)
+
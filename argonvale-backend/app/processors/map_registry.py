@@ -0,0 +1,136 @@
+"""
+Compiled maps of a directory that can be reloaded while the server runs.
+
+The registry remembers each source file's mtime and size; reload() recompiles only the maps
+whose file changed (or appeared, or was removed), then swaps in a new maps dict in one
+assignment, so readers see either the old or the new set, never a mix. Every swap that
+changed something bumps `version`, and each changed map gets that number in `versions`.
+
+reload_async() keeps the event loop free. Changed maps are compiled into the on-disk cache
+(map_compiler) by a short-lived child process, because parsing a big map holds the GIL
+for tens of ms. A thread then loads the cached artifacts, and only the swap runs on the
+loop. Zone workers reloading the same maps afterwards just map the new artifacts.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.processors.map_compiler import MAP_CACHE_DIR, load_map
+
+logger = logging.getLogger("argonvale")
+
+MAP_EXTENSIONS = (".json", ".tmj")
+# How often the server checks the maps directory for edits (0 disables; reload via the admin API)
+MAP_WATCH_SECONDS = float(os.getenv("MAP_WATCH_SECONDS", "5"))
+
+
+def _precompile(paths: List[str], cache_dir: str):
+    """Child process: compiles maps into the cache (errors surface when the registry loads them)"""
+    for path in paths:
+        try:
+            load_map(path, cache_dir)
+        except Exception:
+            pass
+
+
+class MapRegistry:
+    def __init__(self, maps_dir: str, cache_dir: Optional[str] = MAP_CACHE_DIR):
+        self.maps_dir = maps_dir
+        self.cache_dir = cache_dir
+        # map id -> CompiledMap / ChunkedWorld; replaced as a whole on reload
+        self.maps: Dict[str, object] = {}
+        # map id -> registry version of its last (re)load
+        self.versions: Dict[str, int] = {}
+        self.version = 0
+        # map id -> (file name, mtime_ns, size) of the source it was loaded from
+        self.stamps: Dict[str, Tuple[str, int, int]] = {}
+        if not os.path.exists(maps_dir):
+            logger.warning(f"Maps directory not found: {maps_dir}")
+        self.reload()
+
+    def scan(self) -> Dict[str, Tuple[str, int, int]]:
+        """Current (file name, mtime_ns, size) of every map source in the directory"""
+        stamps = {}
+        if not os.path.exists(self.maps_dir):
+            return stamps
+        for entry in os.scandir(self.maps_dir):
+            map_id, ext = os.path.splitext(entry.name)
+            if ext in MAP_EXTENSIONS and entry.is_file():
+                st = entry.stat()
+                stamps[map_id] = (entry.name, st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def changed(self, stamps: Dict[str, tuple]) -> List[str]:
+        """Map ids whose source differs from what is loaded (including added and removed maps)"""
+        ids = {map_id for map_id, stamp in stamps.items() if self.stamps.get(map_id) != stamp}
+        ids.update(map_id for map_id in self.stamps if map_id not in stamps)
+        return sorted(ids)
+
+    def compile(self, map_ids: List[str], stamps: Dict[str, tuple]) -> Dict[str, object]:
+        """Loads the given maps (None for removed or broken ones); touches no registry state"""
+        loaded = {}
+        for map_id in map_ids:
+            if map_id not in stamps:
+                loaded[map_id] = None
+                continue
+            try:
+                loaded[map_id] = load_map(os.path.join(self.maps_dir, stamps[map_id][0]), self.cache_dir)
+            except Exception as e:
+                logger.error(f"Failed to load map {map_id}: {e}")
+                loaded[map_id] = None
+        return loaded
+
+    def precompile(self, map_ids: List[str], stamps: Dict[str, tuple]):
+        """Fills the map cache for these maps from a child process"""
+        paths = [os.path.join(self.maps_dir, stamps[map_id][0]) for map_id in map_ids if map_id in stamps]
+        if not paths or not self.cache_dir:
+            return
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            pool.submit(_precompile, paths, self.cache_dir).result()
+
+    def _compile_cached(self, map_ids: List[str], stamps: Dict[str, tuple]) -> Dict[str, object]:
+        self.precompile(map_ids, stamps)
+        return self.compile(map_ids, stamps)
+
+    def swap(self, loaded: Dict[str, object], stamps: Dict[str, tuple]) -> List[str]:
+        """Installs freshly loaded maps; a map that failed to compile keeps its previous version"""
+        maps = dict(self.maps)
+        swapped = []
+        for map_id, compiled in loaded.items():
+            if map_id in stamps:
+                self.stamps[map_id] = stamps[map_id]
+            else:
+                self.stamps.pop(map_id, None)
+            if compiled is None and map_id in stamps:
+                continue
+            if compiled is None:
+                maps.pop(map_id, None)
+            elif getattr(maps.get(map_id), "source_hash", None) == compiled.source_hash:
+                continue  # touched but unchanged
+            else:
+                maps[map_id] = compiled
+                logger.info(f"Loaded map: {map_id} ({compiled.width}x{compiled.height}, {len(compiled.warps)} warp tiles)")
+            swapped.append(map_id)
+        if swapped:
+            self.version += 1
+            for map_id in swapped:
+                self.versions[map_id] = self.version
+            self.maps = maps
+        return swapped
+
+    def reload(self, map_ids: Optional[List[str]] = None) -> List[str]:
+        """Recompiles changed maps (or just `map_ids`) and swaps them in; returns the map ids swapped"""
+        stamps = self.scan()
+        return self.swap(self.compile(map_ids if map_ids is not None else self.changed(stamps), stamps), stamps)
+
+    async def reload_async(self) -> List[str]:
+        """reload() with the compiling off the event loop"""
+        stamps = self.scan()
+        map_ids = self.changed(stamps)
+        if not map_ids:
+            return []
+        loaded = await asyncio.to_thread(self._compile_cached, map_ids, stamps)
+        return self.swap(loaded, stamps)
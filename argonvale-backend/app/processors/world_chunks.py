@@ -0,0 +1,217 @@
+"""
+Large worlds stored as fixed-size chunks.
+
+Infinite Tiled maps (chunked layers) and finite maps above CHUNKED_MIN_TILES compile into a
+directory instead of a single artifact:
+
+    meta.json           width, height, chunk size, warp table, map properties
+    c{cx}_{cy}.bits     collision bitset of one chunk (only chunks with blocked tiles)
+    c{cx}_{cy}.json     the chunk's visible tile layers, as sent to clients (only non-empty chunks)
+
+ChunkedWorld loads chunks on first use and keeps the most recently used ones in LRU caches,
+so memory follows the area players are active in, not the size of the world. It offers
+the same checks as CompiledMap (is_walkable, warp_at) plus chunk_frame for streaming
+chunks to clients.
+"""
+import json
+import os
+import shutil
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.processors.map_compiler import _is_collision_layer, build_warps, map_properties
+
+CHUNK_SIZE = 64
+# Finite maps bigger than this (tiles) are chunked too
+CHUNKED_MIN_TILES = 256 * 256
+# Chunks kept in memory per world (collision and client payloads each)
+WORLD_CHUNK_CACHE = int(os.getenv("WORLD_CHUNK_CACHE", "256"))
+
+
+def is_chunked_map(tiled_data: dict) -> bool:
+    return bool(tiled_data.get("infinite")) or tiled_data["width"] * tiled_data["height"] > CHUNKED_MIN_TILES
+
+
+def _extent(tiled_data: dict) -> Tuple[int, int]:
+    """World size in tiles; infinite maps span their chunks (negative coordinates are dropped)"""
+    if not tiled_data.get("infinite"):
+        return tiled_data["width"], tiled_data["height"]
+    width = height = 0
+    for layer in tiled_data.get("layers", []):
+        for chunk in layer.get("chunks", []):
+            width = max(width, chunk["x"] + chunk["width"])
+            height = max(height, chunk["y"] + chunk["height"])
+    return width, height
+
+
+def _layer_tiles(layer: dict, width: int, height: int) -> array:
+    """A tile layer flattened to width * height gids, from plain data or Tiled chunks"""
+    tiles = array("I", bytes(4 * width * height))
+    if "data" in layer:
+        data = layer["data"][:width * height]
+        tiles[:len(data)] = array("I", data)
+    for chunk in layer.get("chunks", []):
+        cw = chunk["width"]
+        for row in range(chunk["height"]):
+            y = chunk["y"] + row
+            if not 0 <= y < height:
+                continue
+            for col, gid in enumerate(chunk["data"][row * cw:(row + 1) * cw]):
+                x = chunk["x"] + col
+                if gid and 0 <= x < width:
+                    tiles[y * width + x] = gid
+    return tiles
+
+
+def compile_world(tiled_data: dict, out_dir: str, chunk_size: int = CHUNK_SIZE):
+    """Writes a world's chunk directory (built next to out_dir, then renamed into place)"""
+    width, height = _extent(tiled_data)
+    collision = None
+    visible: Dict[str, array] = {}
+    for layer in tiled_data.get("layers", []):
+        if layer["type"] != "tilelayer":
+            continue
+        tiles = _layer_tiles(layer, width, height)
+        if _is_collision_layer(layer):
+            if collision is None:
+                collision = tiles
+            else:
+                collision = array("I", (a or b for a, b in zip(collision, tiles)))
+        elif layer.get("visible", True):
+            visible[layer["name"]] = tiles
+
+    parent = os.path.dirname(out_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        for cy in range((height + chunk_size - 1) // chunk_size):
+            for cx in range((width + chunk_size - 1) // chunk_size):
+                bits = bytearray((chunk_size * chunk_size + 7) // 8)
+                layers = {name: [] for name in visible}
+                blocked = filled = False
+                for row in range(chunk_size):
+                    y = cy * chunk_size + row
+                    x0 = cx * chunk_size
+                    cols = max(0, min(chunk_size, width - x0)) if y < height else 0
+                    start = y * width + x0
+                    for name, tiles in visible.items():
+                        strip = list(tiles[start:start + cols]) + [0] * (chunk_size - cols)
+                        filled = filled or any(strip)
+                        layers[name].extend(strip)
+                    if collision is not None:
+                        for col in range(cols):
+                            if collision[start + col]:
+                                idx = row * chunk_size + col
+                                bits[idx >> 3] |= 1 << (idx & 7)
+                                blocked = True
+                name = f"c{cx}_{cy}"
+                if blocked:
+                    with open(os.path.join(tmp_dir, name + ".bits"), "wb") as f:
+                        f.write(bits)
+                if filled:
+                    with open(os.path.join(tmp_dir, name + ".json"), "w") as f:
+                        json.dump({"layers": layers}, f, separators=(",", ":"))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"width": width, "height": height, "chunk_size": chunk_size,
+                       "warps": build_warps(tiled_data, width, height),
+                       "properties": map_properties(tiled_data)}, f)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    try:
+        os.replace(tmp_dir, out_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Another worker compiled the same source first
+        if not os.path.isdir(out_dir):
+            raise
+
+
+class _LRU(OrderedDict):
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.capacity = capacity
+
+    def put(self, key, value):
+        self[key] = value
+        if len(self) > self.capacity:
+            self.popitem(last=False)
+        return value
+
+
+class ChunkedWorld:
+    """A chunk directory from compile_world, with chunks loaded on demand"""
+
+    def __init__(self, path: str, source_hash: str = "", cache_size: int = WORLD_CHUNK_CACHE):
+        self.path = path
+        self.source_hash = source_hash
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.width, self.height = meta["width"], meta["height"]
+        self.chunk_size = meta["chunk_size"]
+        self.empty_bits = bytes((self.chunk_size * self.chunk_size + 7) // 8)
+        self.warps: Dict[int, tuple] = {int(k): tuple(v) for k, v in meta["warps"].items()}
+        self.properties: dict = meta["properties"]
+        # (cx, cy) -> collision bitset / encoded MapChunk payload
+        self.bits = _LRU(cache_size)
+        self.frames = _LRU(cache_size)
+
+    def chunk_bits(self, cx: int, cy: int) -> bytes:
+        key = (cx, cy)
+        bits = self.bits.get(key)
+        if bits is not None:
+            self.bits.move_to_end(key)
+            return bits
+        try:
+            with open(os.path.join(self.path, f"c{cx}_{cy}.bits"), "rb") as f:
+                bits = f.read()
+        except FileNotFoundError:
+            bits = self.empty_bits
+        return self.bits.put(key, bits)
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        size = self.chunk_size
+        bits = self.chunk_bits(x // size, y // size)
+        idx = (y % size) * size + x % size
+        return bool(bits[idx >> 3] >> (idx & 7) & 1)
+
+    def is_walkable(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height and not self.is_blocked(x, y)
+
+    def warp_at(self, x: int, y: int) -> Optional[Tuple[str, int, int]]:
+        return self.warps.get(y * self.width + x)
+
+    def chunk_frame(self, zone_id: str, cx: int, cy: int) -> str:
+        """Encoded MapChunk message for clients, shared by everyone near that chunk"""
+        key = (cx, cy)
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            return frame
+        try:
+            with open(os.path.join(self.path, f"c{cx}_{cy}.json")) as f:
+                body = f.read()
+        except FileNotFoundError:
+            body = '{"layers":{}}'
+        # Spliced rather than re-encoded: the payload on disk is already JSON
+        frame = (f'{{"type":"MapChunk","zone_id":{json.dumps(zone_id)},"cx":{cx},"cy":{cy},'
+                 f'"size":{self.chunk_size},' + body[1:])
+        return self.frames.put(key, frame)
+
+    def chunks_around(self, x: int, y: int, radius: int = 1):
+        """Chunk coordinates within `radius` chunks of a tile (clipped to the world)"""
+        size = self.chunk_size
+        cx, cy = x // size, y // size
+        max_cx, max_cy = (self.width - 1) // size, (self.height - 1) // size
+        return {(i, j) for i in range(max(0, cx - radius), min(max_cx, cx + radius) + 1)
+                for j in range(max(0, cy - radius), min(max_cy, cy + radius) + 1)}
+
+    def blocked_count(self) -> int:
+        total = 0
+        for name in os.listdir(self.path):
+            if name.endswith(".bits"):
+                with open(os.path.join(self.path, name), "rb") as f:
+                    total += sum(bin(b).count("1") for b in f.read())
+        return total
@@ -0,0 +1,400 @@
+"""
+Zone-authoritative sharding of exploration.
+
+Each zone instance (e.g. "wilderness#2") is owned by exactly one zone worker. The owner
+validates moves against the map, rolls loot/encounters and warps, and is the only place
+that keeps the zone's state: the encounter RNG streams of everyone who has explored it.
+Websocket connections stay on the edge (GameServer); Move commands are routed to the
+owner through the ZoneShardMap.
+
+Workers run in-process (ZONE_WORKERS=0, the default) or as child processes
+(ZONE_WORKERS=N), reached over a pipe. A child that dies or doesn't answer within
+ZONE_CALL_TIMEOUT seconds is replaced (its zones start over) and the call is retried.
+A hot zone can be moved to a less loaded worker with ZoneShardMap.rebalance (its state is
+handed over), or by rebalance_hottest(); load is the zones' move counts, halved every
+SHARD_LOAD_DECAY_SECONDS by decay_load(), so it tracks recent traffic. A zone is dropped,
+state and all, once its last player leaves; streams of its next incarnation are seeded
+from a new epoch, so rolls never repeat. Edited maps are swapped into every worker with
+ZoneShardMap.reload_maps.
+"""
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+from typing import Dict, List, Optional
+
+from pspf.events.combat import CombatStarted
+from pspf.events.movement import PlayerMoved, TeleportPlayer
+from pspf.processors.base import derive_seed
+from app.processors.tiled_exploration import TiledExplorationProcessor
+
+logger = logging.getLogger("argonvale")
+
+ZONE_WORKERS = int(os.getenv("ZONE_WORKERS", "0"))
+ZONE_CALL_TIMEOUT = float(os.getenv("ZONE_CALL_TIMEOUT", "5"))
+SHARD_LOAD_DECAY_SECONDS = float(os.getenv("SHARD_LOAD_DECAY_SECONDS", "60"))
+
+
+class ZoneState:
+    """Everything the owner keeps for one zone instance; handed over on rebalance"""
+    __slots__ = ("epoch", "rngs")
+
+    def __init__(self, epoch: int = 0):
+        # Which incarnation of the zone this is (ZoneShardMap numbers them)
+        self.epoch = epoch
+        # player_id -> encounter RNG stream (continues across visits and owners)
+        self.rngs: Dict[int, random.Random] = {}
+
+    def __getstate__(self):
+        return self.epoch, self.rngs
+
+    def __setstate__(self, state):
+        self.epoch, self.rngs = state
+
+
+class ZoneWorkerError(RuntimeError):
+    """A zone worker process died or stopped answering"""
+
+
+class ZoneWorker:
+    """Exploration for the zones this worker owns"""
+
+    def __init__(self, seed: int, maps_dir: Optional[str] = None, registry=None):
+        # Shared seed: a player's encounter stream doesn't depend on which worker rolls it
+        self.exploration = TiledExplorationProcessor(maps_dir=maps_dir, seed=seed, registry=registry)
+        self.zones: Dict[str, ZoneState] = {}
+
+    def _step(self, state: ZoneState, base_zone: str, player_id: int, x: int, y: int) -> list:
+        if player_id not in state.rngs:
+            state.rngs[player_id] = random.Random(derive_seed(self.exploration.seed, player_id, state.epoch))
+        self.exploration.rngs = state.rngs
+        return self.exploration.process(None, PlayerMoved.create(player_id=player_id, zone_id=base_zone, x=x, y=y))
+
+    def _state(self, zone: str, epoch: int) -> ZoneState:
+        state = self.zones.get(zone)
+        if state is None:
+            state = self.zones[zone] = ZoneState(epoch)
+        return state
+
+    def move(self, zone: str, base_zone: str, player_id: int, x: int, y: int, epoch: int = 0) -> Optional[list]:
+        """Events from a validated move (loot, encounters, warps), or None if the move is illegal"""
+        if not self.exploration.is_valid_move(base_zone, x, y):
+            return None
+        return self._step(self._state(zone, epoch), base_zone, player_id, x, y)
+
+    def move_path(self, zone: str, base_zone: str, player_id: int, x: int, y: int, steps: list, epoch: int = 0) -> tuple:
+        """
+        Walks unit steps (dx, dy) from (x, y), rolling exploration on each, up to the first
+        illegal step or the first warp/encounter.
+        Returns (steps taken, x, y, events of every step taken, whether a step was illegal).
+        """
+        state = self._state(zone, epoch)
+        events = []
+        for taken, (dx, dy) in enumerate(steps):
+            if abs(dx) + abs(dy) != 1 or not self.exploration.is_valid_move(base_zone, x + dx, y + dy):
+                return taken, x, y, events, True
+            x, y = x + dx, y + dy
+            step_events = self._step(state, base_zone, player_id, x, y)
+            events.extend(step_events)
+            if any(isinstance(e, (CombatStarted, TeleportPlayer)) for e in step_events):
+                return taken + 1, x, y, events, False
+        return len(steps), x, y, events, False
+
+    def release(self, zone: str) -> Optional[ZoneState]:
+        """Gives up a zone, returning its state for the new owner"""
+        return self.zones.pop(zone, None)
+
+    def adopt(self, zone: str, state: Optional[ZoneState]):
+        if state is not None:
+            self.zones[zone] = state
+
+    def zone_ids(self) -> List[str]:
+        return list(self.zones)
+
+    def reload_maps(self, map_ids: List[str]) -> List[str]:
+        return self.exploration.reload_maps(map_ids)
+
+
+class LocalZoneWorker:
+    """A ZoneWorker in the edge process itself (it can share the edge's MapRegistry)"""
+
+    def __init__(self, seed: int, maps_dir: Optional[str] = None, registry=None):
+        self.worker = ZoneWorker(seed, maps_dir, registry)
+
+    async def call(self, op: str, *args):
+        return getattr(self.worker, op)(*args)
+
+    def close(self):
+        pass
+
+
+def _serve(conn, seed: int, maps_dir: Optional[str]):
+    """Child process loop: (request id, op, args) in, (request id, ok, result) out"""
+    worker = ZoneWorker(seed, maps_dir)
+    while True:
+        try:
+            request_id, op, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((request_id, True, getattr(worker, op)(*args)))
+        except Exception as e:
+            conn.send((request_id, False, f"{op} failed: {e}"))
+
+
+class ProcessZoneWorker:
+    """A ZoneWorker in a child process; replies are read off the pipe by the event loop"""
+
+    def __init__(self, seed: int, maps_dir: Optional[str] = None, timeout: float = ZONE_CALL_TIMEOUT):
+        self.seed, self.maps_dir, self.timeout = seed, maps_dir, timeout
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.get_context("spawn").Process(target=_serve, args=(child, seed, maps_dir), daemon=True)
+        self.process.start()
+        child.close()
+        self.request_ids = itertools.count(1)
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.failed = False
+
+    def _fail(self, reason: str):
+        """The child is gone (or hung): fails every call waiting on it"""
+        if not self.failed:
+            self.failed = True
+            logger.error(f"Zone worker process {self.process.pid} {reason}")
+        if self.loop is not None:
+            self.loop.remove_reader(self.conn.fileno())
+            self.loop = None
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ZoneWorkerError(reason))
+
+    def _on_reply(self):
+        while True:
+            try:
+                if not self.conn.poll():
+                    return
+                request_id, ok, result = self.conn.recv()
+            except (EOFError, OSError):
+                self._fail("exited")
+                return
+            future = self.pending.pop(request_id, None)
+            if future is None or future.done():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    async def call(self, op: str, *args):
+        if self.failed:
+            raise ZoneWorkerError("zone worker is down")
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            if self.loop is not None:
+                self.loop.remove_reader(self.conn.fileno())
+            loop.add_reader(self.conn.fileno(), self._on_reply)
+            self.loop = loop
+        request_id = next(self.request_ids)
+        future = self.pending[request_id] = loop.create_future()
+        try:
+            self.conn.send((request_id, op, args))
+            return await asyncio.wait_for(future, self.timeout)
+        except (BrokenPipeError, EOFError, OSError):
+            self._fail("exited")
+            raise ZoneWorkerError(f"{op}: zone worker exited")
+        except asyncio.TimeoutError:
+            self._fail(f"didn't answer {op} within {self.timeout}s")
+            raise ZoneWorkerError(f"{op}: zone worker timed out")
+        finally:
+            self.pending.pop(request_id, None)
+
+    def restart(self):
+        """A fresh worker in place of this one (an in-process one if a child can't be started)"""
+        self.close()
+        try:
+            return ProcessZoneWorker(self.seed, self.maps_dir, self.timeout)
+        except Exception as e:
+            logger.error(f"Can't start a zone worker process ({e}), running its zones in-process")
+            return LocalZoneWorker(self.seed, self.maps_dir)
+
+    def close(self):
+        if self.loop is not None:
+            self.loop.remove_reader(self.conn.fileno())
+            self.loop = None
+        self.conn.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ZoneShardMap:
+    """Which worker owns each zone instance, plus per-zone move counts for rebalancing"""
+
+    def __init__(self, workers: list):
+        self.workers = workers
+        # zone instance -> index of the owning worker
+        self.owners: Dict[str, int] = {}
+        # zone instance -> its incarnation, numbered when it gets an owner
+        self.epochs: Dict[str, int] = {}
+        self._epoch = itertools.count(1)
+        # zone instance -> recent moves (halved by decay_load)
+        self.moves: Dict[str, int] = {}
+        # zone instance -> players who moved in it and haven't left
+        self.players: Dict[str, set] = {}
+        # zone instance -> set while its state is being handed to a new owner (or dropped)
+        self.transfers: Dict[str, asyncio.Event] = {}
+
+    @classmethod
+    def create(cls, count: int = ZONE_WORKERS, seed: Optional[int] = None, maps_dir: Optional[str] = None,
+               registry=None) -> "ZoneShardMap":
+        seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+        if count <= 0:
+            return cls([LocalZoneWorker(seed, maps_dir, registry)])
+        return cls([ProcessZoneWorker(seed, maps_dir) for _ in range(count)])
+
+    def worker_load(self, index: int) -> int:
+        return sum(self.moves.get(zone, 0) for zone, owner in self.owners.items() if owner == index)
+
+    def owner(self, zone: str) -> int:
+        """Owning worker, assigning new zones to the least loaded one"""
+        index = self.owners.get(zone)
+        if index is None:
+            zone_counts = [0] * len(self.workers)
+            for owner in self.owners.values():
+                zone_counts[owner] += 1
+            index = min(range(len(self.workers)), key=lambda i: (self.worker_load(i), zone_counts[i]))
+            self.owners[zone] = index
+            self.epochs[zone] = next(self._epoch)
+        return index
+
+    def _replace(self, index: int, worker):
+        """Restarts a dead or hung worker (unless that's been done already)"""
+        if self.workers[index] is not worker:
+            return
+        self.workers[index] = worker.restart()
+        # The zones it owned start over: new incarnations, so their rolls don't repeat
+        for zone, owner in self.owners.items():
+            if owner == index:
+                self.epochs[zone] = next(self._epoch)
+        logger.warning(f"Zone worker {index} replaced")
+
+    async def _worker_call(self, index: int, op: str, *args):
+        """A call on a worker; a failed worker is replaced and the call retried once"""
+        worker = self.workers[index]
+        try:
+            return await worker.call(op, *args)
+        except ZoneWorkerError:
+            self._replace(index, worker)
+            return await self.workers[index].call(op, *args)
+
+    async def call(self, zone: str, op: str, *args):
+        for retry in (False, True):
+            transfer = self.transfers.get(zone)
+            if transfer is not None:
+                await transfer.wait()
+            index = self.owner(zone)
+            worker = self.workers[index]
+            # Moves create the zone's state on the owner: they carry the incarnation
+            epoch = (self.epochs[zone],) if op in ("move", "move_path") else ()
+            try:
+                return await worker.call(op, zone, *args, *epoch)
+            except ZoneWorkerError:
+                if retry:
+                    raise
+                self._replace(index, worker)
+
+    async def move(self, zone: str, base_zone: str, player_id: int, x: int, y: int) -> Optional[list]:
+        self.moves[zone] = self.moves.get(zone, 0) + 1
+        self.players.setdefault(zone, set()).add(player_id)
+        return await self.call(zone, "move", base_zone, player_id, x, y)
+
+    async def move_path(self, zone: str, base_zone: str, player_id: int, x: int, y: int, steps: list) -> tuple:
+        self.moves[zone] = self.moves.get(zone, 0) + len(steps)
+        self.players.setdefault(zone, set()).add(player_id)
+        return await self.call(zone, "move_path", base_zone, player_id, x, y, steps)
+
+    async def leave(self, zone: str, player_id: int):
+        """A player left the zone; the last one out drops it from its worker and the maps"""
+        players = self.players.get(zone)
+        if players is None:
+            return
+        players.discard(player_id)
+        if players or zone in self.transfers:
+            return
+        del self.players[zone]
+        index = self.owners.get(zone)
+        if index is None:
+            return
+        transfer = self.transfers[zone] = asyncio.Event()
+        try:
+            await self._worker_call(index, "release", zone)
+        except Exception as e:
+            logger.error(f"Dropping zone {zone} failed: {e}")
+        finally:
+            if zone in self.players:
+                # Players came in meanwhile: the zone goes on, as a new incarnation
+                self.epochs[zone] = next(self._epoch)
+            else:
+                self.owners.pop(zone, None)
+                self.epochs.pop(zone, None)
+                self.moves.pop(zone, None)
+            del self.transfers[zone]
+            transfer.set()
+
+    async def rebalance(self, zone: str, worker: int):
+        """Moves a zone (and its state) to another worker; moves for it wait for the handover"""
+        if not 0 <= worker < len(self.workers):
+            raise ValueError(f"No zone worker {worker}")
+        old = self.owner(zone)
+        if old == worker or zone in self.transfers:
+            return
+        transfer = self.transfers[zone] = asyncio.Event()
+        try:
+            state = await self._worker_call(old, "release", zone)
+            await self._worker_call(worker, "adopt", zone, state)
+            self.owners[zone] = worker
+            logger.info(f"Zone {zone} moved from worker {old} to worker {worker}")
+        finally:
+            del self.transfers[zone]
+            transfer.set()
+
+    async def rebalance_hottest(self) -> Optional[dict]:
+        """Moves the busiest zone of the most loaded worker to the least loaded one, if that evens them out"""
+        if len(self.workers) < 2:
+            return None
+        loads = [self.worker_load(i) for i in range(len(self.workers))]
+        busiest = max(range(len(loads)), key=loads.__getitem__)
+        idlest = min(range(len(loads)), key=loads.__getitem__)
+        zones = [z for z, owner in self.owners.items() if owner == busiest]
+        if not zones:
+            return None
+        zone = max(zones, key=lambda z: self.moves.get(z, 0))
+        if loads[idlest] + self.moves.get(zone, 0) >= loads[busiest]:
+            return None
+        await self.rebalance(zone, idlest)
+        return {"zone": zone, "from": busiest, "to": idlest}
+
+    async def reload_maps(self, map_ids: List[str]):
+        """Has every worker swap in new versions of these maps (compiled already, so served from the map cache)"""
+        await asyncio.gather(*(self._worker_call(i, "reload_maps", map_ids) for i in range(len(self.workers))))
+
+    def load(self) -> List[dict]:
+        return [{
+            "worker": i,
+            "moves": self.worker_load(i),
+            "zones": {zone: self.moves.get(zone, 0) for zone, owner in self.owners.items() if owner == i},
+        } for i in range(len(self.workers))]
+
+    def reset_load(self):
+        self.moves.clear()
+
+    def decay_load(self, factor: float = 0.5):
+        """Scales every zone's move count down (zones that reach 0 are left out of the load)"""
+        self.moves = {zone: int(n * factor) for zone, n in self.moves.items() if int(n * factor) > 0}
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
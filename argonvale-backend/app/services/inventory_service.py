@@ -0,0 +1,112 @@
+"""
+Owned items. Stackable kinds (STACKABLE_TYPES: potions, food and utility consumables) are
+one row per (owner, template) with a `quantity`, instead of one row per unit:
+
+    grant(db, owner_id, fields, quantity)   adds to the owner's stack with one UPDATE, or
+                                            inserts the stack; other kinds get a row per unit
+    consume(db, owner_id, item_id, n)       takes n units off a stack with a conditional
+                                            UPDATE; the row goes when it reaches 0
+
+Both only touch loose items (not in a trade lot or offer) and leave the commit to the
+caller. Trades move whole stacks, so an owner can end up with two stacks of a kind; grant()
+tops up the oldest.
+
+Owned copies of a catalog template only store what differs from it (TEMPLATE_FIELDS in
+app/models/item.py). Rows without one (old drops, special shop listings) keep every column
+and stack by name and rarity.
+"""
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, func, null, select, update
+from sqlalchemy.orm import Session
+
+from app.core.content import get_catalog, thaw
+from app.models.item import Item, TEMPLATE_FIELDS
+
+STACKABLE_TYPES = frozenset({"potion", "food", "utility"})
+
+# Columns an owned item copies from its template or listing
+OWNED_FIELDS = ("template_id", "name", "item_type", "description", "image_url", "category",
+                "weapon_stats", "effect", "price", "rarity", "is_consumable")
+
+
+def is_stackable(item_type: Optional[str]) -> bool:
+    return item_type in STACKABLE_TYPES
+
+
+def template_fields(template) -> dict:
+    """OWNED_FIELDS of a catalog ItemTemplate"""
+    fields = thaw(template._asdict())
+    fields["template_id"] = fields.pop("id")
+    return {k: fields[k] for k in OWNED_FIELDS}
+
+
+def dropped_item_fields(dropped: dict) -> dict:
+    """A combat drop (enemy item data), as its template when the catalog has one: by the
+    template_id it carries, else by (name, rarity)"""
+    items = get_catalog().items
+    rarity = dropped.get("rarity") or "Common"
+    template = items.by_id.get(dropped.get("template_id")) or items.by_name_rarity.get((dropped.get("name"), rarity))
+    if template is not None:
+        return template_fields(template)
+    return {"name": dropped.get("name"), "item_type": dropped.get("item_type"), "rarity": rarity,
+            "weapon_stats": dropped.get("stats") or {}, "effect": dropped.get("effect") or {}}
+
+
+def loose(owner_id: int):
+    """WHERE clauses for owner_id's items that aren't in a trade lot or offer"""
+    return (Item.owner_id == owner_id, Item.trade_lot_id.is_(None), Item.trade_offer_id.is_(None))
+
+
+def _kind(fields: dict):
+    if fields.get("template_id") is not None:
+        return Item.template_id == fields["template_id"]
+    return and_(Item.template_id.is_(None), Item.name == fields["name"], Item.rarity == (fields.get("rarity") or "Common"))
+
+
+def normalized(fields: dict) -> dict:
+    """Row values for an owned copy: TEMPLATE_FIELDS equal to the template's are stored as NULL"""
+    fields = {k: fields[k] for k in OWNED_FIELDS if k in fields}
+    template_id = fields.get("template_id")
+    template = get_catalog().items.by_id.get(template_id) if template_id is not None else None
+    if template is None:
+        fields["template_id"] = None
+        return fields
+    for field in TEMPLATE_FIELDS:
+        if field not in fields or fields[field] == thaw(getattr(template, field)):
+            # SQL NULL: a plain None would get the column default
+            fields[field] = null()
+    return fields
+
+
+def grant(db: Session, owner_id: int, fields: dict, quantity: int = 1) -> List[int]:
+    """Gives `quantity` units of an item (OWNED_FIELDS) to owner_id; the ids of the rows holding them"""
+    fields = normalized(fields)
+    if is_stackable(fields.get("item_type")):
+        stack = (select(func.min(Item.id))
+                 .where(*loose(owner_id), _kind(fields), Item.item_type == fields["item_type"])
+                 .scalar_subquery())
+        topped = db.execute(
+            update(Item).where(Item.id == stack).values(quantity=Item.quantity + quantity)
+            .returning(Item.id).execution_options(synchronize_session=False)
+        ).scalar()
+        if topped is not None:
+            return [topped]
+        rows = [Item(**fields, owner_id=owner_id, quantity=quantity, is_template=False, stock=1)]
+    else:
+        rows = [Item(**fields, owner_id=owner_id, quantity=1, is_template=False, stock=1) for _ in range(quantity)]
+    db.add_all(rows)
+    db.flush()
+    return [row.id for row in rows]
+
+
+def consume(db: Session, owner_id: int, item_id: int, n: int = 1) -> Optional[int]:
+    """Takes n units off a loose item; the units left, or None when it doesn't hold n"""
+    left = db.execute(
+        update(Item).where(Item.id == item_id, *loose(owner_id), Item.quantity >= n)
+        .values(quantity=Item.quantity - n).returning(Item.quantity)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if left == 0:
+        db.execute(delete(Item).where(Item.id == item_id, Item.quantity == 0).execution_options(synchronize_session=False))
+    return left
@@ -1,8 +1,24 @@
+"""
+Shop restock, as a handful of set-based statements in one transaction:
+
+    1. merge   duplicate system listings (same name and rarity), found with GROUP BY:
+               each group's stock is summed into its oldest row, the rest go in one DELETE
+    2. select  up to 10 templates per category from the content catalog, weighted by
+               rarity (reloaded first when the templates were reseeded)
+    3. upsert  every selected listing in one INSERT .. ON CONFLICT (name, rarity) that adds
+               to the stock of an existing listing
+
+Blocking (database I/O): call it from a thread, e.g. asyncio.to_thread(run_restock).
+"""
 import random
-from sqlalchemy.orm import Session
-from app.models.item import Item
-from datetime import datetime
 import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.item import Item, SHOP_LISTING, SHOP_LISTING_INDEX
+from app.core.content import ItemCatalog, refresh_items, thaw
 
 logger = logging.getLogger(__name__)
 
@@ -24,96 +40,121 @@ STOCK_AMOUNTS = {
     "Relic": (1, 1)
 }
 
-def restock_shop(db: Session):
+CATEGORIES = ["weapons", "armor", "food", "utility"]
+PER_CATEGORY = 10
+
+_RARITIES = list(RARITY_WEIGHTS.keys())
+_WEIGHTS = list(RARITY_WEIGHTS.values())
+
+
+def _upsert(db: Session):
+    """INSERT .. ON CONFLICT for the session's dialect (SQLite, or PostgreSQL)"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Item)
+
+
+def merge_duplicate_listings(db: Session) -> int:
+    """Sums the stock of each (name, rarity) group of system listings into its oldest row; returns rows removed"""
+    groups = db.execute(
+        select(func.min(Item.id), func.sum(Item.stock), func.count())
+        .where(SHOP_LISTING)
+        .group_by(Item.name, Item.rarity)
+        .having(func.count() > 1)
+    ).all()
+    if not groups:
+        return 0
+    db.execute(update(Item), [{"id": keep_id, "stock": total} for keep_id, total, _ in groups])
+    keepers = select(func.min(Item.id)).where(SHOP_LISTING).group_by(Item.name, Item.rarity)
+    db.execute(delete(Item).where(SHOP_LISTING, Item.id.not_in(keepers)).execution_options(synchronize_session=False))
+    return sum(count - 1 for _, _, count in groups)
+
+
+def select_templates(catalog: ItemCatalog, rng=random) -> list:
+    """Up to PER_CATEGORY unique templates per category; each pick rolls a rarity first
+    (any rarity left when the rolled one is used up)"""
+    selection = []
+    for cat in CATEGORIES:
+        pools: Dict[str, list] = {r: list(ts) for r, ts in catalog.by_category_rarity.get(cat, {}).items()}
+        left = sum(len(p) for p in pools.values())
+        for _ in range(min(PER_CATEGORY, left)):
+            pool = pools.get(rng.choices(_RARITIES, weights=_WEIGHTS, k=1)[0])
+            if not pool:
+                # Uniform over whatever is left, like picking from the whole category
+                n = rng.randrange(left)
+                for pool in pools.values():
+                    if n < len(pool):
+                        break
+                    n -= len(pool)
+                i = n
+            else:
+                i = rng.randrange(len(pool))
+            # Swap-remove: O(1) instead of list.remove
+            pool[i], pool[-1] = pool[-1], pool[i]
+            selection.append(pool.pop())
+            left -= 1
+    return selection
+
+
+def listing_rows(templates, rng=random) -> List[dict]:
+    rows = []
+    for template in templates:
+        min_s, max_s = STOCK_AMOUNTS.get(template.rarity, (1, 1))
+        rows.append({
+            "template_id": template.id,
+            "name": template.name,
+            "item_type": template.item_type,
+            "description": template.description,
+            "image_url": template.image_url,
+            "category": template.category,
+            "weapon_stats": thaw(template.weapon_stats),
+            "effect": thaw(template.effect),
+            "price": template.price,
+            "rarity": template.rarity,
+            "stock": 1 if template.rarity == "Relic" else rng.randint(min_s, max_s),
+            "is_template": False,
+            "is_consumable": template.is_consumable,
+            "owner_id": None,
+        })
+    return rows
+
+
+def restock_shop(db: Session, catalog: Optional[ItemCatalog] = None) -> Optional[dict]:
     """
-    Cleans up duplicate shop items and adds new stock additive-ly.
-    Uses unique templates per category and updates existing stock for selected items.
+    Merges duplicate shop listings and adds new stock additively, in one transaction.
+    Uses unique templates per category and adds to the stock of listings that already exist.
+    Returns {"merged", "restocked"} counts, or None when nothing was done.
     """
     try:
         logger.info("Starting shop restock...")
-        
-        # 1. Cleanup Duplicates: Merge existing system items with the same name and rarity
-        current_listings = db.query(Item).filter(Item.owner_id == None, Item.is_template == False).all()
-        unique_map = {} # (name, rarity) -> Item
-        
-        for item in current_listings:
-            key = (item.name, item.rarity)
-            if key in unique_map:
-                # Duplicate found! Merge stock and delete
-                unique_map[key].stock += item.stock
-                db.delete(item)
-            else:
-                unique_map[key] = item
-        
-        db.flush() 
-        
-        # 2. Get all templates
-        templates = db.query(Item).filter(Item.is_template == True).all()
-        if not templates:
+        # Templates seeded since the catalog loaded; listings must not point at removed ones
+        catalog = catalog or refresh_items(db)
+
+        merged = merge_duplicate_listings(db)
+        # Databases created before the index existed get it once their duplicates are merged
+        SHOP_LISTING_INDEX.create(db.connection(), checkfirst=True)
+
+        if not catalog.templates:
             logger.warning("No item templates found to restock from.")
-            return
-
-        categories = ["weapons", "armor", "food", "utility"]
-        
-        for cat in categories:
-            cat_templates = [t for t in templates if t.category == cat]
-            if not cat_templates:
-                continue
-            
-            # Select up to 10 unique items for this category
-            available_templates = cat_templates.copy()
-            category_selection = []
-            
-            for _ in range(min(10, len(cat_templates))):
-                if not available_templates:
-                    break
-                    
-                rarity = random.choices(
-                    list(RARITY_WEIGHTS.keys()), 
-                    weights=list(RARITY_WEIGHTS.values()), 
-                    k=1
-                )[0]
-                
-                eligible = [t for t in available_templates if t.rarity == rarity]
-                if not eligible:
-                    eligible = available_templates
-                
-                template = random.choice(eligible)
-                category_selection.append(template)
-                available_templates.remove(template) 
-                
-            for template in category_selection:
-                existing = unique_map.get((template.name, template.rarity))
-                
-                min_s, max_s = STOCK_AMOUNTS.get(template.rarity, (1, 1))
-                new_stock = random.randint(min_s, max_s)
-                
-                if template.rarity == "Relic":
-                    new_stock = 1
-
-                if existing:
-                    existing.stock += new_stock
-                else:
-                    new_listing = Item(
-                        name=template.name,
-                        item_type=template.item_type,
-                        description=template.description,
-                        image_url=template.image_url,
-                        category=template.category,
-                        weapon_stats=template.weapon_stats,
-                        effect=template.effect,
-                        price=template.price,
-                        rarity=template.rarity,
-                        stock=new_stock,
-                        is_template=False,
-                        owner_id=None
-                    )
-                    db.add(new_listing)
-                    unique_map[(template.name, template.rarity)] = new_listing
+            db.commit()
+            return None
+
+        rows = listing_rows(select_templates(catalog))
+        if rows:
+            stmt = _upsert(db).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[Item.name, Item.rarity],
+                index_where=SHOP_LISTING,
+                set_={"stock": Item.stock + stmt.excluded.stock, "template_id": stmt.excluded.template_id},
+            ))
 
         db.commit()
-        logger.info("Shop restocking complete.")
-        
+        logger.info(f"Shop restocking complete ({len(rows)} listings, {merged} duplicates merged).")
+        return {"merged": merged, "restocked": len(rows)}
+
     except Exception as e:
         logger.error(f"Restocking error: {e}")
         db.rollback()
+        return None
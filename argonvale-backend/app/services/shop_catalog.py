@@ -0,0 +1,199 @@
+"""
+In-memory snapshot of the shop's listings, shared by every request.
+
+GET /api/shop/items serves the snapshot as a pre-encoded JSON body, with its generation
+number as ETag (304 when the client already has that generation). The snapshot is rebuilt
+from the database after every restock, and at most every SHOP_SNAPSHOT_TTL seconds in case
+another process (trigger_restock.py, seed scripts) changed the listings. Purchases update
+it in place. A rebuild that finds nothing changed keeps the generation.
+
+Every change bumps the generation and is kept in a short log, so a client that already has
+the catalog catches up with GET /api/shop/stock?since=<generation>:
+
+    {"generation": 12, "stock": [[id, stock], ...], "listings": [new or changed listings]}
+
+A stock of 0 means the listing is gone. Clients too far behind get {"generation", "reset": true}
+and refetch /items.
+
+The snapshot's stock also gates purchases: reserve() admits at most `stock` buyers of a
+listing at a time and turns away buyers of a listing known to be sold out, so a rush on
+a one-stock Relic sends one buyer to the database, not hundreds.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from app.models.item import Item, SHOP_LISTING
+
+SHOP_SNAPSHOT_TTL = float(os.getenv("SHOP_SNAPSHOT_TTL", "60"))
+# Generations kept for the stock feed (a restock is one generation, a purchase another)
+STOCK_LOG_SIZE = 512
+
+
+def listing_fields(item: Item) -> dict:
+    """ShopItemResponse fields of a listing row"""
+    return {
+        "id": item.id,
+        "name": item.name,
+        "item_type": item.item_type,
+        "price": item.price,
+        "category": item.category,
+        "description": item.description or "",
+        "image_url": item.image_url,
+        "stats": item.weapon_stats or {},
+        "effect": item.effect or {},
+        "rarity": item.rarity,
+        "stock": item.stock,
+    }
+
+
+class ShopCatalog:
+    def __init__(self, session_factory=None, ttl: float = SHOP_SNAPSHOT_TTL):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        # Starts from the clock, so ETags from before a restart don't match
+        self.generation = int(time.time() * 1000)
+        # id -> listing (ShopItemResponse fields), in stock only
+        self.listings: Dict[int, dict] = {}
+        self.loaded_at: Optional[float] = None
+        # (generation, [(id, stock, listing or None)]); a listing is sent when it is new or changed
+        self._log: deque = deque(maxlen=STOCK_LOG_SIZE)
+        # Oldest generation the log can bring a client forward from
+        self._floor = self.generation
+        self._body: Tuple[int, bytes] = (-1, b"")
+        # Purchase admission: buyers in flight per listing, and listings known to be sold out
+        self._reserved: Dict[int, int] = {}
+        self._sold_out: set = set()
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.generation}"'
+
+    def _stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl
+
+    def refresh(self, db=None, force: bool = False):
+        """Rebuilds the snapshot from the database when stale (or forced)"""
+        if not force and not self._stale():
+            return
+        with self._lock:
+            # Concurrent requests that found it stale wait for one rebuild
+            if not force and not self._stale():
+                return
+            own = db is None
+            if own:
+                from app.db.session import SessionLocal
+                db = (self.session_factory or SessionLocal)()
+            try:
+                rows = db.query(Item).filter(SHOP_LISTING, Item.stock > 0).order_by(Item.id).all()
+                fresh = {row.id: listing_fields(row) for row in rows}
+            finally:
+                if own:
+                    db.close()
+            first = self.loaded_at is None
+            self.loaded_at = time.monotonic()
+            self._sold_out = (self._sold_out | (self.listings.keys() - fresh.keys())) - fresh.keys()
+            if first:
+                self.listings = fresh
+                return
+            changes = [(i, 0, None) for i in self.listings if i not in fresh]
+            for i, listing in fresh.items():
+                old = self.listings.get(i)
+                if old == listing:
+                    continue
+                if old is not None and {**old, "stock": listing["stock"]} == listing:
+                    changes.append((i, listing["stock"], None))
+                else:
+                    changes.append((i, listing["stock"], listing))
+            self.listings = fresh
+            self._commit(changes)
+
+    def set_stock(self, listing_id: int, stock: int):
+        """A purchase changed a listing's stock (after the commit)"""
+        with self._lock:
+            listing = self.listings.get(listing_id)
+            if listing is None:
+                if stock <= 0:
+                    self._sold_out.add(listing_id)
+                return
+            if listing["stock"] == stock:
+                return
+            if stock > 0:
+                self.listings[listing_id] = {**listing, "stock": stock}
+            else:
+                del self.listings[listing_id]
+                self._sold_out.add(listing_id)
+            self._commit([(listing_id, max(stock, 0), None)])
+
+    def reserve(self, listing_id: int, quantity: int = 1) -> bool:
+        """Admits a buyer unless the listing is sold out or its stock is already being bought.
+        Listings the snapshot doesn't know yet are admitted (the database decides).
+        Pair every admitted reserve() with release()."""
+        with self._lock:
+            if listing_id in self._sold_out:
+                return False
+            reserved = self._reserved.get(listing_id, 0)
+            listing = self.listings.get(listing_id)
+            if listing is not None and reserved + quantity > listing["stock"]:
+                return False
+            self._reserved[listing_id] = reserved + quantity
+            return True
+
+    def release(self, listing_id: int, quantity: int = 1):
+        with self._lock:
+            reserved = self._reserved.get(listing_id, 0) - quantity
+            if reserved > 0:
+                self._reserved[listing_id] = reserved
+            else:
+                self._reserved.pop(listing_id, None)
+
+    def _commit(self, changes: list):
+        if not changes:
+            return
+        if len(self._log) == self._log.maxlen:
+            self._floor = self._log[0][0]
+        self.generation += 1
+        self._log.append((self.generation, changes))
+
+    def body(self) -> Tuple[str, bytes]:
+        """(ETag, encoded listings); encoded once per generation"""
+        with self._lock:
+            generation, body = self._body
+            if generation != self.generation:
+                body = json.dumps(list(self.listings.values()), separators=(",", ":")).encode()
+                self._body = (self.generation, body)
+            return self.etag, body
+
+    def changes_since(self, since: int) -> Optional[dict]:
+        """Stock changes after generation `since`; None when there are none"""
+        with self._lock:
+            if since == self.generation:
+                return None
+            if since < self._floor or since > self.generation:
+                return {"generation": self.generation, "reset": True}
+            stock: Dict[int, int] = {}
+            listings: Dict[int, dict] = {}
+            for generation, changes in self._log:
+                if generation <= since:
+                    continue
+                for i, n, listing in changes:
+                    if listing is not None:
+                        listings[i] = listing
+                        stock.pop(i, None)
+                    elif i in listings and n > 0:
+                        listings[i] = {**listings[i], "stock": n}
+                    else:
+                        listings.pop(i, None)
+                        stock[i] = n
+            return {
+                "generation": self.generation,
+                "stock": [[i, n] for i, n in stock.items()],
+                "listings": list(listings.values()),
+            }
+
+
+shop_catalog = ShopCatalog()
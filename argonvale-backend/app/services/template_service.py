@@ -0,0 +1,82 @@
+"""
+Item templates (Item rows with is_template=True), as the seed scripts write them.
+
+Templates are keyed by (name, rarity). seed_templates() updates a key's template in place, so
+its id, which owned copies and shop listings point at with template_id, survives a reseed.
+Owned copies only store what differs from their template (TEMPLATE_FIELDS in app/models/item.py),
+so before a template changes or goes away its copies are detached: the template's values are
+written into their NULL columns and template_id is cleared, and they keep what they were.
+
+A running server picks up reseeded templates at its next restock (refresh_items()).
+"""
+from typing import Iterable, List
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models.item import Item, TEMPLATE_FIELDS
+
+
+def _default(field: str):
+    default = Item.__table__.c[field].default
+    return default.arg if default is not None else None
+
+
+def detach_copies(db: Session, template_ids: Iterable[int]) -> int:
+    """Writes the templates' values into the NULL TEMPLATE_FIELDS of rows made from them and
+    clears their template_id; returns the rows updated"""
+    template_ids = list(template_ids)
+    if not template_ids:
+        return 0
+    template = aliased(Item)
+
+    def of_template(field):
+        return select(getattr(template, field)).where(template.id == Item.template_id).scalar_subquery()
+
+    values = {field: func.coalesce(getattr(Item, field), of_template(field)) for field in TEMPLATE_FIELDS}
+    return db.execute(
+        update(Item).where(Item.template_id.in_(template_ids))
+        .values(**values, template_id=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def seed_templates(db: Session, rows: List[dict], prune: bool = True) -> dict:
+    """
+    Upserts template rows (Item columns; name and item_type required) by (name, rarity); the first
+    row of a key wins and later ones are skipped. With `prune`, templates not in `rows` are removed.
+    Leaves the commit to the caller. Returns {"added", "updated", "removed", "skipped"} counts.
+    """
+    templates = db.query(Item).filter(Item.is_template == True).order_by(Item.id).all()
+    existing = {}
+    for template in templates:
+        # Legacy duplicates of a key: the oldest is kept, the rest are pruned
+        existing.setdefault((template.name, template.rarity), template)
+
+    seen, new, updates, skipped = set(), [], [], 0
+    for row in rows:
+        values = {**{field: _default(field) for field in TEMPLATE_FIELDS}, **row}
+        key = (values["name"], values["rarity"])
+        if key in seen:
+            skipped += 1
+            continue
+        seen.add(key)
+        template = existing.get(key)
+        if template is None:
+            new.append(values)
+        elif any(getattr(template, k) != v for k, v in values.items()):
+            updates.append((template, values))
+
+    kept = {existing[key].id for key in seen if key in existing}
+    stale = [t.id for t in templates if t.id not in kept] if prune else []
+    # Before the templates change: the detach reads their current values
+    detach_copies(db, [t.id for t, _ in updates] + stale)
+
+    for template, values in updates:
+        for k, v in values.items():
+            setattr(template, k, v)
+    if stale:
+        db.execute(delete(Item).where(Item.id.in_(stale)).execution_options(synchronize_session=False))
+    db.add_all([Item(**values, is_template=True, stock=0, owner_id=None) for values in new])
+    db.flush()
+    return {"added": len(new), "updated": len(updates), "removed": len(stale), "skipped": skipped}
@@ -0,0 +1,91 @@
+"""
+Delta-encoded combat state for the websocket edge.
+
+Every TurnProcessed carries the battle's full state (turn, both HPs, four status turns and
+the used item ids). For clients that opt in (?state=delta) each turn is sent as a
+TurnDelta frame instead: the turn's own fields plus only the state fields that changed
+since the last version the client acknowledged (CombatAck). State is always from the
+recipient's side, so a PvP defender needs no swapped copy of the attacker's message.
+
+CombatStarted (including the resume snapshot from CombatSession.to_start_event) is sent
+in full and resets the baseline to its context.
+"""
+from typing import Optional
+
+STATE_FIELDS = ("turn_number", "attacker_hp", "defender_hp",
+                "player_frozen_until", "enemy_frozen_until",
+                "player_stealth_until", "enemy_stealth_until", "used_item_ids")
+# The defender's view of the state: fields swap with their counterpart
+SWAPPED = {"attacker_hp": "defender_hp", "defender_hp": "attacker_hp",
+           "player_frozen_until": "enemy_frozen_until", "enemy_frozen_until": "player_frozen_until",
+           "player_stealth_until": "enemy_stealth_until", "enemy_stealth_until": "player_stealth_until"}
+# Per-turn fields that always go out with a delta
+TURN_FIELDS = ("actor_id", "damage_dealt", "log", "description")
+# Sent-but-unacknowledged versions kept per combat; older ones are dropped (acks for them are ignored)
+MAX_UNACKED = 32
+
+
+def start_state(msg: dict) -> tuple:
+    """(version, state) baseline from a CombatStarted message"""
+    ctx = msg.get("context") or {}
+    state = {
+        "turn_number": ctx.get("turn_number", 1),
+        "attacker_hp": ctx.get("player_hp", 100),
+        "defender_hp": ctx.get("enemy_hp", 50),
+        "player_frozen_until": ctx.get("player_frozen_until", 0),
+        "enemy_frozen_until": ctx.get("enemy_frozen_until", 0),
+        "player_stealth_until": ctx.get("player_stealth_until", 0),
+        "enemy_stealth_until": ctx.get("enemy_stealth_until", 0),
+        "used_item_ids": ctx.get("used_item_ids", []),
+    }
+    return ctx.get("state_version", 0), state
+
+
+def turn_state(msg: dict, swap: bool) -> dict:
+    """State fields of a TurnProcessed message, from the attacker's (or with swap, the defender's) side"""
+    if swap:
+        return {field: msg[SWAPPED.get(field, field)] for field in STATE_FIELDS}
+    return {field: msg[field] for field in STATE_FIELDS}
+
+
+class CombatDeltaEncoder:
+    """Per-connection delta state: for each combat, the acknowledged version and what was sent since"""
+
+    def __init__(self):
+        self.combats = {}  # combat_id -> [acked_version, acked_state, {version: sent_state}]
+
+    def start(self, msg: dict):
+        version, state = start_state(msg)
+        self.combats[msg["combat_id"]] = [version, state, {}]
+
+    def encode(self, msg: dict, swap: bool = False) -> Optional[dict]:
+        """TurnDelta frame for a TurnProcessed message, or None if the combat has no baseline here"""
+        entry = self.combats.get(msg["combat_id"])
+        if entry is None:
+            return None
+        acked_version, acked_state, sent = entry
+        version = msg["state_version"]
+        state = turn_state(msg, swap)
+        frame = {"type": "TurnDelta", "combat_id": msg["combat_id"], "v": version, "base": acked_version}
+        for field in TURN_FIELDS:
+            if field in msg:
+                frame[field] = msg[field]
+        for field, value in state.items():
+            if acked_state[field] != value:
+                frame[field] = value
+
+        sent[version] = state
+        if len(sent) > MAX_UNACKED:
+            del sent[min(sent)]
+        return frame
+
+    def ack(self, combat_id: str, version: int):
+        """The client applied frame `version`: later deltas are relative to it"""
+        entry = self.combats.get(combat_id)
+        if entry is None or version not in entry[2]:
+            return
+        entry[0], entry[1] = version, entry[2][version]
+        entry[2] = {v: s for v, s in entry[2].items() if v > version}
+
+    def end(self, combat_id: str):
+        self.combats.pop(combat_id, None)
@@ -0,0 +1,72 @@
+"""
+Zone instances (channels): town#1, town#2, ...
+
+Subscriptions, presence and broadcasts are keyed by instance, so fan-out per move is
+bounded by the instance population, not the zone's. Players are placed when they connect
+or teleport into a zone:
+    1. with a friend already there, if that instance is below the hard cap
+    2. otherwise in the lowest-numbered instance below the soft cap
+    3. otherwise in a new instance
+Players may also switch channels themselves (SwitchChannel), up to the hard cap.
+"""
+import os
+from typing import Iterable, Optional, Tuple
+
+ZONE_SOFT_CAP = int(os.getenv("ZONE_SOFT_CAP", "50"))
+# Friends and manual switches may fill an instance past the soft cap, up to this
+ZONE_HARD_CAP = int(os.getenv("ZONE_HARD_CAP", str(ZONE_SOFT_CAP * 2)))
+
+
+def instance_id(zone_id: str, channel: int) -> str:
+    return f"{zone_id}#{channel}"
+
+
+def split_instance(instance: str) -> Tuple[str, Optional[int]]:
+    """'town#2' -> ('town', 2); a bare zone id has no channel"""
+    zone_id, _, channel = instance.partition("#")
+    return zone_id, int(channel) if channel else None
+
+
+class ZoneInstances:
+    """Placement policy over a ZonePresence keyed by instance id"""
+    def __init__(self, presence, soft_cap: int = ZONE_SOFT_CAP, hard_cap: int = ZONE_HARD_CAP):
+        self.presence = presence
+        self.soft_cap = soft_cap
+        self.hard_cap = max(hard_cap, soft_cap)
+
+    def channels(self, zone_id: str):
+        """Channel numbers with players in them, ascending"""
+        prefix = zone_id + "#"
+        return sorted(int(key[len(prefix):]) for key in self.presence.players if key.startswith(prefix))
+
+    def population(self, zone_id: str, channel: int) -> int:
+        return self.presence.count(instance_id(zone_id, channel))
+
+    def place(self, zone_id: str, player_id: int, friend_ids: Iterable[int] = ()) -> str:
+        """Instance a player entering zone_id joins"""
+        channels = self.channels(zone_id)
+        friend_ids = set(friend_ids)
+        for channel in channels:
+            players = self.presence.players.get(instance_id(zone_id, channel), {})
+            if player_id in players or (friend_ids & players.keys() and len(players) < self.hard_cap):
+                return instance_id(zone_id, channel)
+        for channel in channels:
+            if self.population(zone_id, channel) < self.soft_cap:
+                return instance_id(zone_id, channel)
+        # Lowest free channel number (empty instances are dropped from presence)
+        channel = 1
+        while channel in channels:
+            channel += 1
+        return instance_id(zone_id, channel)
+
+    def can_switch(self, zone_id: str, channel: int) -> bool:
+        """Manual switch target: an existing instance below the hard cap, or the next new one"""
+        if channel < 1:
+            return False
+        channels = self.channels(zone_id)
+        if channel in channels:
+            return self.population(zone_id, channel) < self.hard_cap
+        return channel <= (channels[-1] if channels else 0) + 1
+
+    def listing(self, zone_id: str) -> list:
+        return [{"channel": c, "players": self.population(zone_id, c)} for c in self.channels(zone_id)]
@@ -0,0 +1,89 @@
+"""
+Outbound event encoding for the websocket edge.
+
+Every event leaving the server is wrapped once in an OutboundEvent: dumped to a JSON-ready
+dict once and encoded at most once per (log format, side of the battle). Every recipient
+of the same encoding - the actor, the PvP opponent, spectators - shares the string.
+Delta frames are per client and are the only encodings built per recipient.
+
+Outbox coalesces everything one handled command sends into a single frame (a JSON array)
+per socket.
+"""
+import json
+import logging
+from typing import Any, Dict, List
+
+from pspf.events.base import GameEvent
+from app.websocket.combat_delta import SWAPPED
+
+logger = logging.getLogger("argonvale")
+
+
+def turn_message(msg: dict, log_codes: bool, swap: bool) -> dict:
+    """TurnProcessed with either the log records or the legacy description (not both), from one side of the battle"""
+    drop = "description" if log_codes else "log"
+    out = {k: v for k, v in msg.items() if k != drop}
+    if swap:
+        for field, other in SWAPPED.items():
+            out[field] = msg[other]
+    return out
+
+
+class OutboundEvent:
+    """An event's JSON message plus its encodings, cached by (log format, side)"""
+    __slots__ = ("event", "msg", "frames")
+
+    def __init__(self, event: GameEvent):
+        self.event = event
+        self.msg = event.model_dump(mode='json')
+        self.msg["type"] = event.__class__.__name__
+        self.frames = {}
+
+    def encoded(self, log_codes: bool = False, swap: bool = False) -> str:
+        """JSON for one (log format, side); only TurnProcessed differs between them"""
+        key = (log_codes, swap) if self.msg["type"] == "TurnProcessed" else None
+        data = self.frames.get(key)
+        if data is None:
+            data = self.frames[key] = json.dumps(turn_message(self.msg, log_codes, swap) if key else self.msg)
+        return data
+
+    def for_client(self, session, swap: bool = False) -> str:
+        """
+        The encoding one client gets (session: its UserSession, or None): TurnProcessed from
+        its side of the battle (swap: it is the PvP defender), as a delta frame if it asked.
+        """
+        msg_type = self.msg["type"]
+        log_codes = session is not None and session.log_codes
+        deltas = session.combat_deltas if session is not None else None
+        if deltas is not None:
+            if msg_type == "CombatStarted":
+                deltas.start(self.msg)
+            elif msg_type == "CombatEnded":
+                deltas.end(self.msg["combat_id"])
+            elif msg_type == "TurnProcessed":
+                frame = deltas.encode(turn_message(self.msg, log_codes, False), swap)
+                if frame is not None:
+                    return json.dumps(frame)
+        return self.encoded(log_codes, swap)
+
+
+class Outbox:
+    """Encoded messages queued per socket while a command is handled, sent as one frame each"""
+    __slots__ = ("frames",)
+
+    def __init__(self):
+        self.frames: Dict[Any, List[str]] = {}
+
+    def add(self, websocket, data: str):
+        self.frames.setdefault(websocket, []).append(data)
+
+    def add_message(self, websocket, msg: dict):
+        self.add(websocket, json.dumps(msg))
+
+    async def flush(self):
+        frames, self.frames = self.frames, {}
+        for websocket, parts in frames.items():
+            try:
+                await websocket.send_text("[" + ",".join(parts) + "]")
+            except Exception as e:
+                logger.error(f"Failed to send {len(parts)} queued messages: {e}")
@@ -0,0 +1,85 @@
+"""
+Zone presence: who is in each zone (instance), where, and what they look like.
+
+Kept in memory next to the zone subscriptions. A socket that joins a zone gets one
+ZoneSnapshot frame with everyone already there, then the usual incremental messages
+(PlayerMoved, PlayerLeft, PlayerDisconnected). Each zone has a version that changes
+whenever its presence does; the encoded snapshot is cached per version, so every join
+between two changes shares the same string.
+"""
+import json
+from typing import Dict, List, Optional
+
+from app.websocket.instances import split_instance
+
+# Snapshot rows are lists in this order (the frame carries it as "fields")
+PRESENCE_FIELDS = ["player_id", "username", "x", "y", "avatar_url", "title"]
+
+
+class ZonePresence:
+    def __init__(self):
+        # zone_id -> {player_id: presence row}
+        self.players: Dict[str, Dict[int, dict]] = {}
+        # (zone_id, player_id) -> sockets of that player in the zone
+        self.refs: Dict[tuple, int] = {}
+        self.versions: Dict[str, int] = {}
+        # zone_id -> (version, encoded ZoneSnapshot)
+        self.snapshots: Dict[str, tuple] = {}
+
+    def _changed(self, zone_id: str):
+        self.versions[zone_id] = self.versions.get(zone_id, 0) + 1
+
+    def enter(self, zone_id: str, row: dict) -> dict:
+        """Registers a player (one more socket of theirs) in a zone instance; returns the stored row"""
+        key = (zone_id, row["player_id"])
+        self.refs[key] = self.refs.get(key, 0) + 1
+        zone = self.players.setdefault(zone_id, {})
+        base_zone, channel = split_instance(zone_id)
+        zone[row["player_id"]] = row = dict(row, zone_id=base_zone, channel=channel)
+        self._changed(zone_id)
+        return row
+
+    def move(self, zone_id: str, player_id: int, x: int, y: int) -> Optional[dict]:
+        row = self.players.get(zone_id, {}).get(player_id)
+        if row is None:
+            return None
+        row["x"], row["y"] = x, y
+        self._changed(zone_id)
+        return row
+
+    def leave(self, zone_id: str, player_id: int) -> bool:
+        """Drops one socket of a player; True once the player's last socket has left"""
+        key = (zone_id, player_id)
+        if key not in self.refs:
+            return False
+        self.refs[key] -= 1
+        if self.refs[key] > 0:
+            return False
+        del self.refs[key]
+        zone = self.players[zone_id]
+        del zone[player_id]
+        if not zone:
+            del self.players[zone_id]
+            self.snapshots.pop(zone_id, None)
+        self._changed(zone_id)
+        return True
+
+    def get(self, zone_id: str, player_id: int) -> Optional[dict]:
+        return self.players.get(zone_id, {}).get(player_id)
+
+    def count(self, zone_id: str) -> int:
+        return len(self.players.get(zone_id, ()))
+
+    def snapshot(self, zone_id: str) -> str:
+        """Encoded ZoneSnapshot (a JSON object), rebuilt only when the zone's version moved on"""
+        version = self.versions.get(zone_id, 0)
+        cached = self.snapshots.get(zone_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rows: List[list] = [[row.get(f) for f in PRESENCE_FIELDS] for row in self.players.get(zone_id, {}).values()]
+        base_zone, channel = split_instance(zone_id)
+        data = json.dumps({"type": "ZoneSnapshot", "zone_id": base_zone, "channel": channel, "v": version,
+                           "fields": PRESENCE_FIELDS, "players": rows}, separators=(",", ":"))
+        if rows:
+            self.snapshots[zone_id] = (version, data)
+        return data
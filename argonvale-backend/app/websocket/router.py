@@ -1,5 +1,6 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import List, Dict, Any, Optional
+import asyncio
 import json
 import logging
 import random
@@ -11,7 +12,10 @@ from jose import jwt, JWTError
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.models.companion import Companion
+from app.models.social import Friendship
 from app.auth.security import SECRET_KEY, ALGORITHM
+from app.core.readiness import readiness
+from app.services.inventory_service import consume, dropped_item_fields, grant
 
 # PSPF Imports
 from pspf.events.base import GameEvent
@@ -20,47 +24,145 @@ from pspf.events.combat import CombatAction, CombatStarted, TurnProcessed, Comba
 from pspf.events.training import TrainingStarted, TrainingCompleted
 from pspf.events.companion import ChooseStarter, CompanionCreated
 from pspf.processors.exploration import ExplorationProcessor as BaseExplorationProcessor
-from app.processors.tiled_exploration import TiledExplorationProcessor
+from app.processors.zone_shards import SHARD_LOAD_DECAY_SECONDS, ZoneShardMap
+from app.processors.map_registry import MAP_WATCH_SECONDS, MapRegistry
+from app.processors.tiled_exploration import MAPS_DIR
+from app.processors.world_chunks import ChunkedWorld
 from pspf.processors.combat import CombatProcessor
 from pspf.processors.management import CompanionManagementProcessor, CompanionManagementState
 from pspf.state.base import GameState
+from app.websocket.combat_delta import CombatDeltaEncoder
+from app.websocket.outbound import OutboundEvent, Outbox
+from app.websocket.presence import ZonePresence
+from app.websocket.instances import ZoneInstances, instance_id, split_instance
 
 # Setup Logger
 logger = logging.getLogger("argonvale")
 
 # Per-User Game State Container
 class UserSession:
+    # Slotted: one of these lives per open connection
+    __slots__ = ("user_id", "username", "current_zone", "instance", "last_message_at",
+                 "companion_total", "companion_active", "has_starter", "log_codes", "combat_deltas", "appearance", "chunks_sent",
+                 "friends", "friends_at")
+
     def __init__(self, user_id: int, username: str):
         self.user_id = user_id
         self.username = username
         self.current_zone = None
-        # Initialize default state
-        self.companion_state = CompanionManagementState(owner_id=user_id)
+        # Instance of current_zone the socket is subscribed to (e.g. "town#2")
+        self.instance = None
         self.last_message_at = 0.0
-        # We could cache other things here
+        # Companion counters (the management processor's state)
+        self.companion_total = 0
+        self.companion_active = 0
+        self.has_starter = False
+        # Client renders combat text from TurnProcessed.log itself (connected with ?log=codes)
+        self.log_codes = False
+        # Delta-encoded TurnProcessed frames (connected with ?state=delta)
+        self.combat_deltas: Optional[CombatDeltaEncoder] = None
+        # What other players see in the zone (avatar_url, title)
+        self.appearance: Optional[Dict[str, Any]] = None
+        # (zone_id, cx, cy) of the world chunks the client was last sent (chunked worlds only)
+        self.chunks_sent: Optional[set] = None
+        # Accepted friends' ids for instance placement (GameServer.friends_of), and when they were loaded
+        self.friends: Optional[List[int]] = None
+        self.friends_at = 0.0
+
+    @property
+    def companion_state(self) -> CompanionManagementState:
+        """Built on demand for the management processor instead of kept per connection"""
+        return CompanionManagementState(
+            owner_id=self.user_id,
+            active_count=self.companion_active,
+            total_count=self.companion_total,
+            has_starter=self.has_starter
+        )
+
+# Joins this close together get their ZoneSnapshot in one batch (one encoding)
+SNAPSHOT_BATCH_SECONDS = 0.05
+# Movement speed: one tile per MOVE_STEP_SECONDS; a MovePath may spend up to MAX_PATH_STEPS saved-up steps
+MOVE_STEP_SECONDS = 0.08
+MAX_PATH_STEPS = 16
+# A session's friend list is reloaded for instance placement once it is this old
+FRIENDS_REFRESH_SECONDS = 60
+# Chunked worlds: clients get the chunks within this many chunks of their position
+CHUNK_STREAM_RADIUS = 1
+# Websockets that arrive while the server is still starting wait this long for readiness
+WS_READY_TIMEOUT = 30.0
+
+def deplete_hunger(user: User, steps: int = 1):
+    """Hunger System: deplete 1 hunger per move for active companions"""
+    for comp in user.companions:
+        if comp.is_active and comp.status == "active":
+            fed = min(comp.hunger, steps)
+            comp.hunger -= fed
+            # Starvation: Lose 2 health per move at 0 hunger
+            comp.hp = max(0, comp.hp - 2 * (steps - fed))
 
 class SyncManager:
     def __init__(self):
         # zone_id -> set of websockets
         self.subscriptions: Dict[str, set] = {}
+        self.presence = ZonePresence()
+        # websocket -> (zone_id, player_id) of its presence entry
+        self.members: Dict[WebSocket, tuple] = {}
+        # zone_id -> sockets waiting for their join snapshot
+        self.pending_snapshots: Dict[str, set] = {}
 
-    def subscribe(self, zone_id: str, websocket: WebSocket):
+    def subscribe(self, zone_id: str, websocket: WebSocket, player: Optional[dict] = None) -> Optional[dict]:
+        """
+        player: the joining player's presence row (PRESENCE_FIELDS). They are registered in the
+        zone and the socket gets a ZoneSnapshot shortly after; returns the stored row.
+        """
         if zone_id not in self.subscriptions:
             self.subscriptions[zone_id] = set()
         self.subscriptions[zone_id].add(websocket)
         logger.debug(f"Socket subscribed to zone: {zone_id}")
+        if player is None:
+            return None
+        row = self.presence.enter(zone_id, player)
+        self.members[websocket] = (zone_id, player["player_id"])
+        pending = self.pending_snapshots.get(zone_id)
+        if pending is None:
+            pending = self.pending_snapshots[zone_id] = set()
+            asyncio.get_running_loop().create_task(self.send_snapshots(zone_id, SNAPSHOT_BATCH_SECONDS))
+        pending.add(websocket)
+        return row
 
-    def unsubscribe(self, zone_id: str, websocket: Optional[WebSocket]):
-        if not websocket: return
+    def unsubscribe(self, zone_id: str, websocket: Optional[WebSocket]) -> bool:
+        """True if this was the player's last socket in the zone (they left it)"""
+        if not websocket: return False
         for zone in self.subscriptions:
             self.subscriptions[zone].discard(websocket)
+        for pending in self.pending_snapshots.values():
+            pending.discard(websocket)
+        member = self.members.pop(websocket, None)
+        return member is not None and self.presence.leave(*member)
 
-    async def broadcast(self, zone_id: str, event_data: dict, exclude: Optional[WebSocket] = None):
+    async def send_snapshots(self, zone_id: str, delay: float = 0.0):
+        """Sends the zone's current snapshot to every socket that joined since the last batch"""
+        if delay:
+            await asyncio.sleep(delay)
+        sockets = self.pending_snapshots.pop(zone_id, None)
+        if not sockets:
+            return
+        message = "[" + self.presence.snapshot(zone_id) + "]"
+        for ws in sockets:
+            try:
+                await ws.send_text(message)
+            except Exception as e:
+                logger.debug(f"Snapshot failed for socket, marking as dead: {e}")
+                self.unsubscribe(zone_id, ws)
+
+    async def broadcast(self, zone_id: str, event_data, exclude: Optional[WebSocket] = None):
+        """event_data: a message dict, or an OutboundEvent whose cached encoding is reused"""
         if zone_id not in self.subscriptions:
             return
         
-        # Prepare message as list of events for compatibility
-        message = json.dumps([event_data])
+        # Prepare message as list of events for compatibility (encoded once for every socket)
+        encoded = event_data.encoded() if isinstance(event_data, OutboundEvent) else json.dumps(event_data)
+        message = "[" + encoded + "]"
         
         dead_sockets = []
         for ws in list(self.subscriptions[zone_id]):
@@ -75,19 +177,100 @@ class SyncManager:
         for ws in dead_sockets:
             self.unsubscribe(zone_id, ws)
 
+class SpectatorChannels:
+    """
+    Per-combat spectator subscriptions, fed by TurnProcessed/CombatEnded. Watchers are grouped
+    by what they receive (side of the battle, log format); each event is encoded once per
+    group and the same string is sent to every socket in it.
+    """
+    def __init__(self):
+        # combat_id -> {(swap, log_codes): set of websockets}
+        self.channels: Dict[str, Dict[tuple, set]] = {}
+
+    def subscribe(self, combat_id: str, websocket: WebSocket, swap: bool = False, log_codes: bool = False):
+        self.unsubscribe(websocket, combat_id)
+        groups = self.channels.setdefault(combat_id, {})
+        groups.setdefault((swap, log_codes), set()).add(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, combat_id: Optional[str] = None):
+        """Leave one channel, or every channel (on disconnect)"""
+        for cid in [combat_id] if combat_id is not None else list(self.channels):
+            groups = self.channels.get(cid)
+            if not groups:
+                continue
+            for key in list(groups):
+                groups[key].discard(websocket)
+                if not groups[key]:
+                    del groups[key]
+            if not groups:
+                del self.channels[cid]
+
+    def watchers(self, combat_id: str) -> int:
+        return sum(len(sockets) for sockets in self.channels.get(combat_id, {}).values())
+
+    async def publish(self, combat_id: str, out: OutboundEvent):
+        groups = self.channels.get(combat_id)
+        if not groups:
+            return
+        dead_sockets = []
+        for (swap, log_codes), sockets in list(groups.items()):
+            # Shares the event's cached encodings with the fighters (non-turn events have just one)
+            data = "[" + out.encoded(log_codes, swap) + "]"
+            for ws in list(sockets):
+                try:
+                    await ws.send_text(data)
+                except Exception as e:
+                    logger.debug(f"Spectator send failed, dropping socket: {e}")
+                    dead_sockets.append(ws)
+
+        for ws in dead_sockets:
+            self.unsubscribe(ws, combat_id)
+        if out.msg["type"] == "CombatEnded":
+            self.channels.pop(combat_id, None)
+
 class GameServer:
     def __init__(self):
         self.active_connections: Dict[WebSocket, UserSession] = {}
-        self.exploration = TiledExplorationProcessor()
+        # Exploration (move validation, encounters, warps) runs on each zone's owning worker
+        self.shards: Optional[ZoneShardMap] = None
+        # Compiled maps, hot-reloaded on edit; chunked worlds are streamed to clients from here
+        self.maps: Optional[MapRegistry] = None
+        self.map_reload_lock = asyncio.Lock()
         self.combat = CombatProcessor()
         self.management = CompanionManagementProcessor()
         self.sync = SyncManager()
+        self.instances = ZoneInstances(self.sync.presence)
+        self.spectators = SpectatorChannels()
+        # combat_id -> item ids whose unit has been taken off the owner's stack
+        self.consumed_items: Dict[str, Dict[int, int]] = {}
         self.pvp_queue: List[Dict[str, Any]] = [] # [{'user_id', 'websocket', 'companion_id', 'username'}]
         
         # We use a global state container just for the processors signature, 
         # but we will dynamically swap context or pass user-specific state.
         # For this MVP refactor, we will pass the UserSession state to processors.
 
+    def start(self):
+        """Loads the maps and starts the zone workers (a startup step, run off the event loop)"""
+        self.maps = MapRegistry(MAPS_DIR)
+        # An in-process zone worker uses the same registry: maps are loaded once
+        self.shards = ZoneShardMap.create(registry=self.maps)
+
+    def consume_used_items(self, db: Session, event: TurnProcessed):
+        """Takes this turn's consumable uses off their stacks. item_uses counts every use so far
+        (up to each stack's quantity per battle), all from the attacker's loadout"""
+        consumed = self.consumed_items.setdefault(event.combat_id, {})
+        owed = {item_id: uses - consumed.get(item_id, 0) for item_id, uses in event.item_uses.items()
+                if uses > consumed.get(item_id, 0)}
+        if not owed:
+            return
+        for item_id, n in owed.items():
+            # None: the stack is short, in a trade, or not the attacker's
+            if consume(db, event.attacker_id, item_id, n) is None:
+                logger.warning(f"Combat {event.combat_id}: could not consume {n} of item {item_id} for user {event.attacker_id}")
+                continue
+            consumed[item_id] = consumed.get(item_id, 0) + n
+        db.commit()
+
     async def connect(self, websocket: WebSocket) -> bool:
         await websocket.accept()
         print("DEBUG: WebSocket accepted")
@@ -119,16 +302,20 @@ class GameServer:
             print("DEBUG: Loading user session")
             session = UserSession(user_id=user.id, username=username)
             session.current_zone = user.last_zone_id
+            session.log_codes = websocket.query_params.get("log") == "codes"
+            session.appearance = {"avatar_url": user.avatar_url, "title": user.title}
+            if websocket.query_params.get("state") == "delta":
+                session.combat_deltas = CombatDeltaEncoder()
             
             # Load Companion State
             companions = db.query(Companion).filter(Companion.owner_id == user.id).all()
-            session.companion_state.total_count = len(companions)
-            session.companion_state.active_count = sum(1 for c in companions if c.status == 'active')
-            session.companion_state.has_starter = len(companions) > 0 # Simple check for now
+            session.companion_total = len(companions)
+            session.companion_active = sum(1 for c in companions if c.status == 'active')
+            session.has_starter = len(companions) > 0 # Simple check for now
             
             self.active_connections[websocket] = session
             # Subscribe to current zone
-            self.sync.subscribe(session.current_zone, websocket)
+            await self.join_zone(websocket, session, user.last_x, user.last_y)
             
             logger.info(f"User {username} (ID: {user.id}) connected.")
             print("DEBUG: Connect successful")
@@ -164,19 +351,144 @@ class GameServer:
                     sockets.append(ws)
         return sockets
         
+    def can_spectate(self, user_id: int, session) -> bool:
+        """Friends of either fighter may watch a battle"""
+        fighters = [fid for fid in (session.attacker_id, session.defender_id) if fid is not None]
+        if user_id in fighters:
+            return False
+        db = SessionLocal()
+        try:
+            return db.query(Friendship).filter(
+                ((Friendship.user_id == user_id) & Friendship.friend_id.in_(fighters)) |
+                ((Friendship.friend_id == user_id) & Friendship.user_id.in_(fighters)),
+                Friendship.status == "accepted"
+            ).first() is not None
+        finally:
+            db.close()
+
+    def friend_ids(self, user_id: int) -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = db.query(Friendship.user_id, Friendship.friend_id).filter(
+                (Friendship.user_id == user_id) | (Friendship.friend_id == user_id),
+                Friendship.status == "accepted"
+            ).all()
+            return [a if b == user_id else b for a, b in rows]
+        finally:
+            db.close()
+
+    async def friends_of(self, session: UserSession) -> List[int]:
+        """The session's friends, cached on it; reloaded in a thread (not on the event loop) when stale"""
+        if session.friends is None or time.monotonic() - session.friends_at >= FRIENDS_REFRESH_SECONDS:
+            session.friends = await asyncio.to_thread(self.friend_ids, session.user_id)
+            session.friends_at = time.monotonic()
+        return session.friends
+
+    async def join_zone(self, websocket: WebSocket, session: UserSession, x: int, y: int, channel: Optional[int] = None):
+        """
+        Subscribes a socket to an instance of its session's zone (placed by the instancing
+        policy unless a channel is given) and shows the player to everyone in it.
+        """
+        if channel is None:
+            session.instance = self.instances.place(session.current_zone, session.user_id, await self.friends_of(session))
+        else:
+            session.instance = instance_id(session.current_zone, channel)
+        row = self.sync.subscribe(session.instance, websocket, dict(
+            session.appearance or {}, player_id=session.user_id, username=session.username, x=x, y=y
+        ))
+        await self.sync.broadcast(session.instance, dict(row, type="PlayerMoved"), exclude=websocket)
+        await self.stream_chunks(websocket, session, x, y)
+
+    async def stream_chunks(self, websocket: WebSocket, session: UserSession, x: int, y: int, outbox: Optional[Outbox] = None):
+        """
+        Chunked worlds: sends the MapChunk frames around (x, y) the client wasn't sent with
+        its previous window (clients keep only the current window). Chunk frames are encoded
+        once per world chunk and shared by every client near it.
+        """
+        world = self.maps.maps.get(session.current_zone)
+        if not isinstance(world, ChunkedWorld):
+            session.chunks_sent = None
+            return
+        zone_id = session.current_zone
+        window = {(zone_id, cx, cy) for cx, cy in world.chunks_around(x, y, CHUNK_STREAM_RADIUS)}
+        new = window - session.chunks_sent if session.chunks_sent else window
+        session.chunks_sent = window
+        if not new:
+            return
+        frames = [world.chunk_frame(zone_id, cx, cy) for _, cx, cy in sorted(new)]
+        if outbox is not None:
+            for frame in frames:
+                outbox.add(websocket, frame)
+            return
+        try:
+            await websocket.send_text("[" + ",".join(frames) + "]")
+        except Exception as e:
+            logger.error(f"Failed to stream map chunks: {e}")
+
+    async def reload_maps(self) -> List[str]:
+        """
+        Swaps in every edited map (compiled off the event loop) on the edge and all zone
+        workers, then resyncs the clients in those zones. Returns the map ids reloaded.
+        """
+        async with self.map_reload_lock:
+            swapped = await self.maps.reload_async()
+            if not swapped:
+                return []
+            await self.shards.reload_maps(swapped)
+        logger.info(f"Maps reloaded (version {self.maps.version}): {', '.join(swapped)}")
+        for websocket, session in list(self.active_connections.items()):
+            if session.current_zone not in swapped:
+                continue
+            session.chunks_sent = None
+            try:
+                await websocket.send_json({
+                    "type": "MapReloaded",
+                    "zone_id": session.current_zone,
+                    "version": self.maps.versions.get(session.current_zone, self.maps.version)
+                })
+            except Exception as e:
+                logger.error(f"Failed to send MapReloaded: {e}")
+                continue
+            row = self.sync.presence.get(session.instance, session.user_id)
+            if row is not None:
+                await self.stream_chunks(websocket, session, row["x"], row["y"])
+        return swapped
+
+    async def watch_maps(self, interval: float = MAP_WATCH_SECONDS):
+        """Background task: reloads maps whose files changed"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload_maps()
+            except Exception as e:
+                logger.error(f"Map reload failed: {e}")
+
+    async def decay_shard_load(self, interval: float = SHARD_LOAD_DECAY_SECONDS):
+        """Background task: ages the zones' move counts, so placement and rebalancing go by recent load"""
+        while True:
+            await asyncio.sleep(interval)
+            self.shards.decay_load()
+
+    async def change_zone(self, websocket: WebSocket, session: UserSession, zone_id: str, x: int, y: int, channel: Optional[int] = None):
+        old_instance = session.instance
+        if self.sync.unsubscribe(old_instance, websocket):
+            await self.shards.leave(old_instance, session.user_id)
+            await self.sync.broadcast(old_instance, {"type": "PlayerLeft", "player_id": session.user_id, "zone_id": session.current_zone})
+        session.current_zone = zone_id
+        await self.join_zone(websocket, session, x, y, channel)
+
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             session = self.active_connections[websocket]
             
-            # Broadcast Disconnection before removing
-            import asyncio
-            asyncio.create_task(self.sync.broadcast(session.current_zone, {
-                "type": "PlayerDisconnected",
-                "player_id": session.user_id
-            }))
-            
-            # Unsubscribe and remove
-            self.sync.unsubscribe(session.current_zone, websocket)
+            # Unsubscribe, and tell the zone once the player's last socket is gone
+            if self.sync.unsubscribe(session.instance, websocket):
+                asyncio.create_task(self.shards.leave(session.instance, session.user_id))
+                asyncio.create_task(self.sync.broadcast(session.instance, {
+                    "type": "PlayerDisconnected",
+                    "player_id": session.user_id
+                }))
+            self.spectators.unsubscribe(websocket)
             
             # Remove from PvP Queue keys off user id now
             self.pvp_queue = [q for q in self.pvp_queue if q['user_id'] != session.user_id]
@@ -201,9 +513,12 @@ class GameServer:
 
         # 1. Initialize Processing Context
         output_events = []
-        class TurnContext:
-            companion_state = user_session.companion_state
-        turn_state = TurnContext()
+        # Events the owning zone worker derived from this command's move
+        exploration_results = []
+        # Processors read what they need (e.g. companion_state) from the session itself
+        turn_state = user_session
+        # Everything this command sends, one frame per socket (flushed when handling ends)
+        outbox = Outbox()
         
         try:
             payload = json.loads(data)
@@ -239,45 +554,41 @@ class GameServer:
                             logger.warning(f"Distance check failed for user {user_id}: dx={dx}, dy={dy}")
                             return
 
-                        # C. Collision Check (Using ExplorationProcessor)
+                        # C. Collision Check + exploration rolls (on the zone's owning worker)
                         new_x = user.last_x + dx
                         new_y = user.last_y + dy
+                        if zone_id == user_session.current_zone:
+                            zone_instance = user_session.instance
+                        else:
+                            zone_instance = self.instances.place(zone_id, user_id, await self.friends_of(user_session))
+                        exploration_results = await self.shards.move(zone_instance, zone_id, user_id, new_x, new_y)
                         
-                        if not self.exploration.is_valid_move(zone_id, new_x, new_y):
+                        if exploration_results is None:
                             logger.warning(f"Collision check failed for user {user_id} at {new_x},{new_y} in {zone_id}")
                             # Send sync fix back to client
-                            await websocket.send_text(json.dumps({
+                            outbox.add_message(websocket, {
                                 "type": "TeleportPlayer",
                                 "x": user.last_x,
                                 "y": user.last_y,
                                 "zone_id": user.last_zone_id
-                            }))
+                            })
                             return
 
                         # 2. Update State
                         user.last_x = new_x
                         user.last_y = new_y
                         
-                        # Handle Zone Change Subscriptions
-                        if zone_id != user_session.current_zone:
-                            self.sync.unsubscribe(user_session.current_zone, websocket)
-                            self.sync.subscribe(zone_id, websocket)
-                            user_session.current_zone = zone_id
+                        # Handle Zone Change Subscriptions (presence moves along)
+                        zone_changed = zone_id != user_session.current_zone
+                        if zone_changed:
+                            await self.change_zone(websocket, user_session, zone_id, new_x, new_y, split_instance(zone_instance)[1])
+                        else:
+                            self.sync.presence.move(user_session.instance, user_id, new_x, new_y)
 
                         user.last_zone_id = zone_id
                         user.last_move_at = now
                         
-                        # Hunger System: Deplete 1 hunger per move for active companions
-                        for comp in user.companions:
-                            if comp.is_active and comp.status == "active":
-                                if comp.hunger > 0:
-                                    comp.hunger -= 1
-                                else:
-                                    # Starvation: Lose 2 health if hunger is 0
-                                    comp.hp = max(0, comp.hp - 2)
-                                    if comp.hp == 0:
-                                        # Optional: Handle companion knockout? 
-                                        pass
+                        deplete_hunger(user)
                         
                         db_persist.commit()
                         
@@ -290,19 +601,78 @@ class GameServer:
                         )
                         input_events.append(move_evt)
 
-                        # 4. Broadcast to others in the zone
-                        await self.sync.broadcast(zone_id, {
-                            "type": "PlayerMoved",
-                            "player_id": user_id,
-                            "username": user_session.username,
-                            "zone_id": zone_id,
-                            "x": new_x,
-                            "y": new_y
-                        }, exclude=websocket)
+                        # 4. Broadcast to others in the zone (change_zone already announced a new arrival)
+                        if not zone_changed:
+                            await self.sync.broadcast(user_session.instance, {
+                                "type": "PlayerMoved",
+                                "player_id": user_id,
+                                "username": user_session.username,
+                                "zone_id": zone_id,
+                                "x": new_x,
+                                "y": new_y
+                            }, exclude=websocket)
+                            await self.stream_chunks(websocket, user_session, new_x, new_y, outbox)
 
                 finally:
                     db_persist.close()
 
+            elif msg_type == "MovePath":
+                # Several unit steps in one command: {"seq": client seq of the first step, "steps": [[dx, dy], ...]}
+                seq = payload.get("seq", 0)
+                steps = payload.get("steps") or []
+                if (not isinstance(seq, int) or not isinstance(steps, list) or len(steps) > MAX_PATH_STEPS
+                        or not all(isinstance(st, list) and len(st) == 2 and all(isinstance(d, int) for d in st) for st in steps)):
+                    outbox.add_message(websocket, {"type": "Error", "message": "Invalid path."})
+                    return
+                zone_id = user_session.current_zone
+
+                db_persist = SessionLocal()
+                try:
+                    user = db_persist.query(User).filter(User.id == user_id).first()
+                    if not user:
+                        return
+                    # One validation pass: the speed budget first, then collision/exploration per step on the zone owner
+                    now = time.time()
+                    last_move_at = max(user.last_move_at or 0, now - MAX_PATH_STEPS * MOVE_STEP_SECONDS)
+                    budget = int((now - last_move_at) / MOVE_STEP_SECONDS)
+                    start_x, start_y = user.last_x, user.last_y
+                    taken, new_x, new_y, exploration_results, blocked = await self.shards.move_path(
+                        user_session.instance, zone_id, user_id, start_x, start_y, steps[:budget]
+                    )
+                    if taken < len(steps):
+                        logger.warning(f"Path of user {user_id} cut at step {taken}/{len(steps)} ({'collision' if blocked else 'speed/event'})")
+
+                    # Acknowledge the steps taken with the authoritative position (the client replays the rest)
+                    outbox.add_message(websocket, {"type": "MoveAck", "seq": seq + taken - 1, "zone_id": zone_id, "x": new_x, "y": new_y})
+                    if not taken:
+                        return
+
+                    user.last_x, user.last_y = new_x, new_y
+                    user.last_move_at = last_move_at + taken * MOVE_STEP_SECONDS
+                    deplete_hunger(user, taken)
+                    db_persist.commit()
+                    self.sync.presence.move(user_session.instance, user_id, new_x, new_y)
+
+                    # One event and one broadcast for the whole path
+                    input_events.append(PlayerMoved.create(player_id=user_id, zone_id=zone_id, x=new_x, y=new_y))
+                    path = []
+                    x, y = start_x, start_y
+                    for dx, dy in steps[:taken]:
+                        x, y = x + dx, y + dy
+                        path.append([x, y])
+                    await self.sync.broadcast(user_session.instance, {
+                        "type": "PlayerMoved",
+                        "player_id": user_id,
+                        "username": user_session.username,
+                        "zone_id": zone_id,
+                        "x": new_x,
+                        "y": new_y,
+                        "path": path
+                    }, exclude=websocket)
+                    await self.stream_chunks(websocket, user_session, new_x, new_y, outbox)
+                finally:
+                    db_persist.close()
+
             elif msg_type == "CombatAction":
                 input_events.append(CombatAction.create(
                     combat_id=payload.get("combat_id", "combat_default"),
@@ -312,6 +682,50 @@ class GameServer:
                     item_ids=payload.get("item_ids", [])
                 ))
 
+            elif msg_type == "CombatAck":
+                # Delta clients confirm the last TurnDelta they applied
+                if user_session.combat_deltas is not None and payload.get("combat_id"):
+                    user_session.combat_deltas.ack(payload["combat_id"], payload.get("v"))
+                return
+
+            elif msg_type == "SpectateCombat":
+                combat_id = payload.get("combat_id")
+                session = self.combat.sessions.get(combat_id) if combat_id else None
+                if not session or not self.can_spectate(user_id, session):
+                    outbox.add_message(websocket, {"type": "Error", "message": "You can't watch this battle."})
+                    return
+                # Watch from either fighter's side (PvP); the snapshot is that fighter's resume view
+                swap = payload.get("side") == "defender" and session.mode == "pvp"
+                self.spectators.subscribe(combat_id, websocket, swap, user_session.log_codes)
+                msg = session.to_start_event(session.defender_id if swap else session.attacker_id).model_dump(mode='json')
+                msg["type"] = "CombatStarted"
+                msg["spectating"] = True
+                outbox.add_message(websocket, msg)
+                return
+
+            elif msg_type == "ListChannels":
+                zone_id = user_session.current_zone
+                outbox.add_message(websocket, {"type": "ZoneChannels", "zone_id": zone_id,
+                                               "channel": split_instance(user_session.instance)[1],
+                                               "channels": self.instances.listing(zone_id)})
+                return
+
+            elif msg_type == "SwitchChannel":
+                zone_id = user_session.current_zone
+                channel = payload.get("channel")
+                row = self.sync.presence.get(user_session.instance, user_id)
+                if row is None or not isinstance(channel, int) or user_session.instance == instance_id(zone_id, channel):
+                    return
+                if not self.instances.can_switch(zone_id, channel):
+                    outbox.add_message(websocket, {"type": "Error", "message": "That channel is full."})
+                    return
+                await self.change_zone(websocket, user_session, zone_id, row["x"], row["y"], channel)
+                return
+
+            elif msg_type == "LeaveSpectate":
+                self.spectators.unsubscribe(websocket, payload.get("combat_id"))
+                return
+
             elif msg_type == "ChooseStarter":
                 input_events.append(ChooseStarter.create(
                     owner_id=user_id,
@@ -356,7 +770,7 @@ class GameServer:
                     logger.info(f"Found companion {companion.name} for user {user_id}")
                     from app.models.item import Item as DBItem
                     equipped_items_db = db.query(DBItem).filter(DBItem.owner_id == user_id, DBItem.is_equipped == True).all()
-                    equipped_items = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats} for i in equipped_items_db]
+                    equipped_items = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "quantity": i.quantity} for i in equipped_items_db]
                     
                     combat_id = f"arena_{int(random.random() * 1000000)}"
                     out_evt = CombatStarted.create(
@@ -426,7 +840,8 @@ class GameServer:
                             "name": i.name, 
                             "item_type": i.item_type, 
                             "stats": i.weapon_stats,
-                            "effect": i.effect
+                            "effect": i.effect,
+                            "quantity": i.quantity
                         } for i in equipped_items_db]
 
                         encounter_context = payload.get("context", {})
@@ -489,8 +904,7 @@ class GameServer:
                 
                 # Exploration
                 if isinstance(event, PlayerMoved):
-                    # Random Encounter Logic
-                    exploration_results = self.exploration.process(turn_state, event)
+                    # Random Encounter Logic (rolled by the zone's owner with the collision check)
                     
                     # Post-process exploration results to hydrate and init combat
                     hydrated_results = []
@@ -510,7 +924,7 @@ class GameServer:
                                 # Get Items 
                                 from app.models.item import Item as DBItem
                                 equipped_db = db_exp.query(DBItem).filter(DBItem.owner_id == user_id, DBItem.is_equipped == True).all()
-                                equipped_items = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect} for i in equipped_db]
+                                equipped_items = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect, "quantity": i.quantity} for i in equipped_db]
 
                                 # Create new context
                                 new_context = res.context.copy()
@@ -593,7 +1007,7 @@ class GameServer:
                             "username": u.username
                         })
                         db.close()
-                        await websocket.send_text(json.dumps([{"type": "Info", "message": "Searching for a rival..."}]))
+                        outbox.add_message(websocket, {"type": "Info", "message": "Searching for a rival..."})
                     else:
                         # Proceed with match (user_id vs match['user_id'])
                         opp_id = match['user_id']
@@ -615,8 +1029,8 @@ class GameServer:
                                 items1 = db.query(DBItem).filter(DBItem.owner_id == user_id, DBItem.is_equipped == True).all()
                                 items2 = db.query(DBItem).filter(DBItem.owner_id == opp_id, DBItem.is_equipped == True).all()
                                 
-                                equipped1 = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect} for i in items1]
-                                equipped2 = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect} for i in items2]
+                                equipped1 = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect, "quantity": i.quantity} for i in items1]
+                                equipped2 = [{"id": i.id, "name": i.name, "item_type": i.item_type, "stats": i.weapon_stats, "effect": i.effect, "quantity": i.quantity} for i in items2]
 
                                 # Start PvP Context
                                 context = {
@@ -682,14 +1096,9 @@ class GameServer:
                                 
                                 # Broadcast to ALL active sockets for opponent
                                 logger.info(f"Broadcasting match event to {len(opp_sockets)} active sockets for user {opp_id}")
+                                out2 = OutboundEvent(evt2)
                                 for ws in opp_sockets:
-                                    try:
-                                        msg = evt2.model_dump(mode='json')
-                                        msg["type"] = "CombatStarted"
-                                        await ws.send_text(json.dumps([msg]))
-                                        logger.info(f"Successfully broadcasted to socket {ws.client_state} for user {opp_id}")
-                                    except Exception as e:
-                                        logger.error(f"Failed to send to one of user {opp_id}'s sockets: {e}")
+                                    outbox.add(ws, out2.for_client(self.active_connections.get(ws)))
                                 
                                 # Add to output for P1 (current user)
                                 output_events.append(evt1)
@@ -709,7 +1118,7 @@ class GameServer:
                             else:
                                 logger.warning(f"PvP Match Validation Failed: Invalid companions.")
                                 if not c1:
-                                     await websocket.send_text(json.dumps([{"type": "Error", "message": "Invalid companion selection."}]))
+                                     outbox.add_message(websocket, {"type": "Error", "message": "Invalid companion selection."})
                                      self.pvp_queue.insert(0, match)
                                 elif not c2:
                                     self.pvp_queue.append({
@@ -717,7 +1126,7 @@ class GameServer:
                                         "companion_id": event.companion_id,
                                         "username": u1.username if u1 else "Unknown"
                                     })
-                                    await websocket.send_text(json.dumps([{"type": "Info", "message": "Searching for a rival..."}]))
+                                    outbox.add_message(websocket, {"type": "Info", "message": "Searching for a rival..."})
 
                         finally:
                             db.close()
@@ -731,7 +1140,7 @@ class GameServer:
                     
                     if before_count > after_count:
                         logger.info(f"User {user_id} left PvP queue")
-                        await websocket.send_text(json.dumps([{"type": "Info", "message": "Left matchmaking queue."}]))
+                        outbox.add_message(websocket, {"type": "Info", "message": "Left matchmaking queue."})
                     else:
                         logger.warning(f"User {user_id} tried to leave queue but wasn't in it")
 
@@ -752,9 +1161,9 @@ class GameServer:
                                 # Clean up DB if session is gone from memory
                                 comp.current_combat_id = None
                                 db_r.commit()
-                                await websocket.send_text(json.dumps([{"type": "Error", "message": "Battle session has expired."}]))
+                                outbox.add_message(websocket, {"type": "Error", "message": "Battle session has expired."})
                         else:
-                            await websocket.send_text(json.dumps([{"type": "Error", "message": "No active battle found for this companion."}]))
+                            outbox.add_message(websocket, {"type": "Error", "message": "No active battle found for this companion."})
                     except Exception as re:
                         logger.error(f"Resume Error: {re}")
                     finally:
@@ -781,9 +1190,9 @@ class GameServer:
                         db.add(new_companion)
                         db.commit()
                         
-                        user_session.companion_state.total_count += 1
-                        user_session.companion_state.active_count += 1
-                        user_session.companion_state.has_starter = True
+                        user_session.companion_total += 1
+                        user_session.companion_active += 1
+                        user_session.has_starter = True
 
                     # Persistence: Combat Updates
                     if isinstance(out_event, TurnProcessed):
@@ -797,15 +1206,11 @@ class GameServer:
                                 })
                                 db.commit()
 
-                    if isinstance(out_event, CombatAction) and out_event.action_type == "use_item":
-                        # Consume the item
-                        from app.models.item import Item as DBItem
-                        item = db.query(DBItem).filter(DBItem.id == out_event.item_id, DBItem.owner_id == user_id).first()
-                        if item:
-                            db.delete(item)
-                            db.commit()
+                        # Consumables used this turn: one unit off each stack
+                        self.consume_used_items(db, out_event)
 
                     if isinstance(out_event, CombatEnded):
+                        self.consumed_items.pop(out_event.combat_id, None)
                         # Reward coins if player won (winner_id != 0)
                         if out_event.winner_id != 0:
                             reward = out_event.loot.get("coins", 0) if out_event.loot else 0
@@ -836,15 +1241,7 @@ class GameServer:
                                     
                                     # Dropped Item Persistence
                                     if out_event.dropped_item:
-                                        from app.models.item import Item as DBItem
-                                        new_item = DBItem(
-                                            name=out_event.dropped_item.get("name"),
-                                            item_type=out_event.dropped_item.get("item_type"),
-                                            weapon_stats=out_event.dropped_item.get("stats"),
-                                            owner_id=user_id,
-                                            is_equipped=False
-                                        )
-                                        db.add(new_item)
+                                        grant(db, user_id, dropped_item_fields(out_event.dropped_item))
                                     
                                     db.commit()
 
@@ -913,9 +1310,13 @@ class GameServer:
                             # 1. Unsubscribe from old zone
                             if user_session.current_zone != out_event.zone_id:
                                 logger.info(f"Switching generic subscription from {user_session.current_zone} to {out_event.zone_id}")
-                                self.sync.unsubscribe(user_session.current_zone, websocket)
-                                self.sync.subscribe(out_event.zone_id, websocket)
-                                user_session.current_zone = out_event.zone_id
+                                await self.change_zone(websocket, user_session, out_event.zone_id, out_event.x, out_event.y)
+                            elif self.sync.presence.move(user_session.instance, user_id, out_event.x, out_event.y):
+                                await self.sync.broadcast(user_session.instance, {
+                                    "type": "PlayerMoved", "player_id": user_id, "username": user_session.username,
+                                    "zone_id": out_event.zone_id, "x": out_event.x, "y": out_event.y
+                                }, exclude=websocket)
+                                await self.stream_chunks(websocket, user_session, out_event.x, out_event.y, outbox)
 
 
                 # **Persistence: Save combat results to DB**
@@ -982,9 +1383,15 @@ class GameServer:
             
             # 5. Send Response
             for evt in output_events:
-                msg = evt.model_dump(mode='json')
-                msg["type"] = evt.__class__.__name__
-                await websocket.send_text(json.dumps(msg))
+                # Dumped once; each encoding is shared by every recipient that needs it
+                out = OutboundEvent(evt)
+                # PvP state is from the recipient's side: the defender gets it swapped
+                swap = isinstance(evt, TurnProcessed) and evt.mode == "pvp" and user_id == evt.defender_id
+                outbox.add(websocket, out.for_client(user_session, swap))
+
+                # Spectators: one encoding per side/log format, shared by every watcher
+                if isinstance(evt, (TurnProcessed, CombatEnded)):
+                    await self.spectators.publish(evt.combat_id, out)
                 
                 # **PvP: Broadcast combat events to opponent**
                 if isinstance(evt, (TurnProcessed, CombatEnded)) and evt.mode == "pvp":
@@ -997,34 +1404,13 @@ class GameServer:
                         if opp_sockets:
                             logger.info(f"Broadcasting {evt.__class__.__name__} to opponent {opp_id} ({len(opp_sockets)} sockets)")
                             for opp_ws in opp_sockets:
-                                try:
-                                    # Create a copy of the message for the opponent
-                                    opp_msg = msg.copy()
-                                    
-                                    # SWAP LOGIC for PvP
-                                    if msg["type"] == "TurnProcessed":
-                                        # For the opponent:
-                                        # 'attacker_hp' in the event is the ACTOR'S HP (User A)
-                                        # 'defender_hp' in the event is the TARGET'S HP (User B)
-                                        
-                                        # Swap HP values
-                                        opp_msg["attacker_hp"] = msg["defender_hp"]
-                                        opp_msg["defender_hp"] = msg["attacker_hp"]
-                                        
-                                        # Swap Status Effects
-                                        opp_msg["player_frozen_until"] = msg["enemy_frozen_until"]
-                                        opp_msg["enemy_frozen_until"] = msg["player_frozen_until"]
-                                        
-                                        opp_msg["player_stealth_until"] = msg["enemy_stealth_until"]
-                                        opp_msg["enemy_stealth_until"] = msg["player_stealth_until"]
-                                        
-                                    await opp_ws.send_text(json.dumps(opp_msg))
-                                except Exception as e:
-                                    logger.error(f"Failed to broadcast to opponent {opp_id}: {e}")
+                                outbox.add(opp_ws, out.for_client(self.active_connections.get(opp_ws), swap=opp_id == evt.defender_id))
                 
         except Exception as e:
             logger.error(f"Error processing message: {e}")
-            await websocket.send_text(json.dumps({"error": str(e)}))
+            outbox.add_message(websocket, {"error": str(e)})
+        finally:
+            await outbox.flush()
 
 game_server = GameServer()
 router = APIRouter()
@@ -1032,6 +1418,10 @@ router = APIRouter()
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     print("DEBUG: WebSocket connection attempt")
+    # During startup, hold the connection until maps and zone workers are up
+    if not await readiness.wait(WS_READY_TIMEOUT):
+        await websocket.close(code=1013)  # Try again later
+        return
     success = await game_server.connect(websocket)
     if not success:
         return # Socket already closed
@@ -15,8 +15,8 @@ class MockState:
 def test_encounters():
     processor = ExplorationProcessor()
     
-    print(f"Creatures Data Keys: {processor.creatures_data.keys()}")
-    print(f"Common Creatures Count: {len(processor.creatures_data.get('common_creatures', []))}")
+    print(f"Creatures Catalog Version: {processor.creatures.version}")
+    print(f"Common Creatures Count: {len(processor.creatures.common)}")
     
     # Simulate 100 steps in 'wild'
     encounters = 0
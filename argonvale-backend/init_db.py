@@ -1,6 +1,5 @@
-from app.db.session import Base, engine
-from app.models import User, Companion, Item
+from app.db.session import create_schema
 
 print("Creating database tables...")
-Base.metadata.create_all(bind=engine)
+create_schema()
 print("Tables created.")
@@ -0,0 +1,52 @@
+import sqlite3
+import sys
+
+# Stackable inventory: items.quantity and items.template_id, then one stack per owner and kind
+STACKABLE_TYPES = ("potion", "food", "utility")
+
+def migrate(db_path="argonvale.db"):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    for column, ddl in [
+        ("quantity", "ALTER TABLE items ADD COLUMN quantity INTEGER NOT NULL DEFAULT 1"),
+        ("template_id", "ALTER TABLE items ADD COLUMN template_id INTEGER REFERENCES items(id)"),
+    ]:
+        print(f"Checking for items.{column}...")
+        try:
+            cursor.execute(ddl)
+            print(f"Added items.{column}")
+        except sqlite3.OperationalError:
+            print(f"items.{column} already exists")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_items_template_id ON items (template_id)")
+
+    print("Linking copies to their templates by name...")
+    cursor.execute("""
+        UPDATE items SET template_id = (
+            SELECT MIN(t.id) FROM items t WHERE t.is_template = 1 AND t.name = items.name
+        )
+        WHERE is_template = 0 AND template_id IS NULL
+    """)
+    print(f"Linked {cursor.rowcount} items")
+
+    print("Merging stackable items into one stack per owner and kind...")
+    kinds = ",".join("?" for _ in STACKABLE_TYPES)
+    loose = f"""owner_id IS NOT NULL AND is_template = 0 AND trade_lot_id IS NULL AND trade_offer_id IS NULL
+                AND item_type IN ({kinds})"""
+    group = "owner_id, COALESCE(template_id, -1), name, rarity, item_type, is_equipped"
+    stacks = cursor.execute(f"""
+        SELECT MIN(id), SUM(quantity), COUNT(*) FROM items WHERE {loose}
+        GROUP BY {group} HAVING COUNT(*) > 1
+    """, STACKABLE_TYPES).fetchall()
+    cursor.executemany("UPDATE items SET quantity = ? WHERE id = ?", [(total, keep) for keep, total, _ in stacks])
+    cursor.execute(f"""
+        DELETE FROM items WHERE {loose} AND id NOT IN (SELECT MIN(id) FROM items WHERE {loose} GROUP BY {group})
+    """, STACKABLE_TYPES * 2)
+    print(f"Merged {cursor.rowcount} rows into {len(stacks)} stacks")
+
+    conn.commit()
+    conn.close()
+    print("Migration complete!")
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:])
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import sys
+
+# Owned copies reference their template (items.template_id, migrate_v11.py) and only keep
+# the columns they override; NULL means "the template's value"
+TEMPLATE_FIELDS = ("description", "image_url", "category", "price", "rarity", "is_consumable")
+TEMPLATE_JSON_FIELDS = ("weapon_stats", "effect")
+
+def migrate(db_path="argonvale.db"):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    size_before = os.path.getsize(db_path)
+
+    owned = "owner_id IS NOT NULL AND is_template = 0 AND template_id IS NOT NULL"
+    template = "SELECT {expr} FROM items t WHERE t.id = items.template_id"
+    print("Dropping copied template columns from owned items...")
+    for field in TEMPLATE_FIELDS:
+        cursor.execute(f"UPDATE items SET {field} = NULL WHERE {owned} AND {field} IS NOT NULL AND {field} IS ({template.format(expr='t.' + field)})")
+        print(f"  {field}: {cursor.rowcount} rows")
+    for field in TEMPLATE_JSON_FIELDS:
+        # json() compares the documents, not their formatting; JSON 'null' becomes SQL NULL
+        cursor.execute(f"""
+            UPDATE items SET {field} = NULL WHERE {owned} AND {field} IS NOT NULL
+            AND (json({field}) = 'null' OR json({field}) IS ({template.format(expr=f'json(t.{field})')}))
+        """)
+        print(f"  {field}: {cursor.rowcount} rows")
+    conn.commit()
+
+    print("Reclaiming space...")
+    cursor.execute("VACUUM")
+    conn.close()
+    print(f"Database: {size_before / 1024:.0f} KiB -> {os.path.getsize(db_path) / 1024:.0f} KiB")
+    print("Migration complete!")
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:])
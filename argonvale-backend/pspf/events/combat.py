@@ -24,7 +24,8 @@ class TurnProcessed(GameEvent):
     turn_number: int
     actor_id: int
     damage_dealt: int
-    description: str
+    log: List[Dict[str, Any]] = [] # Structured records (pspf.processors.combat_log)
+    description: str = "" # Rendered text for legacy clients
     attacker_hp: int
     defender_hp: int # In PvE, this is the monster
     
@@ -39,6 +40,8 @@ class TurnProcessed(GameEvent):
     player_stealth_until: int = 0
     enemy_stealth_until: int = 0
     used_item_ids: List[int] = []
+    item_uses: Dict[int, int] = {} # Uses of each consumable so far this battle (up to its stack's quantity)
+    state_version: int = 0 # Per-combat counter; delta frames are relative to an acknowledged version
 
 class CombatEnded(GameEvent):
     combat_id: str
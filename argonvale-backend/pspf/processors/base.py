@@ -1,7 +1,17 @@
+import hashlib
 from typing import List, Optional
 from pspf.events.base import GameEvent
 from pspf.state.base import GameState
 
+def derive_seed(*parts) -> int:
+    """
+    Derive a stable 64-bit RNG seed from the given parts (ids, event ids...).
+    Unlike hash(), this is identical across processes and restarts, so any
+    stream seeded with it can be replayed from the events alone.
+    """
+    key = ":".join(str(p) for p in parts).encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big")
+
 class BaseProcessor:
     def process(self, state: GameState, event: GameEvent) -> List[GameEvent]:
         """
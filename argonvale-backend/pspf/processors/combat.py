@@ -1,13 +1,126 @@
 import random
-from pspf.processors.base import BaseProcessor
+from pspf.processors.base import BaseProcessor, derive_seed
 from pspf.events.base import GameEvent
 from pspf.events.combat import CombatStarted, CombatAction, TurnProcessed, CombatEnded, ForfeitCombat
 from pspf.state.base import GameState
+from pspf.processors.combat_log import FROZEN, SPENT, HEAL, FREEZE, STEALTH, ATTACK, GUARD, render_log
+
+TYPE_CHART = {
+    "Fire": {"Wind": 1.25, "Water": 0.75},
+    "Wind": {"Earth": 1.25, "Fire": 0.75},
+    "Earth": {"Water": 1.25, "Wind": 0.75},
+    "Water": {"Fire": 1.25, "Earth": 0.75},
+    "Light": {"Shadow": 1.25},
+    "Shadow": {"Light": 1.25}
+}
+
+def _split_stats(item: dict):
+    stats = item.get("stats", {}) or {}
+    a_val = stats.get("atk", {}) or stats.get("attack", {})
+    d_val = stats.get("def", {}) or stats.get("defense", {})
+    return a_val, d_val
+
+def _normalize_icons(value) -> dict:
+    """Element-keyed icons with standardized case ("fire" -> "Fire"); bare numbers are Phys"""
+    if isinstance(value, dict):
+        icons = {}
+        for k, v in value.items():
+            k = k.capitalize()
+            icons[k] = icons.get(k, 0) + v
+        return icons
+    if isinstance(value, (int, float)):
+        return {"Phys": value}
+    return {}
+
+def _icon_sum(value):
+    if isinstance(value, dict): return sum(value.values())
+    if isinstance(value, (int, float)): return value
+    return 0
+
+def _typed_total(icons: dict, defender_element: str, type_chart: dict):
+    """Sum of attack icons with type advantage applied against one defender element"""
+    total = 0
+    for element, value in icons.items():
+        total += value * type_chart.get(element, {}).get(defender_element, 1.0)
+    return total
+
+class CompiledWeapon:
+    __slots__ = ("typed", "atk_sum", "def_icons", "freeze")
+
+    def __init__(self, typed: dict, atk_sum, def_icons, freeze):
+        self.typed = typed          # defender element -> type-adjusted attack total
+        self.atk_sum = atk_sum      # raw icon sum (reflect damage base)
+        self.def_icons = def_icons
+        self.freeze = freeze
+
+class CompiledLoadout:
+    """
+    A side's equipped gear compiled once at CombatStarted: id -> item map, selectable
+    weapons with attack totals pre-typed against each target element, and the
+    always-on armor/shield passives aggregated, so a turn is lookups and arithmetic.
+    """
+    __slots__ = ("items_by_id", "weapons", "passive_atk", "passive_atk_sum", "passive_def", "passive_freeze", "reflect")
+
+    def __init__(self, items: list, target_elements: tuple, type_chart: dict):
+        self.items_by_id = {}
+        self.weapons = {}  # id -> CompiledWeapon
+        self.passive_atk = {elem: 0 for elem in target_elements}
+        self.passive_atk_sum = 0
+        self.passive_def = 0
+        self.passive_freeze = 0
+        self.reflect = 0
+
+        for item in items:
+            item_id = item.get("id")
+            self.items_by_id.setdefault(item_id, item)
+            item_type = item.get("item_type")
+            if item_type not in ["weapon", "armor", "shield"]:
+                continue
+            a_val, d_val = _split_stats(item)
+            icons = _normalize_icons(a_val)
+            eff = item.get("effect", {}) or {}
+            freeze = eff.get("chance", 0) if eff.get("type") == "freeze" else 0
+
+            if item_type == "weapon":
+                self.weapons[item_id] = CompiledWeapon(
+                    {elem: _typed_total(icons, elem, type_chart) for elem in target_elements},
+                    _icon_sum(a_val), _icon_sum(d_val), freeze
+                )
+            else:
+                for elem in target_elements:
+                    self.passive_atk[elem] += _typed_total(icons, elem, type_chart)
+                self.passive_atk_sum += _icon_sum(a_val)
+                self.passive_def += _icon_sum(d_val)
+                self.passive_freeze = max(self.passive_freeze, freeze)
+                if eff.get("type") == "reflect":
+                    self.reflect = max(self.reflect, eff.get("chance", 0))
+
+    def selected_weapons(self, selected_ids) -> list:
+        return [self.weapons[i] for i in dict.fromkeys(selected_ids) if i in self.weapons]
+
+# Context keys the session models as fields; everything else (names, images...) is kept
+# in context_extras so to_start_event can rebuild the context without storing a copy of it.
+CONTEXT_FIELDS = ("companion_id", "player_hp", "player_max_hp", "player_stats",
+                  "enemy_name", "enemy_hp", "enemy_max_hp", "enemy_stats",
+                  "enemy_weapons", "enemy_items", "equipped_items", "state_version", "used_item_ids",
+                  "player_frozen_until", "enemy_frozen_until", "player_stealth_until", "enemy_stealth_until")
 
 # Simple in-memory state for this MVP. 
 # In production, this would be reconstructed from event stream or a Snapshot store.
 class CombatSession:
-    def __init__(self, event: CombatStarted):
+    # Slotted: one of these lives per active battle
+    __slots__ = (
+        "combat_id", "attacker_id", "attacker_companion_id", "defender_id", "defender_companion_id", "mode",
+        "player_element", "enemy_element", "companion_id", "player_hp", "player_max_hp", "player_stats",
+        "enemy_name", "enemy_hp", "enemy_max_hp", "enemy_stats", "enemy_weapons", "enemy_items", "equipped_items",
+        "turn", "state_version", "player_frozen_until", "enemy_frozen_until", "player_stealth_until", "enemy_stealth_until",
+        "used_item_ids", "item_uses", "pending_actions", "current_turn_player", "turn_start_time", "is_locked",
+        "context_extras", "rng_seed", "_rng", "type_chart", "player_element_key", "enemy_element_key",
+        "player_gear", "enemy_passive_def", "enemy_passive_reflect", "enemy_gear_reflect", "ai_options",
+        "enemy_item_names", "player_item_names", "current_player_def", "current_stance_def_mod",
+    )
+
+    def __init__(self, event: CombatStarted, type_chart: dict = TYPE_CHART):
         self.combat_id = event.combat_id
         self.attacker_id = event.attacker_id
         self.attacker_companion_id = event.attacker_companion_id
@@ -30,11 +143,13 @@ class CombatSession:
         self.enemy_hp = event.context.get("enemy_hp", 50)
         self.enemy_max_hp = event.context.get("enemy_max_hp", 50)
         self.enemy_stats = event.context.get("enemy_stats", {"STR": 5, "DEF": 2})
-        self.enemy_weapons = event.context.get("enemy_weapons", [])
-        self.enemy_items = event.context.get("enemy_items", [])
+        # Copied: the AI consumes enemy_items, and the start event must stay replayable
+        self.enemy_weapons = list(event.context.get("enemy_weapons", []))
+        self.enemy_items = list(event.context.get("enemy_items", []))
         self.equipped_items = event.context.get("equipped_items", [])
 
         self.turn = 1
+        self.state_version = 0  # bumped for every TurnProcessed
         
         # Status Effects (Turn number until which the effect lasts)
         self.player_frozen_until = 0
@@ -42,31 +157,123 @@ class CombatSession:
         self.player_stealth_until = 0
         self.enemy_stealth_until = 0
         
-        # Tracking for used consumables (one-time use per battle)
-        self.used_item_ids = set()
+        # Tracking for used consumables: a stack can be used up to its quantity per battle
+        self.item_uses = {}  # {item_id: uses so far}
+        self.used_item_ids = set()  # stacks with no uses left
         
         # PvP: Real-time synchronization state
         self.pending_actions = {}  # {player_id: CombatAction} - collect actions from both players
         self.current_turn_player = event.attacker_id if event.mode == "pvp" else None  # Whose turn it is
         self.turn_start_time = None  # Timestamp when turn started (for timeout)
         self.is_locked = False  # Prevent concurrent action processing
-        self.initial_context = event.context # Save initial context for resumption
+        # Unmodeled context (names, images...) for resumption; modeled keys come from the fields
+        self.context_extras = {k: v for k, v in event.context.items() if k not in CONTEXT_FIELDS}
+
+        # Per-session RNG: seeded from the combat id and the start event so a battle
+        # can be replayed bit-for-bit from its events, independent of other sessions.
+        self.rng_seed = derive_seed(event.combat_id, event.event_id)
+        self._rng = None  # created on the first roll: a Mersenne Twister state is ~2.5 KB
+
+        # Compiled loadouts: built once here instead of rescanning gear lists every turn
+        self.type_chart = type_chart
+        self.player_element_key = self.player_element.capitalize()
+        self.enemy_element_key = self.enemy_element.capitalize()
+        self.player_gear = CompiledLoadout(self.equipped_items, (self.enemy_element_key, self.player_element_key), type_chart)
+        self._compile_enemy()
+        # Names of everything the enemy started with: log records keep ids of items the AI used up
+        self.enemy_item_names = {item.get("id"): item.get("name") for item in self.enemy_weapons + self.enemy_items}
+        self.player_item_names = None  # built on the first describe()
+
+    def _compile_enemy(self):
+        """Aggregate enemy passives and build the AI option table (re-run when enemy_items changes)"""
+        self.enemy_passive_def = 0
+        self.enemy_passive_reflect = 0
+        for item in self.enemy_items:
+            if item.get("item_type") in ["armor", "shield"]:
+                self.enemy_passive_def += _icon_sum(_split_stats(item)[1])
+                eff = item.get("effect", {}) or {}
+                if eff.get("type") == "reflect":
+                    self.enemy_passive_reflect = max(self.enemy_passive_reflect, eff.get("chance", 0))
+
+        # PvP reflect reads the opponent's whole equipped list
+        self.enemy_gear_reflect = 0
+        for item in self.enemy_weapons + self.enemy_items:
+            eff = item.get("effect", {}) or {}
+            if item.get("item_type") in ["armor", "shield"] and eff.get("type") == "reflect":
+                self.enemy_gear_reflect = max(self.enemy_gear_reflect, eff.get("chance", 0))
+
+        # AI options: strongest two attack pieces, or strongest two defensive pieces
+        weapon_pool, defensive_pool = [], []
+        for item in self.enemy_weapons + self.enemy_items:
+            if not item.get("stats"): continue
+            a_val, d_val = _split_stats(item)
+            atk_sum, def_sum = _icon_sum(a_val), _icon_sum(d_val)
+            typed = _typed_total(_normalize_icons(a_val), self.player_element_key, self.type_chart)
+            if atk_sum > 0: weapon_pool.append((atk_sum, typed, item.get("id")))
+            if def_sum > 0: defensive_pool.append((def_sum, typed, item.get("id")))
+        weapon_pool.sort(key=lambda x: x[0], reverse=True)
+        defensive_pool.sort(key=lambda x: x[0], reverse=True)
+        self.ai_options = {
+            "weapon": (sum(o[1] for o in weapon_pool[:2]), [o[2] for o in weapon_pool[:2]]),
+            "defensive": (sum(o[1] for o in defensive_pool[:2]), [o[2] for o in defensive_pool[:2]]),
+        }
+
+    @property
+    def rng(self) -> random.Random:
+        if self._rng is None:
+            self._rng = random.Random(self.rng_seed)
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng):
+        self._rng = rng
+
+    def use_item(self, item: dict):
+        """Counts a use of a consumable; its stack is spent once its quantity is used"""
+        uses = self.item_uses[item["id"]] = self.item_uses.get(item["id"], 0) + 1
+        if uses >= item.get("quantity", 1):
+            self.used_item_ids.add(item["id"])
+
+    def describe(self, log: list) -> str:
+        """Render a turn's log records as text (legacy clients)"""
+        if self.player_item_names is None:
+            self.player_item_names = {item_id: item.get("name") for item_id, item in self.player_gear.items_by_id.items()}
+        return render_log(log, self.mode, self.enemy_name, self.player_item_names, self.enemy_item_names)
 
     def to_start_event(self, for_user_id: int) -> CombatStarted:
         """Create a CombatStarted event from current session state for resumption"""
         # Determine if the user is attacker or defender to swap context as needed
         is_p1 = (for_user_id == self.attacker_id)
         
-        ctx = self.initial_context.copy()
+        ctx = self.context_extras.copy()
+        ctx.update({
+            "player_max_hp": self.player_max_hp,
+            "player_stats": self.player_stats,
+            "enemy_name": self.enemy_name,
+            "enemy_max_hp": self.enemy_max_hp,
+            "enemy_stats": self.enemy_stats,
+            "enemy_weapons": self.enemy_weapons,
+            "enemy_items": list(self.enemy_items),  # minus what the AI has used up
+            "equipped_items": self.equipped_items,
+        })
+        if self.companion_id is not None:
+            ctx["companion_id"] = self.companion_id
         # Update dynamic values
         if is_p1:
             ctx["player_hp"] = self.player_hp
             ctx["enemy_hp"] = self.enemy_hp
+            ctx["player_frozen_until"], ctx["enemy_frozen_until"] = self.player_frozen_until, self.enemy_frozen_until
+            ctx["player_stealth_until"], ctx["enemy_stealth_until"] = self.player_stealth_until, self.enemy_stealth_until
         else:
             ctx["player_hp"] = self.enemy_hp
             ctx["enemy_hp"] = self.player_hp
+            ctx["player_frozen_until"], ctx["enemy_frozen_until"] = self.enemy_frozen_until, self.player_frozen_until
+            ctx["player_stealth_until"], ctx["enemy_stealth_until"] = self.enemy_stealth_until, self.player_stealth_until
             
         ctx["turn_number"] = self.turn
+        # Full snapshot: the baseline later delta frames are encoded against
+        ctx["state_version"] = self.state_version
+        ctx["used_item_ids"] = list(self.used_item_ids)
         ctx["resumed"] = True
         
         return CombatStarted.create(
@@ -80,51 +287,43 @@ class CombatSession:
         )
 
 class CombatProcessor(BaseProcessor):
-    def __init__(self):
+    def __init__(self, text_log: bool = True):
         super().__init__()
         self.sessions = {} # combat_id -> CombatSession
-        self.TYPE_CHART = {
-            "Fire": {"Wind": 1.25, "Water": 0.75},
-            "Wind": {"Earth": 1.25, "Fire": 0.75},
-            "Earth": {"Water": 1.25, "Wind": 0.75},
-            "Water": {"Fire": 1.25, "Earth": 0.75},
-            "Light": {"Shadow": 1.25},
-            "Shadow": {"Light": 1.25}
-        }
+        # Also render TurnProcessed.description from the log records (legacy clients)
+        self.text_log = text_log
+        self.TYPE_CHART = TYPE_CHART
 
     def get_session(self, combat_id: str) -> CombatSession:
         return self.sessions.get(combat_id)
 
-    def calculate_damage(self, attacker_icons: dict, defender_def: int, defender_element: str, stance_atk_mod: float, stance_def_mod: float, defender_stealth: bool) -> tuple[int, bool]:
+    def calculate_damage(self, attacker_icons: dict, defender_def: int, defender_element: str, stance_atk_mod: float, stance_def_mod: float, defender_stealth: bool, rng: random.Random = None) -> tuple[int, bool]:
         """
         Calculates damage based on attacker icons (dict of types) and defender stats.
         Includes Type Advantage logic.
+        Rolls are drawn from `rng` (the session's stream); the global module is only a fallback.
         """
+        # Elemental Calculation with Type Advantage (standardized case)
+        icons = _normalize_icons(attacker_icons)
+        total_dmg = _typed_total(icons, defender_element.capitalize(), self.TYPE_CHART)
+        return self._roll_damage(total_dmg, defender_def, stance_atk_mod, stance_def_mod, defender_stealth, rng)
+
+    def _roll_damage(self, total_dmg, defender_def: int, stance_atk_mod: float, stance_def_mod: float, defender_stealth: bool, rng: random.Random = None) -> tuple[int, bool]:
+        """Apply crit, variance and mitigation to an already type-adjusted attack total"""
         if defender_stealth:
             return 0, False
+        if rng is None:
+            rng = random
     
         # 1. Critical Hit (5% chance)
-        is_crit = random.random() < 0.05
+        is_crit = rng.random() < 0.05
         crit_mult = 1.5 if is_crit else 1.0
     
         # 2. Variance (0.9 to 1.1)
-        variance = random.uniform(0.9, 1.1)
+        variance = rng.uniform(0.9, 1.1)
     
         # 3. Defense Mitigation
         mitigation = 20 / (20 + (defender_def * stance_def_mod))
-        
-        # 4. Elemental Calculation with Type Advantage
-        total_dmg = 0
-        for element, value in attacker_icons.items():
-            # Standardize case
-            element = element.capitalize()
-            defender_element = defender_element.capitalize()
-            
-            mult = 1.0
-            if element in self.TYPE_CHART:
-                mult = self.TYPE_CHART[element].get(defender_element, 1.0)
-            
-            total_dmg += value * mult
             
         final_dmg = total_dmg * mitigation * stance_atk_mod * variance * crit_mult
         
@@ -134,7 +333,10 @@ class CombatProcessor(BaseProcessor):
         events = []
     
         if isinstance(event, CombatStarted):
-            session = CombatSession(event)
+            # A resume snapshot must not reset the live session (and its RNG stream)
+            if event.context.get("resumed") and event.combat_id in self.sessions:
+                return []
+            session = CombatSession(event, self.TYPE_CHART)
             self.sessions[session.combat_id] = session
         
         elif isinstance(event, CombatAction):
@@ -169,13 +371,13 @@ class CombatProcessor(BaseProcessor):
     
             # 1. Player Turn
             damage_dealt = 0
-            log = ""
+            log = []
             ai_turn_skipped = False
             player_turn_skipped = False
     
             # Check if Player is Frozen
             if session.turn <= session.player_frozen_until:
-                log = "You are frozen and cannot move!"
+                log.append({"a": FROZEN})
                 player_turn_skipped = True
             else:
                 # --- Unified Action Logic ---
@@ -186,16 +388,13 @@ class CombatProcessor(BaseProcessor):
                 if not selected_ids and getattr(event, 'item_id', None):
                     selected_ids = [event.item_id]
     
-                item_logs = []
-                # Icons by type for the advantage system
+                gear = session.player_gear
                 base_str = session.player_stats.get("str", 10)
                 base_def = session.player_stats.get("def", 5)
-                atk_icons_dict = {"Phys": base_str}
-                def_icons = 0
                 
                 # 1. Process selected items for immediate effects (Consumables)
                 for item_id in selected_ids:
-                    item = next((i for i in session.equipped_items if i.get("id") == item_id), None)
+                    item = gear.items_by_id.get(item_id)
                     if not item: continue
                     
                     # Weapons/Shields/Armor are NOT consumables here
@@ -204,7 +403,7 @@ class CombatProcessor(BaseProcessor):
     
                     # Consumable Logic
                     if item_id in session.used_item_ids:
-                        item_logs.append(f"{item.get('name')} is already spent!")
+                        log.append({"a": SPENT, "i": item_id})
                         continue
     
                     stats = item.get("stats", {})
@@ -217,67 +416,39 @@ class CombatProcessor(BaseProcessor):
                     
                     if restore_amt > 0:
                         session.player_hp = min(session.player_hp + restore_amt, session.player_max_hp)
-                        item_logs.append(f"Used {item.get('name')} to restore {restore_amt} HP.")
+                        log.append({"a": HEAL, "i": item_id, "v": restore_amt})
     
                     # Freeze
                     if effect.get("type") == "freeze":
                         chance = effect.get("chance", 1.0)
-                        if random.random() <= chance:
+                        ok = session.rng.random() <= chance
+                        if ok:
                             duration = effect.get("duration", 1)
                             session.enemy_frozen_until = session.turn + duration
-                            item_logs.append(f"Used {item.get('name')} and FROZE the opponent!")
-                        else:
-                            item_logs.append(f"Used {item.get('name')} but it failed to freeze.")
+                        log.append({"a": FREEZE, "i": item_id, "ok": ok})
     
                     # Stealth
                     if effect.get("type") == "stealth":
                         chance = effect.get("chance", 1.0)
-                        if random.random() <= chance:
+                        ok = session.rng.random() <= chance
+                        if ok:
                             duration = effect.get("duration", 1)
                             session.player_stealth_until = session.turn + duration
-                            item_logs.append(f"Used {item.get('name')} and became INVISIBLE!")
-                        else:
-                            item_logs.append(f"Used {item.get('name')} but it failed to hide you.")
-    
-                    # Mark as used (consumables only)
-                    session.used_item_ids.add(item_id)
+                        log.append({"a": STEALTH, "i": item_id, "ok": ok})
     
-                # 2. Calculate Damage/Defense from Gear
-                freeze_chance_total = 0
+                    # Count the use (consumables only)
+                    session.use_item(item)
     
-                for item in session.equipped_items:
-                    # Passives (Armor/Shield) are always on, Weapons must be selected
-                    is_weapon = item.get("item_type") == "weapon"
-                    is_passive = item.get("item_type") in ["armor", "shield"]
-                    
-                    if (is_weapon and item.get("id") in selected_ids) or is_passive:
-                        stats = item.get("stats", {})
-                        a_val = stats.get("atk", {}) or stats.get("attack", {})
-                        d_val = stats.get("def", {}) or stats.get("defense", {})
-                        
-                        if isinstance(a_val, dict):
-                            for k, v in a_val.items():
-                                atk_icons_dict[k.capitalize()] = atk_icons_dict.get(k.capitalize(), 0) + v
-                        elif isinstance(a_val, (int, float)):
-                            atk_icons_dict["Phys"] = atk_icons_dict.get("Phys", 0) + a_val
-                        
-                        if isinstance(d_val, dict): def_icons += sum(d_val.values())
-                        elif isinstance(d_val, (int, float)): def_icons += d_val
-                        
-                        # Weapon-based Freeze (only if NOT already used/triggered)
-                        eff = item.get("effect", {})
-                        if eff.get("type") == "freeze" and item.get("id") not in session.used_item_ids:
-                            freeze_chance_total = max(freeze_chance_total, eff.get("chance", 0))
+                # 2. Damage/Defense from Gear: passives (Armor/Shield) are always on, Weapons must be selected
+                weapons = gear.selected_weapons(selected_ids)
+                enemy_key = session.enemy_element_key
+                atk_total = base_str + gear.passive_atk[enemy_key] + sum(w.typed[enemy_key] for w in weapons)
+                atk_raw = base_str + gear.passive_atk_sum + sum(w.atk_sum for w in weapons)
+                current_player_def = base_def + gear.passive_def + sum(w.def_icons for w in weapons)
+                freeze_chance_total = max([gear.passive_freeze] + [w.freeze for w in weapons])
 
                 # --- DEFENDER REFLECT (PvE) ---
-                reflect_chance = 0
-                for item in session.enemy_items:
-                    if item.get("item_type") in ["armor", "shield"]:
-                        eff = item.get("effect", {})
-                        if eff.get("type") == "reflect":
-                            reflect_chance = max(reflect_chance, eff.get("chance", 0))
-
-                current_player_def = base_def + def_icons
+                reflect_chance = session.enemy_passive_reflect
     
                 # 3. Apply Stance Modifiers
                 stance_atk_mod = 1.0
@@ -288,50 +459,43 @@ class CombatProcessor(BaseProcessor):
                     stance_atk_mod, stance_def_mod = 0.8, 1.2
     
                 # 4. Final Damage Calculation
-                enemy_def = session.enemy_stats.get("DEF", 5)
-                ai_def_icons = 0
-                for i in session.enemy_items:
-                    if i.get("item_type") in ["armor", "shield"]:
-                        d_v = i.get("stats", {}).get("def", {}) or i.get("stats", {}).get("defense", {})
-                        if isinstance(d_v, dict): ai_def_icons += sum(d_v.values())
-                        elif isinstance(d_v, (int, float)): ai_def_icons += d_v
-                
-                total_enemy_def = enemy_def + ai_def_icons
+                total_enemy_def = session.enemy_stats.get("DEF", 5) + session.enemy_passive_def
                 enemy_stealth = session.turn <= session.enemy_stealth_until
                 
-                damage_dealt, crit = self.calculate_damage(atk_icons_dict, total_enemy_def, session.enemy_element, stance_atk_mod, 1.0, enemy_stealth)
+                damage_dealt, crit = self._roll_damage(atk_total, total_enemy_def, stance_atk_mod, 1.0, enemy_stealth, session.rng)
                 session.enemy_hp -= damage_dealt
                 
-                # 5. Composite Log
-                crit_text = "CRITICAL HIT! " if crit else ""
+                # 5. Attack record
+                atk_log = {"a": ATTACK, "i": list(selected_ids), "st": event.stance, "v": damage_dealt}
+                if crit:
+                    atk_log["crit"] = True
                 if enemy_stealth:
-                    atk_log = "You attack, but the enemy is invisible!"
+                    atk_log["hid"] = True
                 else:
-                    item_names = [next((i.get("name") for i in session.equipped_items if i.get("id") == iid), "item") for iid in selected_ids]
-                    using_text = f" using {', '.join(item_names)}" if item_names else ""
-                    atk_log = f"{crit_text}In {event.stance} stance{using_text}, you deal {damage_dealt} damage!"
-                    if freeze_chance_total > 0 and random.random() <= freeze_chance_total:
+                    if freeze_chance_total > 0 and session.rng.random() <= freeze_chance_total:
                         session.enemy_frozen_until = session.turn + 1
-                        atk_log += " The blow FROZE your opponent!"
+                        atk_log["froze"] = True
                     
                     # Apply Reflection if triggered
-                    if reflect_chance > 0 and random.random() <= reflect_chance:
-                        reflected_dmg = int(sum(atk_icons_dict.values()) * 0.5)
+                    if reflect_chance > 0 and session.rng.random() <= reflect_chance:
+                        reflected_dmg = int(atk_raw * 0.5)
                         # Mitigate by player's own defense? Or just direct? Plan said direct.
                         session.player_hp -= reflected_dmg
-                        atk_log += f" The enemy REFLECTED {reflected_dmg} damage back to you!"
-    
-                log = " ".join(item_logs) + (" " if item_logs else "") + atk_log
+                        atk_log["r"] = reflected_dmg
+                log.append(atk_log)
                 
                 session.current_player_def = current_player_def
                 session.current_stance_def_mod = stance_def_mod
     
+            session.state_version += 1
             events.append(TurnProcessed.create(
                 combat_id=session.combat_id,
+                state_version=session.state_version,
                 turn_number=session.turn,
                 actor_id=event.actor_id,
                 damage_dealt=damage_dealt,
-                description=log,
+                log=log,
+                description=session.describe(log) if self.text_log else "",
                 attacker_hp=session.player_hp,
                 defender_hp=session.enemy_hp,
                 attacker_id=session.attacker_id,
@@ -341,14 +505,15 @@ class CombatProcessor(BaseProcessor):
                 enemy_frozen_until=session.enemy_frozen_until,
                 player_stealth_until=session.player_stealth_until,
                 enemy_stealth_until=session.enemy_stealth_until,
-                used_item_ids=list(session.used_item_ids)
+                used_item_ids=list(session.used_item_ids),
+                item_uses=dict(session.item_uses)
             ))
     
             if session.enemy_hp <= 0:
                 xp_gain = (session.enemy_stats.get("STR", 5) * 2) + 10
                 dropped = None
-                if random.random() < 0.25 and session.enemy_items:
-                    dropped = random.choice(session.enemy_items)
+                if session.rng.random() < 0.25 and session.enemy_items:
+                    dropped = session.rng.choice(session.enemy_items)
                 
                 events.append(CombatEnded.create(
                     combat_id=session.combat_id,
@@ -358,7 +523,7 @@ class CombatProcessor(BaseProcessor):
                     defender_id=session.defender_id,
                     defender_companion_id=session.defender_companion_id,
                     mode=session.mode,
-                    loot={"coins": random.randint(15, 30)},
+                    loot={"coins": session.rng.randint(15, 30)},
                     dropped_item=dropped,
                     xp_gained=xp_gain
                 ))
@@ -367,11 +532,11 @@ class CombatProcessor(BaseProcessor):
     
             # 2. AI Turn
             ai_final_dmg = 0
-            ai_action_log = ""
+            ai_action_log = None
             
             # Check if AI is Frozen
             if session.turn <= session.enemy_frozen_until:
-                ai_action_log = f"{session.enemy_name} is frozen and skips its turn!"
+                ai_action_log = {"a": FROZEN, "s": 1}
                 ai_turn_skipped = True
             else:
                 ai_str = session.enemy_stats.get("STR", 5)
@@ -379,7 +544,7 @@ class CombatProcessor(BaseProcessor):
                 stance_def_mod = getattr(session, 'current_stance_def_mod', 1.0)
                 
                 hp_percent = (session.enemy_hp / session.enemy_max_hp) * 100
-                rand = random.random()
+                rand = session.rng.random()
                 
                 # Player Stealth check
                 player_stealth = session.turn <= session.player_stealth_until
@@ -390,8 +555,9 @@ class CombatProcessor(BaseProcessor):
                     if hp_percent < 40 and heal_item:
                         restore = heal_item.get("value", 20)
                         session.enemy_hp = min(session.enemy_hp + restore, session.enemy_max_hp)
-                        ai_action_log = f"{session.enemy_name} used {heal_item.get('name')} and restored {restore} HP!"
+                        ai_action_log = {"a": HEAL, "s": 1, "i": heal_item.get("id"), "v": restore}
                         session.enemy_items.remove(heal_item)
+                        session._compile_enemy()
                     else:
                         # NEW: AI uses Stealth or Freeze items if they have them
                         status_item = next((i for i in session.enemy_items if i.get("type") in ["stealth", "freeze"] or i.get("effect", {}).get("type") in ["stealth", "freeze"]), None)
@@ -400,93 +566,56 @@ class CombatProcessor(BaseProcessor):
                             stype = eff.get("type") or status_item.get("type")
                             chance = eff.get("chance", 1.0)
                             
-                            if random.random() <= chance:
+                            if session.rng.random() <= chance:
                                 duration = eff.get("duration", 1)
                                 if stype == "stealth":
                                     session.enemy_stealth_until = session.turn + duration
-                                    ai_action_log = f"{session.enemy_name} used {status_item.get('name')} and vanished from sight!"
+                                    ai_action_log = {"a": STEALTH, "s": 1, "i": status_item.get("id"), "ok": True}
                                 elif stype == "freeze":
                                     session.player_frozen_until = session.turn + duration
-                                    ai_action_log = f"{session.enemy_name} used {status_item.get('name')} and FROZE you!"
+                                    ai_action_log = {"a": FREEZE, "s": 1, "i": status_item.get("id"), "ok": True}
                             else:
-                                ai_action_log = f"{session.enemy_name} tried to use {status_item.get('name')} but it failed!"
+                                ai_action_log = {"a": FREEZE if stype == "freeze" else STEALTH, "s": 1, "i": status_item.get("id"), "ok": False}
                             session.enemy_items.remove(status_item)
+                            session._compile_enemy()
                         else:
                             rand = 0.5 
                 
-                if ai_action_log == "":
+                if ai_action_log is None:
                     ai_stances = ["normal", "berserk", "defensive"]
-                    ai_stance = random.choice(ai_stances)
+                    ai_stance = session.rng.choice(ai_stances)
                     
                     ai_atk_mod, ai_def_mod = 1.0, 1.0
                     if ai_stance == "berserk": ai_atk_mod, ai_def_mod = 1.2, 0.8
                     elif ai_stance == "defensive": ai_atk_mod, ai_def_mod = 0.8, 1.2
     
-                    ai_atk_icons_dict = {"Phys": ai_str}
-                    ai_def_icons = 0
-                    weapon_pool, defensive_pool = [], []
-                    
-                    all_gear = session.enemy_weapons + session.enemy_items
-                    for item in all_gear:
-                        stats = item.get("stats", {})
-                        if not stats: continue
-                        
-                        a_val = stats.get("atk", {}) or stats.get("attack", {})
-                        d_val = stats.get("def", {}) or stats.get("defense", {})
-                        
-                        atk_sum = 0
-                        if isinstance(a_val, dict): atk_sum = sum(a_val.values())
-                        elif isinstance(a_val, (int, float)): atk_sum = a_val
-                        
-                        def_sum = 0
-                        if isinstance(d_val, dict): def_sum = sum(d_val.values())
-                        elif isinstance(d_val, (int, float)): def_sum = d_val
-                        
-                        if atk_sum > 0: weapon_pool.append({"item": item, "atk": atk_sum, "atk_dict": a_val if isinstance(a_val, dict) else {"Phys": a_val}, "def": def_sum})
-                        if def_sum > 0: defensive_pool.append({"item": item, "def": def_sum, "atk_dict": a_val if isinstance(a_val, dict) else {"Phys": a_val or 0}, "atk": atk_sum})
-    
                     if rand < 0.40:
                         ai_stance = "defensive"
                         ai_atk_mod, ai_def_mod = 0.8, 1.2
-                        defensive_pool.sort(key=lambda x: x["def"], reverse=True)
-                        selected = defensive_pool[:2]
-                        for s in selected:
-                            ai_def_icons += s["def"]
-                            adict = s["atk_dict"]
-                            for k, v in adict.items():
-                                ai_atk_icons_dict[k.capitalize()] = ai_atk_icons_dict.get(k.capitalize(), 0) + v
-                        
-                        ai_final_dmg, ai_crit = self.calculate_damage(ai_atk_icons_dict, player_def, session.player_element, ai_atk_mod, stance_def_mod, player_stealth)
+                        ai_atk, item_ids = session.ai_options["defensive"]
+                        ai_final_dmg, ai_crit = self._roll_damage(ai_str + ai_atk, player_def, ai_atk_mod, stance_def_mod, player_stealth, session.rng)
                         session.player_hp -= ai_final_dmg
-                        names = [s["item"].get("name") for s in selected]
-                        using_text = f" with its {', '.join(names)}" if names else ""
-                        ai_action_log = f"{session.enemy_name} takes a defensive stance{using_text}, dealing {ai_final_dmg} damage!"
+                        ai_action_log = {"a": GUARD, "s": 1, "i": item_ids, "v": ai_final_dmg}
                     else:
-                        weapon_pool.sort(key=lambda x: x["atk"], reverse=True)
-                        selected = weapon_pool[:2]
-                        for s in selected:
-                            adict = s["atk_dict"]
-                            for k, v in adict.items():
-                                ai_atk_icons_dict[k.capitalize()] = ai_atk_icons_dict.get(k.capitalize(), 0) + v
-                            ai_def_icons += s["def"]
-                        
-                        ai_final_dmg, ai_crit = self.calculate_damage(ai_atk_icons_dict, player_def, session.player_element, ai_atk_mod, stance_def_mod, player_stealth)
+                        ai_atk, item_ids = session.ai_options["weapon"]
+                        ai_final_dmg, ai_crit = self._roll_damage(ai_str + ai_atk, player_def, ai_atk_mod, stance_def_mod, player_stealth, session.rng)
                         session.player_hp -= ai_final_dmg
-                        crit_text = "CRITICAL! " if ai_crit else ""
-                        stance_text = f" in {ai_stance} stance" if ai_stance != "normal" else ""
-                        wp_names = [s["item"].get("name") for s in selected]
-                        using_text = f" using {', '.join(wp_names)}" if wp_names else ""
-                        ai_action_log = f"{crit_text}{session.enemy_name} attacks{stance_text}{using_text} for {ai_final_dmg} damage!"
+                        ai_action_log = {"a": ATTACK, "s": 1, "i": item_ids, "st": ai_stance, "v": ai_final_dmg}
+                        if ai_crit:
+                            ai_action_log["crit"] = True
                     
                     if player_stealth:
-                        ai_action_log = f"{session.enemy_name} tried to attack, but you are invisible and took 0 damage!"
+                        ai_action_log["hid"] = True
     
+            session.state_version += 1
             events.append(TurnProcessed.create(
                 combat_id=session.combat_id,
+                state_version=session.state_version,
                 turn_number=session.turn,
                 actor_id=0,
                 damage_dealt=ai_final_dmg,
-                description=ai_action_log,
+                log=[ai_action_log],
+                description=session.describe([ai_action_log]) if self.text_log else "",
                 attacker_id=session.attacker_id,
                 defender_id=session.defender_id,
                 mode=session.mode,
@@ -495,7 +624,9 @@ class CombatProcessor(BaseProcessor):
                 player_frozen_until=session.player_frozen_until,
                 enemy_frozen_until=session.enemy_frozen_until,
                 player_stealth_until=session.player_stealth_until,
-                enemy_stealth_until=session.enemy_stealth_until
+                enemy_stealth_until=session.enemy_stealth_until,
+                used_item_ids=list(session.used_item_ids),
+                item_uses=dict(session.item_uses)
             ))
     
             if session.player_hp <= 0:
@@ -504,7 +635,9 @@ class CombatProcessor(BaseProcessor):
                     combat_id=session.combat_id,
                     winner_id=0,
                     attacker_id=session.attacker_id,
+                    attacker_companion_id=session.attacker_companion_id,
                     defender_id=session.defender_id,
+                    defender_companion_id=session.defender_companion_id,
                     mode=session.mode,
                     xp_gained=0
                 ))
@@ -558,15 +691,18 @@ class CombatProcessor(BaseProcessor):
         session.player_hp -= p2_damage
         
         # Combined log
-        combined_log = f"{p1_log} | {p2_log}"
+        combined_log = p1_log + p2_log
         
         # Create turn event
+        session.state_version += 1
         turn_event = TurnProcessed.create(
             combat_id=session.combat_id,
+            state_version=session.state_version,
             turn_number=session.turn,
             actor_id=session.attacker_id,
             damage_dealt=p1_damage,
-            description=combined_log,
+            log=combined_log,
+            description=session.describe(combined_log) if self.text_log else "",
             attacker_hp=session.player_hp,
             defender_hp=session.enemy_hp,
             attacker_id=session.attacker_id,
@@ -576,7 +712,8 @@ class CombatProcessor(BaseProcessor):
             enemy_frozen_until=session.enemy_frozen_until,
             player_stealth_until=session.player_stealth_until,
             enemy_stealth_until=session.enemy_stealth_until,
-            used_item_ids=list(p1_used_items | p2_used_items)
+            used_item_ids=list(p1_used_items | p2_used_items),
+            item_uses=dict(session.item_uses)
         )
         
         events.append(turn_event)
@@ -630,9 +767,9 @@ class CombatProcessor(BaseProcessor):
         return events
     
     def _calculate_action_result(self, session: 'CombatSession', action: 'CombatAction', is_attacker: bool) -> tuple:
-        """Calculate damage from a player's action. Returns (damage, log, used_items_set)"""
+        """Calculate damage from a player's action. Returns (damage, log records, used_items_set)"""
         damage = 0
-        logs = []
+        side = {} if is_attacker else {"s": 1}
         used_items = set()
         
         # Get stats
@@ -641,32 +778,30 @@ class CombatProcessor(BaseProcessor):
             def_val = session.enemy_stats.get("def", 5)
             frozen = session.turn <= session.player_frozen_until
             opp_stealth = session.turn <= session.enemy_stealth_until
-            atk_element = session.player_element
-            def_element = session.enemy_element
+            target_key = session.enemy_element_key
         else:
             base_str = session.enemy_stats.get("str", 10)
             def_val = session.player_stats.get("def", 5)
             frozen = session.turn <= session.enemy_frozen_until
             opp_stealth = session.turn <= session.player_stealth_until
-            atk_element = session.enemy_element
-            def_element = session.player_element
+            target_key = session.player_element_key
         
         if frozen:
-            return 0, "Frozen!", used_items
+            return 0, [{"a": FROZEN, **side}], used_items
 
         # Item Processing
         selected_ids = getattr(action, 'item_ids', []) or getattr(action, 'weapon_ids', [])
         if not selected_ids and getattr(action, 'item_id', None):
             selected_ids = [action.item_id]
 
-        atk_icons_dict = {"Phys": base_str}
-        def_icons = 0
+        # NOTE: both sides read the attacker's compiled loadout (equipped_items)
+        gear = session.player_gear
         heal_amt = 0
-        status_logs = []
+        logs = []
 
-        # 1. Consumables (only use once)
+        # 1. Consumables (up to each stack's quantity per battle)
         for iid in selected_ids:
-            item = next((i for i in session.equipped_items if i.get("id") == iid), None)
+            item = gear.items_by_id.get(iid)
             if not item: continue
             if item.get("item_type") in ["weapon", "shield", "armor"]: continue
             if iid in session.used_item_ids: continue
@@ -681,60 +816,41 @@ class CombatProcessor(BaseProcessor):
                 h = int(max_hp * (stats["heal_pct"] / 100))
             if h > 0:
                 heal_amt += h
-                status_logs.append(f"Healed {h} HP")
+                logs.append({"a": HEAL, **side, "i": iid, "v": h})
 
             # Status
             stype = eff.get("type") or item.get("item_type")
             chance = eff.get("chance", 1.0)
             if stype in ["freeze", "stealth"]:
-                if random.random() <= chance:
+                ok = session.rng.random() <= chance
+                if ok:
                     duration = eff.get("duration", 1)
                     if stype == "freeze":
                         if is_attacker: session.enemy_frozen_until = session.turn + duration
                         else: session.player_frozen_until = session.turn + duration
-                        status_logs.append("FROZE opponent!")
                     else:
                         if is_attacker: session.player_stealth_until = session.turn + duration
                         else: session.enemy_stealth_until = session.turn + duration
-                        status_logs.append("became INVISIBLE!")
-                else:
-                    status_logs.append(f"{item.get('name')} failed")
+                logs.append({"a": FREEZE if stype == "freeze" else STEALTH, **side, "i": iid, "ok": ok})
             
+            session.use_item(item)
             used_items.add(iid)
 
         # 2. Weapons/Armor
-        for item in session.equipped_items:
-            is_wp = item.get("item_type") == "weapon"
-            is_ps = item.get("item_type") in ["armor", "shield"]
-            
-            if (is_wp and item.get("id") in selected_ids) or is_ps:
-                stats = item.get("stats", {})
-                a_val = stats.get("atk", {}) or stats.get("attack", {})
-                d_val = stats.get("def", {}) or stats.get("defense", {})
-                
-                if isinstance(a_val, dict):
-                    for k, v in a_val.items():
-                        atk_icons_dict[k.capitalize()] = atk_icons_dict.get(k.capitalize(), 0) + v
-                elif isinstance(a_val, (int, float)):
-                    atk_icons_dict["Phys"] = atk_icons_dict.get("Phys", 0) + a_val
-                
-                if isinstance(d_val, dict): def_icons += sum(d_val.values())
-                elif isinstance(d_val, (int, float)): def_icons += d_val
+        weapons = gear.selected_weapons(selected_ids)
+        atk_total = base_str + gear.passive_atk[target_key] + sum(w.typed[target_key] for w in weapons)
+        atk_raw = base_str + gear.passive_atk_sum + sum(w.atk_sum for w in weapons)
+        def_icons = gear.passive_def + sum(w.def_icons for w in weapons)
 
         # --- REFLECT (PvP) ---
-        reflect_chance = 0
-        def_gear = (session.enemy_weapons + session.enemy_items) if is_attacker else session.equipped_items
-        for item in def_gear:
-            if item.get("item_type") in ["armor", "shield"]:
-                eff = item.get("effect", {})
-                if eff.get("type") == "reflect":
-                    reflect_chance = max(reflect_chance, eff.get("chance", 0))
+        reflect_chance = session.enemy_gear_reflect if is_attacker else gear.reflect
+        atk_log = {"a": ATTACK, **side, "i": list(selected_ids)}
         
-        if reflect_chance > 0 and random.random() <= reflect_chance:
-            reflected_dmg = int(sum(atk_icons_dict.values()) * 0.5)
+        if reflect_chance > 0 and session.rng.random() <= reflect_chance:
+            reflected_dmg = int(atk_raw * 0.5)
             if is_attacker: session.player_hp -= reflected_dmg
             else: session.enemy_hp -= reflected_dmg
-            status_logs.append(f"Took {reflected_dmg} reflected damage")
+            atk_log["r"] = reflected_dmg
         # In _process_pvp_turn, we know who is attacking.
         # Let's adjust _calculate_action_result to handle reflection.
 
@@ -745,14 +861,15 @@ class CombatProcessor(BaseProcessor):
         # Calculate Damage
         if opp_stealth:
             damage = 0
-            logs.append("Miss (stealth)")
+            atk_log["hid"] = True
         else:
-            damage, is_crit = self.calculate_damage(atk_icons_dict, def_val + def_icons, def_element, atk_mod, def_mod, False)
-            logs.append(f"{damage} dmg" + (" CRIT!" if is_crit else ""))
-
-        final_logs = status_logs + logs
+            damage, is_crit = self._roll_damage(atk_total, def_val + def_icons, atk_mod, def_mod, False, session.rng)
+            if is_crit:
+                atk_log["crit"] = True
+        atk_log["v"] = damage
+        logs.append(atk_log)
         # Apply healing
         if is_attacker: session.player_hp = min(session.player_hp + heal_amt, session.player_max_hp)
         else: session.enemy_hp = min(session.enemy_hp + heal_amt, session.enemy_max_hp)
 
-        return damage, "; ".join(final_logs), used_items
+        return damage, logs, used_items
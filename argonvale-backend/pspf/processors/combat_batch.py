@@ -0,0 +1,480 @@
+"""
+Batched PvE turn engine.
+
+Active PvE battles live in a struct-of-arrays store (HP, stats, status turns and the
+compiled attack/defense totals of the pending action as NumPy columns). Actions are
+queued by process() and every battle with a pending action is resolved by tick() in
+one vectorized pass. Rules, per-session RNG streams and the emitted TurnProcessed /
+CombatEnded events are identical to CombatProcessor's PvE path; PvP stays there.
+
+Requires NumPy (the `batch` extra).
+"""
+import numpy as np
+
+from pspf.processors.base import BaseProcessor
+from pspf.processors.combat import CombatSession, TYPE_CHART
+from pspf.processors.combat_log import FROZEN, SPENT, HEAL, FREEZE, STEALTH, ATTACK, GUARD
+from pspf.events.base import GameEvent
+from pspf.events.combat import CombatStarted, CombatAction, TurnProcessed, CombatEnded, ForfeitCombat
+
+AI_STANCES = ["normal", "berserk", "defensive"]
+STANCE_MODS = {"normal": (1.0, 1.0), "berserk": (1.2, 0.8), "defensive": (0.8, 1.2)}
+
+
+class BattleStore:
+    """Struct-of-arrays storage for active battles. Rows are recycled through a free list."""
+    INT_COLUMNS = ("player_hp", "player_max_hp", "enemy_hp", "enemy_max_hp", "turn",
+                   "player_frozen_until", "enemy_frozen_until", "player_stealth_until", "enemy_stealth_until")
+    FLOAT_COLUMNS = ("enemy_str", "enemy_def", "enemy_reflect", "ai_weapon_atk", "ai_defensive_atk",
+                     "atk_total", "atk_raw", "act_def", "freeze", "stance_atk", "stance_def",
+                     "cur_player_def", "cur_stance_def")
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.int64))
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.float64))
+        self.pending = np.zeros(capacity, dtype=bool)
+        # Cold per-row data: the CombatSession (ids, names, compiled gear, rng, enemy_items),
+        # the pending action (actor_id, stance, selected ids, has consumables) and the
+        # gear totals of each item selection seen so far (players mostly repeat theirs)
+        self.sessions = [None] * capacity
+        self.actions = [None] * capacity
+        self.selections = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def allocate(self) -> int:
+        if not self.free:
+            self._grow()
+        return self.free.pop()
+
+    def release(self, row: int):
+        self.sessions[row] = None
+        self.actions[row] = None
+        self.selections[row] = None
+        self.pending[row] = False
+        self.free.append(row)
+
+    def _grow(self):
+        old, new = self.capacity, self.capacity * 2
+        for name in self.INT_COLUMNS + self.FLOAT_COLUMNS + ("pending",):
+            grown = np.zeros(new, dtype=getattr(self, name).dtype)
+            grown[:old] = getattr(self, name)
+            setattr(self, name, grown)
+        self.sessions.extend([None] * (new - old))
+        self.actions.extend([None] * (new - old))
+        self.selections.extend([None] * (new - old))
+        self.free.extend(range(new - 1, old - 1, -1))
+        self.capacity = new
+
+
+class BatchedCombatProcessor(BaseProcessor):
+    def __init__(self, capacity: int = 1024, text_log: bool = True):
+        super().__init__()
+        self.store = BattleStore(capacity)
+        self.text_log = text_log  # as CombatProcessor.text_log
+        self.rows = {}  # combat_id -> row
+        self.TYPE_CHART = TYPE_CHART
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get_session(self, combat_id: str) -> CombatSession:
+        """The battle's CombatSession with its HP/status fields synced from the arrays (e.g. for to_start_event)"""
+        row = self.rows.get(combat_id)
+        if row is None:
+            return None
+        s = self.store
+        session = s.sessions[row]
+        for name in ["player_hp", "enemy_hp", "turn", "player_frozen_until", "enemy_frozen_until",
+                     "player_stealth_until", "enemy_stealth_until"]:
+            setattr(session, name, int(getattr(s, name)[row]))
+        return session
+
+    def process(self, state: any, event: GameEvent) -> list[GameEvent]:
+        """Admit PvE battles and queue actions; turns are resolved by tick()"""
+        if isinstance(event, CombatStarted):
+            if event.mode != "pve":
+                return []
+            if event.context.get("resumed") and event.combat_id in self.rows:
+                return []
+            if event.combat_id in self.rows:
+                self.store.release(self.rows.pop(event.combat_id))
+            self._admit(CombatSession(event, self.TYPE_CHART))
+
+        elif isinstance(event, CombatAction):
+            row = self.rows.get(event.combat_id)
+            if row is not None:
+                self._submit(row, event)
+
+        elif isinstance(event, ForfeitCombat):
+            row = self.rows.get(event.combat_id)
+            if row is None: return []
+            session = self.store.sessions[row]
+            self._release(session.combat_id)
+            return [CombatEnded.create(
+                combat_id=session.combat_id,
+                winner_id=0,
+                attacker_id=session.attacker_id,
+                attacker_companion_id=session.attacker_companion_id,
+                defender_id=session.defender_id,
+                defender_companion_id=session.defender_companion_id,
+                mode=session.mode,
+                xp_gained=0,
+                description=f"Player {event.player_id} forfeited the battle."
+            )]
+        return []
+
+    def _admit(self, session: CombatSession):
+        s = self.store
+        row = s.allocate()
+        self.rows[session.combat_id] = row
+        s.sessions[row] = session
+        s.actions[row] = None
+        s.selections[row] = {}
+        s.pending[row] = False
+        s.player_hp[row] = session.player_hp
+        s.player_max_hp[row] = session.player_max_hp
+        s.enemy_hp[row] = session.enemy_hp
+        s.enemy_max_hp[row] = session.enemy_max_hp
+        s.turn[row] = session.turn
+        s.player_frozen_until[row] = s.enemy_frozen_until[row] = 0
+        s.player_stealth_until[row] = s.enemy_stealth_until[row] = 0
+        s.enemy_str[row] = session.enemy_stats.get("STR", 5)
+        s.cur_player_def[row] = session.player_stats.get("def", 5)
+        s.cur_stance_def[row] = 1.0
+        self._load_enemy(row)
+
+    def _load_enemy(self, row: int):
+        """Copy the session's compiled enemy gear into the arrays (after admit or an AI item use)"""
+        s = self.store
+        session = s.sessions[row]
+        s.enemy_def[row] = session.enemy_stats.get("DEF", 5) + session.enemy_passive_def
+        s.enemy_reflect[row] = session.enemy_passive_reflect
+        s.ai_weapon_atk[row] = session.ai_options["weapon"][0]
+        s.ai_defensive_atk[row] = session.ai_options["defensive"][0]
+
+    def _release(self, combat_id: str):
+        self.store.release(self.rows.pop(combat_id))
+
+    def _submit(self, row: int, event: CombatAction):
+        """Compile the action's gear totals into the row; the latest action per tick wins"""
+        s = self.store
+        session = s.sessions[row]
+        selected_ids = getattr(event, 'item_ids', [])
+        if not selected_ids and getattr(event, 'weapon_ids', None):
+            selected_ids = event.weapon_ids
+        if not selected_ids and getattr(event, 'item_id', None):
+            selected_ids = [event.item_id]
+
+        key = tuple(selected_ids)
+        totals = s.selections[row].get(key)
+        if totals is None:
+            gear = session.player_gear
+            weapons = gear.selected_weapons(selected_ids)
+            enemy_key = session.enemy_element_key
+            base_str = session.player_stats.get("str", 10)
+            base_def = session.player_stats.get("def", 5)
+            totals = s.selections[row][key] = (
+                base_str + gear.passive_atk[enemy_key] + sum(w.typed[enemy_key] for w in weapons),
+                base_str + gear.passive_atk_sum + sum(w.atk_sum for w in weapons),
+                base_def + gear.passive_def + sum(w.def_icons for w in weapons),
+                max([gear.passive_freeze] + [w.freeze for w in weapons]),
+                any(iid in gear.items_by_id and gear.items_by_id[iid].get("item_type") not in ["weapon", "shield", "armor"]
+                    for iid in selected_ids),
+            )
+        s.atk_total[row], s.atk_raw[row], s.act_def[row], s.freeze[row], has_consumables = totals
+        s.stance_atk[row], s.stance_def[row] = STANCE_MODS.get(event.stance, (1.0, 1.0))
+        s.actions[row] = (event.actor_id, event.stance, list(selected_ids), has_consumables)
+        s.pending[row] = True
+
+    def _use_consumables(self, row: int, session: CombatSession, selected_ids: list) -> list:
+        """CombatProcessor's consumable handling, applied to the row's arrays"""
+        s = self.store
+        log = []
+        for item_id in selected_ids:
+            item = session.player_gear.items_by_id.get(item_id)
+            if not item: continue
+            if item.get("item_type") in ["weapon", "shield", "armor"]:
+                continue
+            if item_id in session.used_item_ids:
+                log.append({"a": SPENT, "i": item_id})
+                continue
+
+            stats = item.get("stats", {})
+            effect = item.get("effect", {})
+
+            restore_amt = stats.get("heal") or 0
+            if "heal_pct" in stats:
+                restore_amt = int(session.player_max_hp * (stats["heal_pct"] / 100))
+            if restore_amt > 0:
+                s.player_hp[row] = min(int(s.player_hp[row]) + restore_amt, session.player_max_hp)
+                log.append({"a": HEAL, "i": item_id, "v": restore_amt})
+
+            if effect.get("type") == "freeze":
+                chance = effect.get("chance", 1.0)
+                ok = session.rng.random() <= chance
+                if ok:
+                    s.enemy_frozen_until[row] = s.turn[row] + effect.get("duration", 1)
+                log.append({"a": FREEZE, "i": item_id, "ok": ok})
+
+            if effect.get("type") == "stealth":
+                chance = effect.get("chance", 1.0)
+                ok = session.rng.random() <= chance
+                if ok:
+                    s.player_stealth_until[row] = s.turn[row] + effect.get("duration", 1)
+                log.append({"a": STEALTH, "i": item_id, "ok": ok})
+
+            session.use_item(item)
+        return log
+
+    def _ai_support(self, row: int, session: CombatSession, hp_percent: float) -> dict:
+        """CombatProcessor's AI consumable branch; returns None when the AI attacks instead"""
+        s = self.store
+        log = None
+        heal_item = next((i for i in session.enemy_items if i.get("type") == "heal"), None)
+        if hp_percent < 40 and heal_item:
+            restore = heal_item.get("value", 20)
+            s.enemy_hp[row] = min(int(s.enemy_hp[row]) + restore, session.enemy_max_hp)
+            log = {"a": HEAL, "s": 1, "i": heal_item.get("id"), "v": restore}
+            session.enemy_items.remove(heal_item)
+        else:
+            status_item = next((i for i in session.enemy_items if i.get("type") in ["stealth", "freeze"] or i.get("effect", {}).get("type") in ["stealth", "freeze"]), None)
+            if not status_item:
+                return None
+            eff = status_item.get("effect", {})
+            stype = eff.get("type") or status_item.get("type")
+            if session.rng.random() <= eff.get("chance", 1.0):
+                duration = eff.get("duration", 1)
+                if stype == "stealth":
+                    s.enemy_stealth_until[row] = s.turn[row] + duration
+                    log = {"a": STEALTH, "s": 1, "i": status_item.get("id"), "ok": True}
+                elif stype == "freeze":
+                    s.player_frozen_until[row] = s.turn[row] + duration
+                    log = {"a": FREEZE, "s": 1, "i": status_item.get("id"), "ok": True}
+            else:
+                log = {"a": FREEZE if stype == "freeze" else STEALTH, "s": 1, "i": status_item.get("id"), "ok": False}
+            session.enemy_items.remove(status_item)
+        session._compile_enemy()
+        self._load_enemy(row)
+        return log
+
+    @staticmethod
+    def _damage(total, defense, def_mod, atk_mod, u_crit, variance):
+        """Vectorized CombatProcessor._roll_damage (same float operation order)"""
+        crit = u_crit < 0.05
+        mitigation = 20 / (20 + (defense * def_mod))
+        final = total * mitigation * atk_mod * variance * np.where(crit, 1.5, 1.0)
+        return np.maximum(1, np.trunc(final)).astype(np.int64), crit
+
+    def _snapshot(self, rows) -> list:
+        """(turn, player_hp, enemy_hp, frozen/stealth turns) per row, read column-wise for the events (tick adds the state version)"""
+        s = self.store
+        columns = [getattr(s, name)[rows].tolist() for name in
+                   ["turn", "player_hp", "enemy_hp", "player_frozen_until", "enemy_frozen_until",
+                    "player_stealth_until", "enemy_stealth_until"]]
+        return list(zip(*columns))
+
+    def tick(self):
+        """
+        Resolve one turn for every battle with a pending action. All state (HP, statuses, RNG
+        streams, finished battles) is updated before this returns; the events, grouped per
+        battle in CombatProcessor order, are built as the returned iterator is consumed.
+        """
+        s = self.store
+        rows = np.flatnonzero(s.pending)
+        if not len(rows):
+            return iter(())
+        s.pending[rows] = False
+        row_list = rows.tolist()
+        records = {row: [s.sessions[row], s.actions[row], None, None, None] for row in row_list}  # + player, win, ai
+
+        # 1. Player turn
+        acting = rows[s.turn[rows] > s.player_frozen_until[rows]]
+        acting_list = acting.tolist()
+        stealth = (s.turn[acting] <= s.enemy_stealth_until[acting]).tolist()
+        freeze = s.freeze[acting].tolist()
+        reflect = s.enemy_reflect[acting].tolist()
+        u_crit, variance, froze, reflected, item_logs = [], [], [], [], []
+
+        # Draws stay per session (each battle keeps its own replayable stream, in processor order)
+        for j, row in enumerate(acting_list):
+            session = s.sessions[row]
+            rng = session.rng
+            action = s.actions[row]
+            item_logs.append(self._use_consumables(row, session, action[2]) if action[3] else None)
+            if stealth[j]:
+                u_crit.append(1.0); variance.append(1.0); froze.append(False); reflected.append(False)
+                continue
+            u_crit.append(rng.random())
+            variance.append(rng.uniform(0.9, 1.1))
+            froze.append(freeze[j] > 0 and rng.random() <= freeze[j])
+            reflected.append(reflect[j] > 0 and rng.random() <= reflect[j])
+
+        froze = np.asarray(froze, dtype=bool)
+        reflected = np.asarray(reflected, dtype=bool)
+        dealt, crit = self._damage(s.atk_total[acting], s.enemy_def[acting], 1.0, s.stance_atk[acting], np.asarray(u_crit), np.asarray(variance))
+        dealt[np.asarray(stealth, dtype=bool)] = 0
+        s.enemy_hp[acting] -= dealt
+        s.enemy_frozen_until[acting[froze]] = s.turn[acting[froze]] + 1
+        reflected_dmg = np.where(reflected, np.trunc(s.atk_raw[acting] * 0.5), 0).astype(np.int64)
+        s.player_hp[acting] -= reflected_dmg
+        s.cur_player_def[acting] = s.act_def[acting]
+        s.cur_stance_def[acting] = s.stance_def[acting]
+
+        player = dict(zip(acting_list, zip(dealt.tolist(), crit.tolist(), froze.tolist(), reflected.tolist(), reflected_dmg.tolist(), stealth, item_logs)))
+        for row, snap in zip(row_list, self._snapshot(rows)):
+            session = records[row][0]
+            session.state_version += 1
+            records[row][2] = (snap + (session.state_version,), player.get(row), list(session.used_item_ids), dict(session.item_uses))
+
+        # Victories (loot rolls are per session)
+        won = rows[s.enemy_hp[rows] <= 0]
+        for row in won.tolist():
+            session = s.sessions[row]
+            rng = session.rng
+            dropped = None
+            if rng.random() < 0.25 and session.enemy_items:
+                dropped = rng.choice(session.enemy_items)
+            records[row][3] = (dropped, rng.randint(15, 30))
+        alive = rows[s.enemy_hp[rows] > 0]
+
+        # 2. AI turn
+        ai_acting = alive[s.turn[alive] > s.enemy_frozen_until[alive]]
+        player_stealth = (s.turn[ai_acting] <= s.player_stealth_until[ai_acting]).tolist()
+        hp_percent = ((s.enemy_hp[ai_acting] / s.enemy_max_hp[ai_acting]) * 100).tolist()
+        ai = {}
+        attackers, defensive, ai_stances, ai_crit_u, ai_variance = [], [], [], [], []
+        for j, row in enumerate(ai_acting.tolist()):
+            session = s.sessions[row]
+            rng = session.rng
+            rand = rng.random()
+            if rand < 0.15:
+                log = self._ai_support(row, session, hp_percent[j])
+                if log is not None:
+                    ai[row] = log
+                    continue
+                rand = 0.5
+            ai_stance = rng.choice(AI_STANCES)
+            if rand < 0.40:
+                ai_stance = "defensive"
+            if player_stealth[j]:
+                ai_crit_u.append(1.0); ai_variance.append(1.0)
+            else:
+                ai_crit_u.append(rng.random()); ai_variance.append(rng.uniform(0.9, 1.1))
+            attackers.append(j)
+            defensive.append(rand < 0.40)
+            ai_stances.append(ai_stance)
+
+        att_rows = ai_acting[np.asarray(attackers, dtype=np.int64)]
+        is_defensive = np.asarray(defensive, dtype=bool)
+        ai_total = s.enemy_str[att_rows] + np.where(is_defensive, s.ai_defensive_atk[att_rows], s.ai_weapon_atk[att_rows])
+        ai_atk_mod = np.asarray([STANCE_MODS[st][0] for st in ai_stances], dtype=np.float64)
+        ai_dmg, ai_crit = self._damage(ai_total, s.cur_player_def[att_rows], s.cur_stance_def[att_rows], ai_atk_mod, np.asarray(ai_crit_u), np.asarray(ai_variance))
+        stealthed = [player_stealth[j] for j in attackers]
+        ai_dmg[np.asarray(stealthed, dtype=bool)] = 0
+        s.player_hp[att_rows] -= ai_dmg
+        ai.update(zip(att_rows.tolist(), zip(ai_dmg.tolist(), ai_crit.tolist(), defensive, ai_stances, stealthed)))
+
+        for row, snap in zip(alive.tolist(), self._snapshot(alive)):
+            session = records[row][0]
+            session.state_version += 1
+            records[row][4] = (snap + (session.state_version,), ai.get(row))
+            if snap[1] <= 0:
+                s.player_hp[row] = 0
+
+        # Finished battles leave the store
+        for row in won.tolist() + alive[s.player_hp[alive] <= 0].tolist():
+            self._release(s.sessions[row].combat_id)
+        return self._emit(records.values())
+
+    def _emit(self, records):
+        """Build each battle's events from its turn record (log records as in CombatProcessor)"""
+        for session, (actor_id, stance, selected_ids, _), player, win, ai in records:
+            snap, result, *used = player
+            if result is None:
+                yield self._turn_event(session, snap, actor_id, 0, [{"a": FROZEN}], *used)
+            else:
+                dealt, crit, froze, reflected, reflected_dmg, enemy_stealth, item_logs = result
+                atk_log = {"a": ATTACK, "i": list(selected_ids), "st": stance, "v": dealt}
+                if crit:
+                    atk_log["crit"] = True
+                if enemy_stealth:
+                    atk_log["hid"] = True
+                if froze:
+                    atk_log["froze"] = True
+                if reflected:
+                    atk_log["r"] = reflected_dmg
+                yield self._turn_event(session, snap, actor_id, dealt, (item_logs or []) + [atk_log], *used)
+
+            if win is not None:
+                dropped, coins = win
+                yield CombatEnded.create(
+                    combat_id=session.combat_id,
+                    winner_id=actor_id,
+                    attacker_id=session.attacker_id,
+                    attacker_companion_id=session.attacker_companion_id,
+                    defender_id=session.defender_id,
+                    defender_companion_id=session.defender_companion_id,
+                    mode=session.mode,
+                    loot={"coins": coins},
+                    dropped_item=dropped,
+                    xp_gained=(session.enemy_stats.get("STR", 5) * 2) + 10
+                )
+                continue
+
+            snap, result = ai
+            damage = 0
+            if result is None:
+                log = {"a": FROZEN, "s": 1}
+            elif isinstance(result, dict):
+                log = result
+            else:
+                damage, ai_crit, is_defensive, ai_stance, player_stealth = result
+                item_ids = session.ai_options["defensive" if is_defensive else "weapon"][1]
+                if is_defensive:
+                    log = {"a": GUARD, "s": 1, "i": item_ids, "v": damage}
+                else:
+                    log = {"a": ATTACK, "s": 1, "i": item_ids, "st": ai_stance, "v": damage}
+                    if ai_crit:
+                        log["crit"] = True
+                if player_stealth:
+                    log["hid"] = True
+            yield self._turn_event(session, snap, 0, damage, [log], *used)
+
+            if snap[1] <= 0:
+                yield CombatEnded.create(
+                    combat_id=session.combat_id,
+                    winner_id=0,
+                    attacker_id=session.attacker_id,
+                    attacker_companion_id=session.attacker_companion_id,
+                    defender_id=session.defender_id,
+                    defender_companion_id=session.defender_companion_id,
+                    mode=session.mode,
+                    xp_gained=0
+                )
+
+    def _turn_event(self, session: CombatSession, snap: tuple, actor_id: int, damage: int, log: list, used_item_ids: list, item_uses: dict) -> TurnProcessed:
+        fields = dict(
+            combat_id=session.combat_id,
+            turn_number=snap[0],
+            actor_id=actor_id,
+            damage_dealt=damage,
+            log=log,
+            attacker_hp=snap[1],
+            defender_hp=snap[2],
+            attacker_id=session.attacker_id,
+            defender_id=session.defender_id,
+            mode=session.mode,
+            player_frozen_until=snap[3],
+            enemy_frozen_until=snap[4],
+            player_stealth_until=snap[5],
+            enemy_stealth_until=snap[6],
+            used_item_ids=used_item_ids,
+            item_uses=item_uses,
+            state_version=snap[7],
+        )
+        if self.text_log:
+            fields["description"] = session.describe(log)
+        return TurnProcessed.create(**fields)
@@ -0,0 +1,99 @@
+"""
+Structured combat log.
+
+TurnProcessed.log holds one compact record per thing that happened in the turn instead
+of an English sentence; clients render the text themselves. Records are plain dicts:
+
+    a      action code (see below)
+    s      1 when the defender / AI acted (omitted for the attacker)
+    i      item id (item records) or list of selected item ids (attacks)
+    v      amount: HP restored or damage dealt
+    st     stance of the attack
+    ok     whether a freeze/stealth item worked
+    crit   critical hit
+    froze  the blow froze the target
+    hid    the target was invisible (the attack missed)
+    r      damage reflected back to the actor (present whenever a reflect triggered)
+
+Flags are only present when set. render_log() turns a turn's records back into the
+descriptions legacy clients expect, resolving item ids through the battle's loadouts.
+"""
+
+FROZEN = "frozen"    # actor was frozen and skipped its turn
+SPENT = "spent"      # consumable was already used this battle
+HEAL = "heal"        # i, v
+FREEZE = "freeze"    # i, ok
+STEALTH = "stealth"  # i, ok
+ATTACK = "attack"    # i, v, st, crit, froze, hid, r
+GUARD = "guard"      # AI attack from its defensive stance: i, v, hid
+
+
+def render_log(log: list, mode: str, enemy_name: str, player_names: dict, enemy_names: dict) -> str:
+    """English description of a turn's records, as CombatProcessor used to write it"""
+    if mode == "pvp":
+        sides = ([], [])
+        for rec in log:
+            sides[rec.get("s", 0)].append(_pvp_text(rec, player_names))
+        return " | ".join("; ".join(parts) for parts in sides)
+    return " ".join([_enemy_text(rec, enemy_name, enemy_names) if rec.get("s") else _player_text(rec, player_names) for rec in log])
+
+
+def _player_text(rec: dict, names: dict) -> str:
+    code = rec["a"]
+    if code == ATTACK:
+        if rec.get("hid"):
+            return "You attack, but the enemy is invisible!"
+        item_names = [names.get(iid, "item") for iid in rec.get("i", ())]
+        using_text = f" using {', '.join(item_names)}" if item_names else ""
+        text = f"{'CRITICAL HIT! ' if rec.get('crit') else ''}In {rec['st']} stance{using_text}, you deal {rec['v']} damage!"
+        if rec.get("froze"):
+            text += " The blow FROZE your opponent!"
+        if "r" in rec:
+            text += f" The enemy REFLECTED {rec['r']} damage back to you!"
+        return text
+    if code == FROZEN:
+        return "You are frozen and cannot move!"
+    name = names.get(rec["i"], "item")
+    if code == SPENT:
+        return f"{name} is already spent!"
+    if code == HEAL:
+        return f"Used {name} to restore {rec['v']} HP."
+    if code == FREEZE:
+        return f"Used {name} and FROZE the opponent!" if rec["ok"] else f"Used {name} but it failed to freeze."
+    return f"Used {name} and became INVISIBLE!" if rec["ok"] else f"Used {name} but it failed to hide you."
+
+
+def _enemy_text(rec: dict, enemy_name: str, names: dict) -> str:
+    code = rec["a"]
+    if code in (ATTACK, GUARD):
+        if rec.get("hid"):
+            return f"{enemy_name} tried to attack, but you are invisible and took 0 damage!"
+        item_names = [names.get(iid, "item") for iid in rec.get("i", ())]
+        if code == GUARD:
+            using_text = f" with its {', '.join(item_names)}" if item_names else ""
+            return f"{enemy_name} takes a defensive stance{using_text}, dealing {rec['v']} damage!"
+        stance_text = f" in {rec['st']} stance" if rec.get("st", "normal") != "normal" else ""
+        using_text = f" using {', '.join(item_names)}" if item_names else ""
+        return f"{'CRITICAL! ' if rec.get('crit') else ''}{enemy_name} attacks{stance_text}{using_text} for {rec['v']} damage!"
+    if code == FROZEN:
+        return f"{enemy_name} is frozen and skips its turn!"
+    name = names.get(rec["i"], "item")
+    if code == HEAL:
+        return f"{enemy_name} used {name} and restored {rec['v']} HP!"
+    if not rec["ok"]:
+        return f"{enemy_name} tried to use {name} but it failed!"
+    return f"{enemy_name} used {name} and vanished from sight!" if code == STEALTH else f"{enemy_name} used {name} and FROZE you!"
+
+
+def _pvp_text(rec: dict, names: dict) -> str:
+    code = rec["a"]
+    if code == ATTACK:
+        text = "Miss (stealth)" if rec.get("hid") else f"{rec['v']} dmg" + (" CRIT!" if rec.get("crit") else "")
+        return f"Took {rec['r']} reflected damage; {text}" if "r" in rec else text
+    if code == FROZEN:
+        return "Frozen!"
+    if code == HEAL:
+        return f"Healed {rec['v']} HP"
+    if not rec["ok"]:
+        return f"{names.get(rec['i'], 'item')} failed"
+    return "FROZE opponent!" if code == FREEZE else "became INVISIBLE!"
@@ -0,0 +1,121 @@
+"""
+Per-zone encounter and loot tables.
+
+Each zone gets a ZoneTable built once when its map loads, from the map's custom
+properties and the creature catalog (app.core.content):
+
+    encounter_rate  chance of a wild encounter per step (default 0.15; 0 makes the zone safe)
+    loot_rate       chance of finding coins per step (default 0.10)
+    coins_min       coins found, inclusive range (default 10..50)
+    coins_max
+    creatures       which common creatures appear, with optional weights:
+                    "Mossback Hare:3, Spark" (default: all, by their encounter_weight)
+
+Sampling uses alias tables (Vose), so a roll is O(1) whatever the number of outcomes. The
+step outcome itself (nothing / loot / encounter / both) is one alias draw, which keeps
+the common case to a single call on the player's RNG stream.
+"""
+import logging
+import random
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCOUNTER_RATE = 0.15
+DEFAULT_LOOT_RATE = 0.10
+DEFAULT_COINS = (10, 50)
+
+
+class AliasTable:
+    """Weighted choice in O(1) per sample"""
+    __slots__ = ("items", "prob", "alias", "n")
+
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        total = float(sum(weights))
+        if not items or total <= 0:
+            raise ValueError("An alias table needs at least one item with a positive weight")
+        self.n = n = len(items)
+        self.items = list(items)
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding
+
+    def sample(self, rng: random.Random):
+        # One draw: the integer part picks the column, the fraction the side of it
+        u = rng.random() * self.n
+        i = int(u)
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+
+class ZoneTable:
+    """What a step in one zone can turn up"""
+    __slots__ = ("encounter_rate", "loot_rate", "coins_min", "coins_max", "outcomes", "creatures")
+
+    def __init__(self, encounter_rate: float, loot_rate: float, coins: Tuple[int, int],
+                 creatures: List[Tuple[dict, dict]], weights: List[float]):
+        self.encounter_rate = encounter_rate if creatures else 0.0
+        self.loot_rate = loot_rate
+        self.coins_min, self.coins_max = coins
+        e, l = self.encounter_rate, loot_rate
+        # (loot?, encounter?) per step; loot and encounters are independent
+        self.outcomes = AliasTable(
+            [(False, False), (True, False), (False, True), (True, True)],
+            [(1 - l) * (1 - e), l * (1 - e), (1 - l) * e, l * e],
+        )
+        # (creature, stat block) pairs
+        self.creatures: Optional[AliasTable] = AliasTable(creatures, weights) if creatures else None
+
+    def roll(self, rng: random.Random) -> Tuple[int, Optional[Tuple[dict, dict]]]:
+        """(coins found or 0, (creature, stat block) encountered or None)"""
+        loot, encounter = self.outcomes.sample(rng)
+        coins = self.coins_min + int(rng.random() * (self.coins_max - self.coins_min + 1)) if loot else 0
+        return coins, self.creatures.sample(rng) if encounter else None
+
+
+def _parse_creatures(spec: str) -> dict:
+    """"Name:3, Other" -> {"Name": 3.0, "Other": 1.0}"""
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition(":")
+        if name:
+            weights[name.strip()] = float(weight) if weight.strip() else 1.0
+    return weights
+
+
+def build_zone_table(zone_id: str, properties: dict, creatures) -> ZoneTable:
+    """A zone's table from its map properties (see module docstring) and a CreatureCatalog"""
+    common = creatures.common
+    picked = _parse_creatures(properties["creatures"]) if properties.get("creatures") else None
+    if picked is not None:
+        unknown = set(picked) - {c["name"] for c in common}
+        if unknown:
+            logger.warning(f"Zone {zone_id}: unknown creatures {sorted(unknown)}")
+
+    pairs, weights = [], []
+    for creature in common:
+        weight = creature.get("encounter_weight", 1.0) if picked is None else picked.get(creature["name"], 0.0)
+        stats = creature.get("starting_stats", [])
+        # Every stat block of a creature is equally likely
+        for stat_block in stats:
+            if weight > 0:
+                pairs.append((creature, stat_block))
+                weights.append(weight / len(stats))
+
+    coins_min = int(properties.get("coins_min", DEFAULT_COINS[0]))
+    coins_max = max(coins_min, int(properties.get("coins_max", DEFAULT_COINS[1])))
+    return ZoneTable(
+        encounter_rate=min(1.0, max(0.0, float(properties.get("encounter_rate", DEFAULT_ENCOUNTER_RATE)))),
+        loot_rate=min(1.0, max(0.0, float(properties.get("loot_rate", DEFAULT_LOOT_RATE)))),
+        coins=(coins_min, coins_max),
+        creatures=pairs,
+        weights=weights,
+    )
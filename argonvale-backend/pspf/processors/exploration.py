@@ -1,7 +1,9 @@
 import json
 import os
 import random
-from pspf.processors.base import BaseProcessor
+from pspf.processors.base import BaseProcessor, derive_seed
+from pspf.processors.encounters import ZoneTable, build_zone_table
+from app.core.content import get_catalog, thaw
 from pspf.events.base import GameEvent
 from pspf.events.movement import PlayerMoved, LootFound
 from pspf.events.combat import CombatStarted
@@ -9,23 +11,48 @@ from pspf.state.base import GameState
 
 # Path to data
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-CREATURES_PATH = os.path.join(BASE_DIR, "app/data/creatures.json")
 MAPS_DIR = os.path.join(BASE_DIR, "app/data/maps")
 
 class ExplorationProcessor(BaseProcessor):
-    def __init__(self):
+    def __init__(self, seed: int = None):
         super().__init__()
-        self.creatures_data = {}
+        self.creatures = get_catalog().creatures
         self.maps_data = {}
+        # zone_id -> encounter/loot table, rebuilt whenever maps are (re)loaded
+        self.zone_tables: dict = {}
+        self.default_table: ZoneTable = None
+        # Per-player RNG streams (player_id -> Random), all derived from one processor seed.
+        # Pass a fixed seed to replay exploration rolls from the event log.
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(64)
+        self.rngs = {}
         self._load_data()
 
+    def get_rng(self, player_id: int) -> random.Random:
+        rng = self.rngs.get(player_id)
+        if rng is None:
+            rng = random.Random(derive_seed(self.seed, player_id))
+            self.rngs[player_id] = rng
+        return rng
+
     def _load_data(self):
-        # Load Creatures
-        if os.path.exists(CREATURES_PATH):
-            with open(CREATURES_PATH, 'r') as f:
-                self.creatures_data = json.load(f)
-        
-        # Load Maps
+        self._load_maps()
+        self._build_tables()
+
+    def _zone_properties(self, zone_id: str) -> dict:
+        """Custom properties of a zone's map (encounter_rate, creatures, ...)"""
+        props = self.maps_data[zone_id].get("properties", {})
+        if isinstance(props, list):  # Tiled style [{"name", "value"}]
+            props = {p["name"]: p["value"] for p in props}
+        return props
+
+    def _build_tables(self):
+        """Encounter/loot tables for every loaded zone, plus the default one for unknown zones"""
+        self.default_table = build_zone_table("*", {}, self.creatures)
+        self.zone_tables = {zone_id: build_zone_table(zone_id, self._zone_properties(zone_id), self.creatures)
+                            for zone_id in self.maps_data}
+
+    def _load_maps(self):
+        """Subclasses with their own map format override this (maps are loaded once)"""
         if os.path.exists(MAPS_DIR):
             for filename in os.listdir(MAPS_DIR):
                 if filename.endswith(".json"):
@@ -72,51 +99,37 @@ class ExplorationProcessor(BaseProcessor):
             # Optional: Verify validity and punish/rollback if invalid?
             # if not self.is_valid_move(event.zone_id, event.ex, event.ey): ...
 
-            # 1. Deterministic Loot (10% chance)
-            loot_roll = random.randint(1, 10)
+            rng = self.get_rng(event.player_id)
+            table = self.zone_tables.get(event.zone_id) or self.default_table
+            coins, encounter = table.roll(rng)
             events = []
-            
-            if loot_roll == 1:
-                # Found Coins
-                amount = random.randint(10, 50)
+
+            # 1. Loot (the zone's loot_rate)
+            if coins:
                 events.append(LootFound.create(
                     player_id=event.player_id,
                     zone_id=event.zone_id,
-                    coins_found=amount,
+                    coins_found=coins,
                     item_ids_found=[]
                 ))
 
-            # 2. Combat Encounter (15% chance)
-            # Only in non-safe zones (Town is safe)
-            # We can check map data danger level if we added it to JSON, 
-            # or hardcode town check.
-            if event.zone_id != 'town':
-                import logging
-                logger = logging.getLogger(__name__)
-                combat_roll = random.randint(1, 100)
-                logger.info(f"Exploration Roll: {combat_roll} (Threshold: 100)")
-                
-                if combat_roll <= 15: # 15% Chance
-                    # Load candidates
-                    candidates = self.creatures_data.get("common_creatures", [])
-                    if candidates:
-                        enemy = random.choice(candidates)
-                        stat_block = random.choice(enemy["starting_stats"])
-                        
-                        events.append(CombatStarted.create(
-                            combat_id=f"pve_{event.player_id}_{random.randint(1000,9999)}",
-                            attacker_id=event.player_id,
-                            defender_id=None, # AI
-                            mode="pve",
-                            context={
-                                "enemy_name": enemy["name"],
-                                "enemy_type": enemy["type"],
-                                "enemy_hp": stat_block["HP"],
-                                "enemy_max_hp": stat_block["HP"],
-                                "enemy_stats": stat_block
-                            }
-                        ))
-            
+            # 2. Combat Encounter (the zone's encounter_rate; 0 in safe zones like town)
+            if encounter is not None:
+                enemy, stat_block = encounter
+                events.append(CombatStarted.create(
+                    combat_id=f"pve_{event.player_id}_{rng.randint(1000,9999)}",
+                    attacker_id=event.player_id,
+                    defender_id=None, # AI
+                    mode="pve",
+                    context={
+                        "enemy_name": enemy["name"],
+                        "enemy_type": enemy["type"],
+                        "enemy_hp": stat_block["HP"],
+                        "enemy_max_hp": stat_block["HP"],
+                        "enemy_stats": thaw(stat_block)
+                    }
+                ))
+
             return events
 
         return []
@@ -1,13 +1,9 @@
-import json
 import random
-import os
 from pspf.processors.base import BaseProcessor
 from pspf.events.base import GameEvent
 from pspf.events.companion import CompanionSwapped, CompanionCreated, ChooseStarter
 from pspf.state.base import GameState
-
-# Path to creatures data
-DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "app/data/creatures.json")
+from app.core.content import get_catalog
 
 class CompanionManagementState(GameState):
     owner_id: int
@@ -18,13 +14,7 @@ class CompanionManagementState(GameState):
 class CompanionManagementProcessor(BaseProcessor):
     def __init__(self):
         super().__init__()
-        self.creatures_data = {}
-        self._load_data()
-
-    def _load_data(self):
-        if os.path.exists(DATA_PATH):
-            with open(DATA_PATH, 'r') as f:
-                self.creatures_data = json.load(f)
+        self.creatures = get_catalog().creatures
 
     def process(self, state: CompanionManagementState, event: GameEvent) -> list[GameEvent]:
         if isinstance(event, ChooseStarter):
@@ -33,8 +23,7 @@ class CompanionManagementProcessor(BaseProcessor):
                 return []
             
             # Find starter data
-            starters = self.creatures_data.get("starter_companions", [])
-            choice = next((s for s in starters if s["name"] == event.species_name), None)
+            choice = self.creatures.starters_by_name.get(event.species_name)
             
             if not choice:
                 return [] # Invalid starter
@@ -0,0 +1,75 @@
+"""
+Benchmark: one turn for N concurrent PvE battles, CombatProcessor (one action at a
+time) vs BatchedCombatProcessor (one tick).
+
+Usage:
+    python scripts/bench_combat_batch.py --battles 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.events.combat import CombatStarted, CombatAction
+from pspf.processors.combat import CombatProcessor
+from pspf.processors.combat_batch import BatchedCombatProcessor
+from scripts.bench_combat_turn import make_context, make_gear
+
+
+def start_battles(processor, n: int) -> list:
+    equipped = make_gear(100, 8)
+    enemy_gear = make_gear(200, 8)
+    weapon_ids = [g["id"] for g in equipped if g["item_type"] == "weapon"][:2]
+    actions = []
+    for i in range(n):
+        processor.process(None, CombatStarted.create(
+            combat_id=f"bench-{i}", attacker_id=1, attacker_companion_id=1, mode="pve",
+            context=make_context(equipped, enemy_gear)
+        ))
+        actions.append(CombatAction.create(combat_id=f"bench-{i}", actor_id=1, action_type="attack", stance="berserk", item_ids=weapon_ids))
+    return actions
+
+
+def bench_scalar(n: int, turns: int) -> float:
+    processor = CombatProcessor()
+    actions = start_battles(processor, n)
+    start = time.perf_counter()
+    for _ in range(turns):
+        for action in actions:
+            processor.process(None, action)
+    return (time.perf_counter() - start) / (turns * n) * 1e6
+
+
+def bench_batched(n: int, turns: int) -> tuple:
+    """Returns (resolve, events) us/battle-turn: queue + tick, then building the events"""
+    processor = BatchedCombatProcessor(capacity=n)
+    actions = start_battles(processor, n)
+    resolve = emit = 0.0
+    for _ in range(turns):
+        start = time.perf_counter()
+        for action in actions:
+            processor.process(None, action)
+        events = processor.tick()
+        resolved = time.perf_counter()
+        for _ in events:  # consume like a broadcaster would
+            pass
+        resolve += resolved - start
+        emit += time.perf_counter() - resolved
+    return resolve / (turns * n) * 1e6, emit / (turns * n) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched vs per-action PvE turn resolution")
+    parser.add_argument("--battles", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+    print(f"CombatProcessor:        {bench_scalar(args.battles, args.turns):.1f} us/battle-turn")
+    resolve, emit = bench_batched(args.battles, args.turns)
+    print(f"BatchedCombatProcessor: {resolve + emit:.1f} us/battle-turn ({resolve:.1f} resolve + {emit:.1f} building events)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: bytes per combat turn on the websocket, full TurnProcessed messages (legacy
+clients) vs TurnDelta frames with log records (?log=codes&state=delta, acking every frame).
+
+Usage:
+    python scripts/bench_combat_payload.py --battles 200
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.events.combat import CombatStarted, CombatAction, TurnProcessed
+from pspf.processors.combat import CombatProcessor
+from app.websocket.combat_delta import CombatDeltaEncoder
+from app.websocket.outbound import OutboundEvent
+from app.websocket.router import UserSession
+from scripts.bench_combat_turn import make_context, make_gear
+
+
+def client(log_codes: bool, deltas: bool) -> UserSession:
+    session = UserSession(user_id=1, username="bench")
+    session.log_codes = log_codes
+    session.combat_deltas = CombatDeltaEncoder() if deltas else None
+    return session
+
+
+def run(mode: str, battles: int) -> dict:
+    """Bytes sent to the attacker's client per turn, per encoding"""
+    clients = {"full": client(False, False), "records": client(True, False), "delta": client(True, True)}
+    sent = dict.fromkeys(clients, 0)
+    turns = 0
+    processor = CombatProcessor()
+    equipped = make_gear(100, 8)
+    equipped.append({"id": 150, "name": "Potion", "item_type": "potion", "stats": {"heal": 20}, "effect": {}})
+    weapon_ids = [g["id"] for g in equipped if g["item_type"] == "weapon"][:2]
+    for i in range(battles):
+        context = make_context(equipped, make_gear(200, 8))
+        context.update(player_hp=600, player_max_hp=600, enemy_hp=600, enemy_max_hp=600)
+        start = CombatStarted.create(
+            combat_id=f"bench-{i}", attacker_id=1, attacker_companion_id=1,
+            defender_id=2 if mode == "pvp" else None, defender_companion_id=2 if mode == "pvp" else None,
+            mode=mode, context=context
+        )
+        processor.process(None, start)
+        out = OutboundEvent(start)
+        for session in clients.values():
+            out.for_client(session)
+
+        turn = 0
+        while start.combat_id in processor.sessions:
+            turn += 1
+            item_ids = weapon_ids + [150] if turn == 3 else weapon_ids
+            events = processor.process(None, CombatAction.create(combat_id=start.combat_id, actor_id=1, action_type="attack", stance="berserk", item_ids=item_ids))
+            if mode == "pvp":
+                events = processor.process(None, CombatAction.create(combat_id=start.combat_id, actor_id=2, action_type="attack", item_ids=[]))
+            turns += 1
+            for evt in events:
+                if not isinstance(evt, TurnProcessed):
+                    continue
+                out = OutboundEvent(evt)
+                for name, session in clients.items():
+                    data = out.for_client(session)
+                    sent[name] += len(data)
+                    if session.combat_deltas is not None:
+                        frame = json.loads(data)
+                        session.combat_deltas.ack(frame["combat_id"], frame["v"])
+    return {name: total / turns for name, total in sent.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Websocket bytes per combat turn by encoding")
+    parser.add_argument("--battles", type=int, default=200)
+    args = parser.parse_args()
+    for mode in ["pve", "pvp"]:
+        result = run(mode, args.battles)
+        print(f"{mode}: full {result['full']:.0f} B/turn, log records {result['records']:.0f} B/turn, delta frames {result['delta']:.0f} B/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: PvE/PvP turn latency of CombatProcessor with a full loadout.
+
+Usage:
+    python scripts/bench_combat_turn.py --turns 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.events.combat import CombatStarted, CombatAction
+from pspf.processors.combat import CombatProcessor
+
+ELEMENTS = ["Fire", "Water", "Wind", "Earth", "Light", "Shadow"]
+
+
+def make_gear(base_id: int, count: int) -> list:
+    gear = []
+    for i in range(count):
+        kind = ["weapon", "weapon", "armor", "shield"][i % 4]
+        icons = {ELEMENTS[i % 6]: 10 + i, ELEMENTS[(i + 2) % 6].lower(): 5}
+        stats = {"atk": icons, "def": {"Phys": 3}} if kind == "weapon" else {"def": icons}
+        effect = {"type": "reflect", "chance": 0.1} if kind == "shield" else {}
+        gear.append({"id": base_id + i, "name": f"{kind.title()} {i}", "item_type": kind, "stats": stats, "effect": effect})
+    return gear
+
+
+def make_context(equipped: list, enemy_gear: list) -> dict:
+    return {
+        "companion_element": "Fire", "enemy_type": "Wind",
+        "player_hp": 10**9, "player_max_hp": 10**9, "player_stats": {"str": 12, "def": 6},
+        "enemy_hp": 10**9, "enemy_max_hp": 10**9, "enemy_stats": {"STR": 9, "DEF": 4, "str": 9, "def": 4},
+        "enemy_weapons": [g for g in enemy_gear if g["item_type"] == "weapon"],
+        "enemy_items": [g for g in enemy_gear if g["item_type"] != "weapon"],
+        "equipped_items": equipped,
+    }
+
+
+def bench(mode: str, turns: int, text_log: bool = True) -> float:
+    processor = CombatProcessor(text_log=text_log)
+    equipped = make_gear(100, 8)
+    weapon_ids = [g["id"] for g in equipped if g["item_type"] == "weapon"][:2]
+    processor.process(None, CombatStarted.create(
+        combat_id="bench", attacker_id=1, attacker_companion_id=1,
+        defender_id=2 if mode == "pvp" else None, defender_companion_id=2 if mode == "pvp" else None,
+        mode=mode, context=make_context(equipped, make_gear(200, 8))
+    ))
+    actions = [CombatAction.create(combat_id="bench", actor_id=1, action_type="attack", stance="berserk", item_ids=weapon_ids)]
+    if mode == "pvp":
+        actions.append(CombatAction.create(combat_id="bench", actor_id=2, action_type="attack", item_ids=[]))
+
+    start = time.perf_counter()
+    for _ in range(turns):
+        for action in actions:
+            processor.process(None, action)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CombatProcessor turn latency benchmark")
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args()
+    for mode in ["pve", "pvp"]:
+        bench(mode, min(1000, args.turns))  # warm-up
+        print(f"{mode}: {bench(mode, args.turns):.1f} us/turn, {bench(mode, args.turns, text_log=False):.1f} us/turn log records only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: exploration rolls per second, the old inline rolls (two randint per step,
+random.choice over creatures.json on every encounter) vs a zone's precompiled alias table.
+Also times a full ExplorationProcessor.process step, events included.
+
+Usage:
+    python scripts/bench_exploration_rolls.py --rolls 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.events.movement import PlayerMoved
+from pspf.processors.exploration import ExplorationProcessor
+from app.core.content import thaw
+
+
+def inline_rolls(rng, creatures_data, rolls):
+    """What process() used to do per step, minus building the events"""
+    found = 0
+    for _ in range(rolls):
+        if rng.randint(1, 10) == 1:
+            rng.randint(10, 50)
+            found += 1
+        if rng.randint(1, 100) <= 15:
+            candidates = creatures_data.get("common_creatures", [])
+            if candidates:
+                enemy = rng.choice(candidates)
+                rng.choice(enemy["starting_stats"])
+                found += 1
+    return found
+
+
+def table_rolls(rng, table, rolls):
+    found = 0
+    roll = table.roll
+    for _ in range(rolls):
+        coins, encounter = roll(rng)
+        found += (coins > 0) + (encounter is not None)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exploration rolls per second")
+    parser.add_argument("--rolls", type=int, default=1_000_000)
+    args = parser.parse_args()
+    processor = ExplorationProcessor(seed=1)
+    table = processor.zone_tables.get("wild") or processor.default_table
+
+    for name, run in [
+        ("inline randint/choice", lambda: inline_rolls(random.Random(1), {"common_creatures": thaw(processor.creatures.common)}, args.rolls)),
+        ("alias table", lambda: table_rolls(random.Random(1), table, args.rolls)),
+    ]:
+        start = time.perf_counter()
+        found = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {args.rolls / elapsed:,.0f} rolls/s ({found} loot + encounters)")
+
+    steps = args.rolls // 10
+    event = PlayerMoved.create(player_id=1, zone_id="wild", x=5, y=5)
+    start = time.perf_counter()
+    for _ in range(steps):
+        processor.process(None, event)
+    elapsed = time.perf_counter() - start
+    print(f"process(PlayerMoved): {steps / elapsed:,.0f} steps/s")
+
+
+if __name__ == "__main__":
+    main()
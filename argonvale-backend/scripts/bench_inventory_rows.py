@@ -0,0 +1,116 @@
+"""
+Benchmark: owned item rows that copy their template's columns (name, description, image,
+category, weapon_stats/effect JSON, price, rarity) vs normalized rows that only reference
+the template (migrate_v12.py). Builds a database of copies, migrates a copy of it, and
+reports the file size, bytes per owned row, and the time to load inventories through the ORM.
+
+Usage:
+    python scripts/bench_inventory_rows.py --templates 300 --users 500 --items 40
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core.content import ItemCatalog, reload_catalog
+from app.db.session import Base
+from app.models.item import Item
+from app.models.user import User
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(BACKEND_DIR)
+from migrate_v12 import migrate  # noqa: E402
+
+
+def seed(path: str, templates: int, users: int, items: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(1)
+    kinds = [("weapon", "weapons"), ("shield", "armor"), ("armor", "armor")]
+    rows = []
+    for i in range(templates):
+        item_type, category = kinds[i % len(kinds)]
+        rows.append(dict(
+            id=i + 1, name=f"Template {i}", item_type=item_type, category=category, is_template=True, stock=0,
+            description=f"A {item_type} forged in the depths of Argonvale, said to have belonged to hero number {i}.",
+            image_url=f"{item_type}_{i}.png", price=rng.randint(10, 900), rarity=rng.choice(["Common", "Uncommon", "Rare"]),
+            weapon_stats={"attack": {"physical": rng.randint(1, 30), "fire": rng.randint(0, 10)}, "defense": {"physical": rng.randint(0, 15)}},
+            effect={"type": "freeze", "chance": 0.25, "duration": 1} if i % 5 == 0 else {},
+        ))
+    user_rows = [dict(id=u + 1, username=f"user{u}", email=f"user{u}@example.com", coins=0) for u in range(users)]
+    # Every owned item a full copy of its template, as before normalization
+    copies = []
+    for u in range(users):
+        for template in rng.sample(rows, min(items, templates)):
+            copies.append({**template, "id": None, "is_template": False, "owner_id": u + 1, "template_id": template["id"], "stock": 1})
+    with engine.begin() as conn:
+        conn.execute(Item.__table__.insert(), rows)
+        conn.execute(User.__table__.insert(), user_rows)
+        conn.execute(Item.__table__.insert(), [{k: v for k, v in c.items() if k != "id"} for c in copies])
+    engine.dispose()
+
+
+def measure(path: str, users: int, rounds: int) -> dict:
+    engine = create_engine(f"sqlite:///{path}")
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    reload_catalog(ItemCatalog.load(db))
+    owned = db.query(Item).filter(Item.owner_id != None).count()
+    db.close()
+    times = []
+    for r in range(rounds):
+        db = Session()
+        start = time.perf_counter()
+        for user_id in range(1, users + 1):
+            for item in db.query(Item).filter(Item.owner_id == user_id).all():
+                item.weapon_stats, item.description
+        times.append(time.perf_counter() - start)
+        db.close()
+    engine.dispose()
+    size = os.path.getsize(path)
+    return {"size": size, "owned": owned, "load": statistics.median(times)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Owned item rows: template copies vs references")
+    parser.add_argument("--templates", type=int, default=300)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--items", type=int, default=40, help="owned items per user")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        copies = os.path.join(work, "copies.db")
+        seed(copies, args.templates, args.users, args.items)
+        normalized = os.path.join(work, "normalized.db")
+        shutil.copy(copies, normalized)
+        migrate(normalized)
+        # Same page layout for both: vacuum the copies too
+        engine = create_engine(f"sqlite:///{copies}")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        engine.dispose()
+
+        print()
+        for name, path in [("template copies", copies), ("template references", normalized)]:
+            m = measure(path, args.users, args.rounds)
+            print(f"{name}: {m['size'] / 1024:.0f} KiB, {m['size'] / m['owned']:.0f} bytes per owned row, "
+                  f"loading {args.users} inventories {m['load'] * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
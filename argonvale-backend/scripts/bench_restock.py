@@ -0,0 +1,158 @@
+"""
+Benchmark: one shop restock against a catalog of 10k item templates, the old row-by-row
+restock (ORM dedupe in a dict, one DELETE/INSERT per row, run inline on the event loop) vs
+the set-based restock_shop (GROUP BY merge, one upsert, run in a thread). Each run gets a
+fresh copy of the same SQLite database; reports the restock time and the longest event
+loop stall while it ran.
+
+Usage:
+    python scripts/bench_restock.py --templates 10000 --listings 5000 --runs 3
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core.content import ItemCatalog, thaw
+from app.db.session import Base
+from app.models.item import Item, SHOP_LISTING_INDEX
+from app.services.restock_service import CATEGORIES, RARITY_WEIGHTS, STOCK_AMOUNTS, restock_shop
+
+
+def seed(path: str, templates: int, listings: int, duplicates: float):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    # Legacy databases have duplicate listings, which the unique index would refuse
+    SHOP_LISTING_INDEX.drop(bind=engine)
+    rng = random.Random(1)
+    rarities = list(RARITY_WEIGHTS)
+    rows = [dict(name=f"Item {i}", item_type="misc", category=CATEGORIES[i % 4], rarity=rng.choices(rarities, list(RARITY_WEIGHTS.values()))[0],
+                 price=rng.randint(5, 500), stock=0, is_template=True, weapon_stats={"attack": {"physical": i % 30}}, effect={})
+            for i in range(templates)]
+    listed = rng.sample(rows, min(listings, templates))
+    listed += [rng.choice(listed) for _ in range(int(len(listed) * duplicates))]
+    rows += [dict(row, stock=rng.randint(1, 10), is_template=False) for row in listed]
+    with engine.begin() as conn:
+        conn.execute(Item.__table__.insert(), rows)
+    engine.dispose()
+
+
+def row_by_row_restock(db, catalog: ItemCatalog):
+    """The previous restock_shop"""
+    unique_map = {}
+    for item in db.query(Item).filter(Item.owner_id == None, Item.is_template == False).all():
+        key = (item.name, item.rarity)
+        if key in unique_map:
+            unique_map[key].stock += item.stock
+            db.delete(item)
+        else:
+            unique_map[key] = item
+    db.flush()
+    for cat in CATEGORIES:
+        available = list(catalog.by_category.get(cat, ()))
+        selection = []
+        for _ in range(min(10, len(available))):
+            rarity = random.choices(list(RARITY_WEIGHTS.keys()), weights=list(RARITY_WEIGHTS.values()), k=1)[0]
+            eligible = [t for t in available if t.rarity == rarity] or available
+            template = random.choice(eligible)
+            selection.append(template)
+            available.remove(template)
+        for template in selection:
+            min_s, max_s = STOCK_AMOUNTS.get(template.rarity, (1, 1))
+            new_stock = 1 if template.rarity == "Relic" else random.randint(min_s, max_s)
+            existing = unique_map.get((template.name, template.rarity))
+            if existing:
+                existing.stock += new_stock
+            else:
+                listing = Item(name=template.name, item_type=template.item_type, description=template.description,
+                               image_url=template.image_url, category=template.category, weapon_stats=thaw(template.weapon_stats),
+                               effect=thaw(template.effect), price=template.price, rarity=template.rarity, stock=new_stock,
+                               is_template=False, owner_id=None)
+                db.add(listing)
+                unique_map[(template.name, template.rarity)] = listing
+    db.commit()
+
+
+async def timed(restock, in_thread: bool):
+    """(restock seconds, longest loop stall seconds)"""
+    stall = 0.0
+    done = False
+
+    async def tick():
+        nonlocal stall
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stall = max(stall, now - last)
+            last = now
+
+    ticker = asyncio.create_task(tick())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    if in_thread:
+        await asyncio.to_thread(restock)
+    else:
+        restock()
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.01)
+    done = True
+    await ticker
+    return elapsed, stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shop restock time and event loop stall")
+    parser.add_argument("--templates", type=int, default=10_000)
+    parser.add_argument("--listings", type=int, default=5_000, help="existing system listings")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="extra duplicate listings, as a fraction")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        base = os.path.join(work, "base.db")
+        seed(base, args.templates, args.listings, args.duplicates)
+        engine = create_engine(f"sqlite:///{base}")
+        db = sessionmaker(bind=engine)()
+        catalog = ItemCatalog.load(db)
+        db.close()
+        engine.dispose()
+        print(f"{len(catalog.templates)} templates, {args.listings} listings (+{args.duplicates:.0%} duplicates)")
+
+        for name, restock, in_thread in [
+            ("row-by-row, on the loop", row_by_row_restock, False),
+            ("set-based, in a thread", lambda db, catalog: restock_shop(db, catalog), True),
+        ]:
+            times, stalls = [], []
+            for run in range(args.runs):
+                path = os.path.join(work, f"run{run}.db")
+                shutil.copy(base, path)
+                engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+                db = sessionmaker(bind=engine)()
+                random.seed(run)
+                elapsed, stall = asyncio.run(timed(lambda: restock(db, catalog), in_thread))
+                db.close()
+                engine.dispose()
+                times.append(elapsed)
+                stalls.append(stall)
+            print(f"{name}: restock median {statistics.median(times) * 1000:.1f} ms, "
+                  f"longest loop stall {max(stalls) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
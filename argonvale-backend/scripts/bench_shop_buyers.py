@@ -0,0 +1,132 @@
+"""
+Benchmark: 500 simultaneous buyers of the same shop listing (a one-stock Relic just after a
+restock), through FastAPI's threadpool size of workers. Compares the old purchase (read the
+listing, check coins in Python, write the new stock back) with buy_item (admission gate,
+then conditional UPDATEs). Reports units sold against the stock, oversold units, errors,
+how many buyers reached the database, and wall time.
+
+Usage:
+    python scripts/bench_shop_buyers.py --buyers 500 --stock 1
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401  (registers every table)
+from app.api import shop
+from app.db.session import Base
+from app.models.item import Item
+from app.models.user import User
+from app.services.shop_catalog import ShopCatalog
+
+
+def seed(path: str, buyers: int, stock: int) -> int:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([User(username=f"buyer{i}", email=f"buyer{i}@example.com", hashed_password="x", coins=5000) for i in range(buyers)])
+    relic = Item(name="Crown of Ages", item_type="armor", category="armor", rarity="Relic", price=1000, stock=stock)
+    db.add(relic)
+    db.commit()
+    listing_id = relic.id
+    db.close()
+    engine.dispose()
+    return listing_id
+
+
+def legacy_buy(item_id: int, db, current_user):
+    """The previous buy_item"""
+    item_listing = db.query(Item).filter(Item.id == item_id, Item.owner_id == None, Item.is_template == False, Item.stock > 0).first()
+    if not item_listing:
+        raise HTTPException(status_code=404, detail="Item out of stock or not found")
+    if current_user.coins < item_listing.price:
+        raise HTTPException(status_code=400, detail="Insufficient coins")
+    try:
+        current_user.coins -= item_listing.price
+        item_listing.stock -= 1
+        db.add(Item(name=item_listing.name, item_type=item_listing.item_type, category=item_listing.category,
+                    price=item_listing.price, rarity=item_listing.rarity, owner_id=current_user.id, is_template=False, stock=1))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Transaction failed: {str(e)}")
+
+
+def one_run(buy, base: str, work: str, name: str, buyers: int, threads: int, stock: int, listing_id: int):
+    path = os.path.join(work, f"{name}.db")
+    shutil.copy(base, path)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, poolclass=NullPool)
+    Session = sessionmaker(bind=engine)
+    writes = Counter()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE items"):
+            writes["listing updates"] += 1
+
+    shop.shop_catalog = ShopCatalog(session_factory=Session)
+    results = Counter()
+    start_gate = threading.Barrier(min(threads, buyers))
+
+    def buyer(i: int):
+        db = Session()
+        try:
+            user = db.query(User).filter(User.username == f"buyer{i}").first()
+            if i < threads:
+                start_gate.wait()
+            try:
+                buy(listing_id, db, user)
+                results["bought"] += 1
+            except HTTPException as e:
+                results[e.status_code] += 1
+        finally:
+            db.close()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(buyer, range(buyers)))
+    elapsed = time.perf_counter() - t0
+
+    db = Session()
+    sold = db.query(Item).filter(Item.name == "Crown of Ages", Item.owner_id != None).count()
+    left = db.query(Item.stock).filter(Item.id == listing_id).scalar()
+    db.close()
+    engine.dispose()
+    errors = results[500]
+    print(f"{name}: sold {sold} of {stock} (oversold {max(0, sold - stock)}, stock left {left}), "
+          f"{errors} errors, {writes['listing updates']} listing writes, {elapsed * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simultaneous buyers of one shop listing")
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=40, help="request threads (FastAPI's threadpool has 40)")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        base = os.path.join(work, "base.db")
+        listing_id = seed(base, args.buyers, args.stock)
+        for name, buy in [("read-check-write", legacy_buy), ("conditional updates + gate", shop.buy_item)]:
+            one_run(buy, base, work, name, args.buyers, args.threads, args.stock, listing_id)
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark: fan-out of one TurnProcessed to N spectators, encoding per socket (as the PvP
+opponent broadcast does) vs SpectatorChannels (one encoding per group, shared bytes).
+
+Usage:
+    python scripts/bench_spectators.py --watchers 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.events.combat import CombatStarted, CombatAction
+from pspf.processors.combat import CombatProcessor
+from app.websocket.outbound import OutboundEvent, turn_message
+from app.websocket.router import SpectatorChannels
+from scripts.bench_combat_turn import make_context, make_gear
+
+
+class NullSocket:
+    async def send_text(self, data):
+        pass
+
+
+def turn_event():
+    processor = CombatProcessor()
+    processor.process(None, CombatStarted.create(
+        combat_id="bench", attacker_id=1, attacker_companion_id=1, defender_id=2, defender_companion_id=2,
+        mode="pvp", context=make_context(make_gear(100, 8), make_gear(200, 8))
+    ))
+    processor.process(None, CombatAction.create(combat_id="bench", actor_id=1, action_type="attack", item_ids=[100, 101]))
+    return processor.process(None, CombatAction.create(combat_id="bench", actor_id=2, action_type="attack", item_ids=[]))[0]
+
+
+async def per_socket(evt, sockets):
+    for ws in sockets:
+        msg = evt.model_dump(mode='json')
+        msg["type"] = "TurnProcessed"
+        await ws.send_text(json.dumps([turn_message(msg, False, False)]))
+
+
+async def shared(evt, channels):
+    await channels.publish("bench", OutboundEvent(evt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spectator fan-out cost per watcher")
+    parser.add_argument("--watchers", type=int, default=5000)
+    args = parser.parse_args()
+    evt = turn_event()
+    sockets = [NullSocket() for _ in range(args.watchers)]
+    channels = SpectatorChannels()
+    for ws in sockets:
+        channels.subscribe("bench", ws)
+
+    for name, run in [("encode per socket", lambda: per_socket(evt, sockets)), ("serialize once", lambda: shared(evt, channels))]:
+        asyncio.run(run())  # warm-up
+        start = time.perf_counter()
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {elapsed * 1e3:.1f} ms per event, {elapsed / args.watchers * 1e6:.2f} us per watcher")
+
+
+if __name__ == "__main__":
+    main()
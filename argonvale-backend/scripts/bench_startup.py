@@ -0,0 +1,94 @@
+"""
+Benchmark: how long a fresh server takes to come up, as a rolling deploy sees it.
+Starts uvicorn on a free port (in a temp dir, so against a fresh SQLite database) and
+reports, from process start, when it first answers /health/live, when the first WebSocket
+handshake is accepted, and when /health/ready turns 200.
+
+Usage:
+    python scripts/bench_startup.py --runs 3
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from websockets.sync.client import connect
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_ok(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as res:
+            return res.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def ws_accepted(url: str) -> bool:
+    try:
+        with connect(url, open_timeout=30):
+            return True
+    except Exception:
+        return False
+
+
+def one_run(timeout: float) -> dict:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    work = tempfile.mkdtemp()
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR, MAP_WATCH_SECONDS="0")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=work, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    marks = {}
+    try:
+        while "live" not in marks:
+            if time.perf_counter() - start > timeout or server.poll() is not None:
+                raise RuntimeError("server did not come up")
+            if http_ok(base + "/health/live"):
+                marks["live"] = time.perf_counter() - start
+            else:
+                time.sleep(0.005)
+        # Handshake with no token: the server accepts (once ready), then closes with 4003
+        if ws_accepted(f"ws://127.0.0.1:{port}/ws"):
+            marks["first websocket"] = time.perf_counter() - start
+        while not http_ok(base + "/health/ready"):
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("server never became ready")
+            time.sleep(0.005)
+        marks["ready"] = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first accepted WebSocket")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+    runs = [one_run(args.timeout) for _ in range(args.runs)]
+    for mark in ("live", "first websocket", "ready"):
+        times = [r[mark] for r in runs if mark in r]
+        if times:
+            print(f"{mark}: median {statistics.median(times) * 1000:.0f} ms (min {min(times) * 1000:.0f}, max {max(times) * 1000:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Generates a large infinite Tiled map (ground, scattered rock walls, a warp back to town) and
+loads it the way the server does, reporting compile time, a cold and a warm walk across it
+and how many chunks stay cached.
+
+Usage:
+    python scripts/generate_world.py --size 2048 --out /tmp/frontier.tmj
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.processors.map_compiler import load_map
+
+TILED_CHUNK = 16
+
+
+def generate(size: int, seed: int = 1, wall_rate: float = 0.08) -> dict:
+    rng = random.Random(seed)
+    ground, walls = [], []
+    for cy in range(0, size, TILED_CHUNK):
+        for cx in range(0, size, TILED_CHUNK):
+            ground.append({"x": cx, "y": cy, "width": TILED_CHUNK, "height": TILED_CHUNK,
+                           "data": [1] * (TILED_CHUNK * TILED_CHUNK)})
+            walls.append({"x": cx, "y": cy, "width": TILED_CHUNK, "height": TILED_CHUNK,
+                          "data": [5 if rng.random() < wall_rate else 0 for _ in range(TILED_CHUNK * TILED_CHUNK)]})
+    return {
+        "infinite": True, "width": TILED_CHUNK, "height": TILED_CHUNK, "tilewidth": 16, "tileheight": 16,
+        "layers": [
+            {"type": "tilelayer", "name": "Ground", "chunks": ground},
+            {"type": "tilelayer", "name": "Collision", "visible": False, "chunks": walls},
+            {"type": "objectgroup", "name": "Warps", "objects": [
+                {"x": 0, "y": 0, "width": 16, "height": 16,
+                 "properties": [{"name": "target_zone", "value": "town"}]},
+            ]},
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=2048, help="world width/height in tiles")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="where to write the .tmj (default: a temp dir)")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    out = args.out or os.path.join(work, "frontier.tmj")
+    with open(out, "w") as f:
+        json.dump(generate(args.size, args.seed), f, separators=(",", ":"))
+    print(f"{args.size}x{args.size} world -> {out} ({os.path.getsize(out) / 1e6:.1f} MB)")
+
+    cache = os.path.join(work, "cache")
+    start = time.perf_counter()
+    world = load_map(out, cache)
+    print(f"compile: {time.perf_counter() - start:.2f}s, reload: ", end="")
+    start = time.perf_counter()
+    world = load_map(out, cache)
+    print(f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+    # A diagonal walk touches a fresh chunk every chunk_size tiles
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        walkable = sum(world.is_walkable(i, i) for i in range(args.size))
+        elapsed = time.perf_counter() - start
+        print(f"{label} walk: {args.size / elapsed:,.0f} checks/s ({walkable} walkable)")
+    print(f"chunks cached: {len(world.bits)} of {len(world.chunks_around(0, 0, args.size))}")
+
+
+if __name__ == "__main__":
+    main()
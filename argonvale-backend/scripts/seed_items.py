@@ -7,9 +7,10 @@ from sqlalchemy.orm import Session
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from app.db.session import SessionLocal
-from app.models.item import Item
+from app.models.item import Item, SHOP_LISTING
+from app.services.template_service import seed_templates
 
-def generate_weapons():
+def generate_weapons(rng=random):
     tiers = [
         {"name": "Low", "range": (5, 12), "price_range": (50, 200), "count": 40},
         {"name": "Mid", "range": (13, 28), "price_range": (300, 800), "count": 40},
@@ -21,39 +22,39 @@ def generate_weapons():
     elements = ["Phys", "Fire", "Water", "Wind", "Earth", "Light", "Shadow"]
     
     weapons = []
+    # Templates are keyed by (name, rarity): draw distinct names
+    names = iter(rng.sample([f"{p} {t}" for p in prefixes for t in types], sum(t["count"] for t in tiers)))
     
     for tier in tiers:
         for i in range(tier["count"]):
-            prefix = random.choice(prefixes)
-            w_type = random.choice(types)
-            name = f"{prefix} {w_type}"
+            name = next(names)
             
             # Icons
-            total_icons = random.randint(*tier["range"])
+            total_icons = rng.randint(*tier["range"])
             icon_dict = {}
             
             # Distribute icons
             remaining = total_icons
             # Primary element
-            primary = random.choice(elements)
-            p_val = int(remaining * random.uniform(0.6, 0.9))
+            primary = rng.choice(elements)
+            p_val = int(remaining * rng.uniform(0.6, 0.9))
             icon_dict[primary] = p_val
             remaining -= p_val
             
             # Secondary element (if any icons left)
             if remaining > 0:
-                secondary = random.choice([e for e in elements if e != primary])
+                secondary = rng.choice([e for e in elements if e != primary])
                 icon_dict[secondary] = remaining
             
             # Split between Atk and Def icons
             # Weapons are mostly Atk
-            atk_pct = random.uniform(0.7, 1.0)
+            atk_pct = rng.uniform(0.7, 1.0)
             atk_dict = {k: int(v * atk_pct) for k, v in icon_dict.items() if int(v * atk_pct) > 0}
             def_dict = {k: v - atk_dict.get(k, 0) for k, v in icon_dict.items() if v - atk_dict.get(k, 0) > 0}
             
             # Special effects (rare)
             effect = {}
-            if tier["name"] == "High" or random.random() < 0.1:
+            if tier["name"] == "High" or rng.random() < 0.1:
                 if primary in ["Water", "Light"]:
                     effect = {"type": "freeze", "chance": 0.1, "duration": 1}
                 elif primary in ["Shadow", "Wind"]:
@@ -64,7 +65,7 @@ def generate_weapons():
                 "item_type": "weapon",
                 "stats": {"atk": atk_dict, "def": def_dict},
                 "effect": effect,
-                "price": random.randint(*tier["price_range"])
+                "price": rng.randint(*tier["price_range"])
             })
 
     # Hybrid & Reflective Gear
@@ -92,17 +93,17 @@ def generate_weapons():
     
     for r_name in relic_names:
         # Relics are Tier 4
-        primary = random.choice(elements)
-        secondary = random.choice([e for e in elements if e != primary])
+        primary = rng.choice(elements)
+        secondary = rng.choice([e for e in elements if e != primary])
         
         weapons.append({
             "name": f"Relic: {r_name}",
             "item_type": "weapon",
             "stats": {
-                "atk": {primary: random.randint(35, 50), secondary: random.randint(15, 25)},
-                "def": {primary: random.randint(10, 20)}
+                "atk": {primary: rng.randint(35, 50), secondary: rng.randint(15, 25)},
+                "def": {primary: rng.randint(10, 20)}
             },
-            "effect": {"type": "freeze" if random.random() < 0.5 else "stealth", "chance": 0.2, "duration": 2},
+            "effect": {"type": "freeze" if rng.random() < 0.5 else "stealth", "chance": 0.2, "duration": 2},
             "price": 5000
         })
         
@@ -111,9 +112,9 @@ def generate_weapons():
 def seed_items():
     db: Session = SessionLocal()
     try:
-        # Clear existing system items
-        db.query(Item).filter(Item.owner_id == None).delete()
-        db.commit()
+        # Clear existing shop listings; templates are updated in place below, so the ids owned items
+        # refer to stay valid
+        db.query(Item).filter(SHOP_LISTING).delete()
 
         items_data = []
         
@@ -163,7 +164,7 @@ def seed_items():
             })
 
         # Add to DB
-        count = 0
+        rows = []
         for data in items_data:
             # Determine Rarity
             name = data["name"]
@@ -183,7 +184,7 @@ def seed_items():
             elif itype in ["shield", "armor"]: cat = "armor"
             elif itype == "misc": cat = "utility"
 
-            new_item = Item(
+            rows.append(dict(
                 name=data["name"],
                 item_type=itype,
                 category=cat,
@@ -191,16 +192,16 @@ def seed_items():
                 effect=data.get("effect", {}),
                 price=data.get("price", 0),
                 rarity=rarity,
-                stock=0, # Templates have 0 stock
-                is_template=True,
-                owner_id=None,
                 is_equipped=False
-            )
-            db.add(new_item)
-            count += 1
+            ))
         
+        # Upserted by (name, rarity); items owned from changed or removed templates keep their values
+        counts = seed_templates(db, rows)
         db.commit()
-        print(f"Successfully seeded {count} item templates.")
+        print(f"Successfully seeded {len(rows) - counts['skipped']} item templates "
+              f"({counts['added']} new, {counts['updated']} changed, {counts['removed']} removed).")
+        if counts["skipped"]:
+            print(f"Skipped {counts['skipped']} rows repeating a (name, rarity) seeded above.")
 
     except Exception as e:
         print(f"Error seeding items: {e}")
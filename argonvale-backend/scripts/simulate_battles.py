@@ -0,0 +1,482 @@
+"""
+Offline Monte-Carlo battle simulator for balance tuning.
+
+Runs batches of PvE/PvP battles as NumPy array operations using the exact
+formulas of CombatProcessor (type chart, stances, crit/variance, mitigation,
+weapon freeze, shield reflect and the PvE AI's stance/gear selection).
+Consumables and AI support items (heal/stealth/freeze) are not simulated.
+
+Usage:
+    python scripts/simulate_battles.py --battles 1000000 --mode pve --stance berserk
+    python scripts/simulate_battles.py --battles 200000 --mode pvp --from-db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pspf.processors.combat import CombatProcessor
+from app.core.content import get_catalog, thaw
+
+# Element columns of every icon vector. Elements outside the type chart behave like Phys (x1.0).
+ELEMENTS = ["Phys", "Fire", "Water", "Wind", "Earth", "Light", "Shadow"]
+STANCES = {"normal": (1.0, 1.0), "berserk": (1.2, 0.8), "defensive": (0.8, 1.2)}
+AI_STANCES = ["normal", "berserk", "defensive"]
+
+# Outcomes
+WIN, LOSS, TIMEOUT, DRAW = 1, -1, 0, 2
+
+
+def element_index(name) -> int:
+    cap = str(name or "Phys").capitalize()
+    return ELEMENTS.index(cap) if cap in ELEMENTS else 0
+
+
+def type_multipliers(type_chart: dict) -> np.ndarray:
+    """(attacking element, defending element) -> multiplier, as CombatProcessor.TYPE_CHART"""
+    mult = np.ones((len(ELEMENTS), len(ELEMENTS)))
+    for a, row in type_chart.items():
+        if a not in ELEMENTS:
+            continue
+        for d, m in row.items():
+            if d in ELEMENTS:
+                mult[ELEMENTS.index(a), ELEMENTS.index(d)] = m
+    return mult
+
+
+def _split_stats(item: dict):
+    stats = item.get("stats", {}) or {}
+    a_val = stats.get("atk", {}) or stats.get("attack", {})
+    d_val = stats.get("def", {}) or stats.get("defense", {})
+    return a_val, d_val
+
+
+def _icon_vector(value) -> np.ndarray:
+    vec = np.zeros(len(ELEMENTS))
+    if isinstance(value, dict):
+        for k, v in value.items():
+            vec[element_index(k)] += v
+    elif isinstance(value, (int, float)):
+        vec[0] += value
+    return vec
+
+
+def _icon_sum(value) -> float:
+    if isinstance(value, dict): return sum(value.values())
+    if isinstance(value, (int, float)): return value
+    return 0
+
+
+def mitigation(defense, def_mod):
+    return 20 / (20 + (defense * def_mod))
+
+
+def damage_kernel(scaled, atk_mod, u_crit, u_var):
+    """
+    Vectorized CombatProcessor.calculate_damage (non-stealth path).
+    `scaled` is the type-adjusted icon total already multiplied by mitigation (the first
+    product the processor evaluates); u_crit/u_var are the two uniform draws it makes.
+    Returns (damage, is_crit).
+    """
+    is_crit = u_crit < 0.05
+    crit_mult = np.where(is_crit, 1.5, 1.0)
+    variance = 0.9 + (1.1 - 0.9) * u_var  # random.uniform(0.9, 1.1)
+    final = scaled * atk_mod * variance * crit_mult
+    return np.maximum(1, np.trunc(final)).astype(np.int64), is_crit
+
+
+class GearTable:
+    """
+    Compiled gear sets, one row per loadout. Icon sums are integers, so
+    per-element totals are exact regardless of summation order.
+    """
+    def __init__(self, mult: np.ndarray):
+        self.mult = mult
+        self.names = []
+        self.atk_total = []      # player: selected weapons + passives, typed per defender element
+        self.atk_sum = []        # raw icon sum (reflect damage base)
+        self.def_icons = []      # player passives + selected weapons
+        self.freeze = []         # weapon/passive freeze chance
+        self.passive_def = []    # PvE enemy: armor/shield def icons from enemy_items
+        self.reflect = []        # armor/shield reflect chance
+        self.support = []        # has AI support items (not simulated)
+        self.ai_weapon_total = []
+        self.ai_defensive_total = []
+
+    def _typed(self, vec: np.ndarray) -> np.ndarray:
+        return vec @ self.mult  # (elements,) -> total per defending element
+
+    def add(self, weapons: list = (), items: list = (), name: str = "") -> int:
+        """
+        Compile one loadout. `weapons` are the selected weapons (player) or enemy_weapons (AI),
+        `items` the armor/shields (player passives) or enemy_items (AI).
+        """
+        atk_vec = np.zeros(len(ELEMENTS))
+        def_icons = 0
+        freeze = 0
+        passive_def = 0
+        reflect = 0
+        gear = [(item, True) for item in weapons] + [(item, False) for item in items]
+        for item, selected in gear:
+            itype = item.get("item_type")
+            is_passive = itype in ["armor", "shield"]
+            a_val, d_val = _split_stats(item)
+            eff = item.get("effect", {}) or {}
+            if (itype == "weapon" and selected) or is_passive:
+                atk_vec += _icon_vector(a_val)
+                def_icons += _icon_sum(d_val)
+                if eff.get("type") == "freeze":
+                    freeze = max(freeze, eff.get("chance", 0))
+            if is_passive and not selected:
+                passive_def += _icon_sum(d_val)
+                if eff.get("type") == "reflect":
+                    reflect = max(reflect, eff.get("chance", 0))
+
+        # Items the PvE AI would use as consumables instead of attacking
+        support = any(i.get("type") in ["heal", "stealth", "freeze"] or (i.get("effect") or {}).get("type") in ["stealth", "freeze"] for i in items)
+
+        # PvE AI pools (CombatProcessor: enemy_weapons + enemy_items, top 2 by atk / def, stable sort)
+        weapon_pool, defensive_pool = [], []
+        for item in list(weapons) + list(items):
+            if not item.get("stats"): continue
+            a_val, d_val = _split_stats(item)
+            atk_sum, def_sum = _icon_sum(a_val), _icon_sum(d_val)
+            if atk_sum > 0: weapon_pool.append((atk_sum, _icon_vector(a_val)))
+            if def_sum > 0: defensive_pool.append((def_sum, _icon_vector(a_val)))
+        weapon_pool.sort(key=lambda x: x[0], reverse=True)
+        defensive_pool.sort(key=lambda x: x[0], reverse=True)
+
+        self.names.append(name)
+        self.atk_total.append(self._typed(atk_vec))
+        self.atk_sum.append(atk_vec.sum())
+        self.def_icons.append(def_icons)
+        self.freeze.append(freeze)
+        self.passive_def.append(passive_def)
+        self.reflect.append(reflect)
+        self.support.append(support)
+        self.ai_weapon_total.append(self._typed(sum((v for _, v in weapon_pool[:2]), np.zeros(len(ELEMENTS)))))
+        self.ai_defensive_total.append(self._typed(sum((v for _, v in defensive_pool[:2]), np.zeros(len(ELEMENTS)))))
+        return len(self.names) - 1
+
+    def arrays(self) -> dict:
+        return {k: np.asarray(getattr(self, k), dtype=np.float64) for k in
+                ["atk_total", "atk_sum", "def_icons", "freeze", "passive_def", "reflect", "ai_weapon_total", "ai_defensive_total"]}
+
+
+class SimResult:
+    def __init__(self, outcome, turns, damage_by_gear, hits_by_gear, gear_names):
+        self.outcome = outcome
+        self.turns = turns
+        self.damage_by_gear = damage_by_gear
+        self.hits_by_gear = hits_by_gear
+        self.gear_names = gear_names
+
+    @property
+    def win_rate(self) -> float:
+        return float(np.mean(self.outcome == WIN)) if len(self.outcome) else 0.0
+
+    def turn_histogram(self) -> np.ndarray:
+        return np.bincount(self.turns)
+
+
+class BattleSimulator:
+    def __init__(self, type_chart: dict = None, seed: int = 0, rng=None, max_turns: int = 100):
+        self.type_chart = type_chart or CombatProcessor().TYPE_CHART
+        self.mult = type_multipliers(self.type_chart)
+        self.gear = GearTable(self.mult)
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.max_turns = max_turns
+
+    def _draw(self, n: int) -> np.ndarray:
+        return self.rng.random(n)
+
+    def run_pve(self, batch: dict) -> SimResult:
+        """
+        Simulate PvE battles following CombatProcessor.process. `batch` holds one entry per battle:
+        player_str, player_def, player_hp, player_element, player_gear, stance_atk, stance_def,
+        enemy_str, enemy_def, enemy_hp, enemy_element, enemy_gear.
+        """
+        g = self.gear.arrays()
+        n = len(batch["player_hp"])
+        p_gear = np.asarray(batch["player_gear"])
+        e_gear = np.asarray(batch["enemy_gear"])
+        if np.asarray(self.gear.support, dtype=bool)[e_gear].any():
+            raise ValueError("Enemy support items (heal/stealth/freeze) are not supported by the simulator")
+        p_elem = np.asarray(batch["player_element"])
+        e_elem = np.asarray(batch["enemy_element"])
+        stance_atk = np.asarray(batch["stance_atk"], dtype=np.float64)
+        stance_def = np.asarray(batch["stance_def"], dtype=np.float64)
+
+        # Per-battle constants (everything a turn needs besides the draws)
+        p_str = np.asarray(batch["player_str"], dtype=np.float64)
+        e_str = np.asarray(batch["enemy_str"], dtype=np.float64)
+        p_total = p_str + g["atk_total"][p_gear, e_elem]
+        p_mit = mitigation(np.asarray(batch["enemy_def"], dtype=np.float64) + g["passive_def"][e_gear], 1.0)
+        p_tm = p_total * p_mit
+        p_freeze = g["freeze"][p_gear]
+        reflect = g["reflect"][e_gear]
+        reflect_dmg = np.trunc((p_str + g["atk_sum"][p_gear]) * 0.5).astype(np.int64)
+        ai_mit = mitigation(np.asarray(batch["player_def"], dtype=np.float64) + g["def_icons"][p_gear], stance_def)
+        ai_weapon_tm = (e_str + g["ai_weapon_total"][e_gear, p_elem]) * ai_mit
+        ai_defensive_tm = (e_str + g["ai_defensive_total"][e_gear, p_elem]) * ai_mit
+        ai_mods = np.array([STANCES[s][0] for s in AI_STANCES])
+
+        p_hp = np.asarray(batch["player_hp"], dtype=np.int64).copy()
+        e_hp = np.asarray(batch["enemy_hp"], dtype=np.int64).copy()
+        frozen = np.zeros(n, dtype=bool)  # PvE turn counter never advances, so a freeze sticks
+        outcome = np.full(n, TIMEOUT, dtype=np.int8)
+        turns = np.full(n, self.max_turns, dtype=np.int64)
+        dealt = np.zeros(n, dtype=np.int64)
+        hits = np.zeros(n, dtype=np.int64)
+
+        active = np.arange(n)
+        for turn in range(1, self.max_turns + 1):
+            if not len(active):
+                break
+            # 1. Player turn
+            dmg, _ = damage_kernel(p_tm[active], stance_atk[active], self._draw(len(active)), self._draw(len(active)))
+            e_hp[active] -= dmg
+            dealt[active] += dmg
+            hits[active] += 1
+
+            fz = active[p_freeze[active] > 0]
+            if len(fz):
+                frozen[fz] |= self._draw(len(fz)) <= p_freeze[fz]
+            rf = active[reflect[active] > 0]
+            if len(rf):
+                procs = rf[self._draw(len(rf)) <= reflect[rf]]
+                p_hp[procs] -= reflect_dmg[procs]
+
+            won = e_hp[active] <= 0
+            outcome[active[won]] = WIN
+            turns[active[won]] = turn
+            active = active[~won]
+
+            # 2. AI turn
+            acting = active[~frozen[active]]
+            if len(acting):
+                rand = self._draw(len(acting))
+                rand = np.where(rand < 0.15, 0.5, rand)  # no support items: falls back to attacking
+                stance_idx = (self._draw(len(acting)) * 2 ** 53).astype(np.int64) % 3  # Random.choice
+                defensive = rand < 0.40
+                tm = np.where(defensive, ai_defensive_tm[acting], ai_weapon_tm[acting])
+                atk_mod = np.where(defensive, 0.8, ai_mods[stance_idx])
+                ai_dmg, _ = damage_kernel(tm, atk_mod, self._draw(len(acting)), self._draw(len(acting)))
+                p_hp[acting] -= ai_dmg
+
+            lost = p_hp[active] <= 0
+            outcome[active[lost]] = LOSS
+            turns[active[lost]] = turn
+            active = active[~lost]
+
+        m = len(self.gear.names)
+        return SimResult(outcome, turns,
+                         np.bincount(p_gear, weights=dealt, minlength=m),
+                         np.bincount(p_gear, weights=hits, minlength=m),
+                         self.gear.names)
+
+    def run_pvp(self, batch: dict) -> SimResult:
+        """
+        Simulate PvP battles following CombatProcessor._process_pvp_turn: both sides act
+        simultaneously with neutral stances. Like _calculate_action_result, each side's
+        icons and defense bonus come from the attacker's equipped list (player_gear), and
+        reflect rolls against the gear of the side being hit.
+        Outcome is from player 1's perspective.
+        """
+        g = self.gear.arrays()
+        n = len(batch["player_hp"])
+        p_gear = np.asarray(batch["player_gear"])
+        e_gear = np.asarray(batch["enemy_gear"])
+        p_elem = np.asarray(batch["player_element"])
+        e_elem = np.asarray(batch["enemy_element"])
+        p_str = np.asarray(batch["player_str"], dtype=np.float64)
+        e_str = np.asarray(batch["enemy_str"], dtype=np.float64)
+
+        # Player 1 (attacker): own selected weapons + passives; player 2 only sees player 1's passives
+        p1_tm = (p_str + g["atk_total"][p_gear, e_elem]) * mitigation(np.asarray(batch["enemy_def"], dtype=np.float64) + g["def_icons"][p_gear], 1.0)
+        p1_reflect = g["reflect"][e_gear]
+        p1_reflect_dmg = np.trunc((p_str + g["atk_sum"][p_gear]) * 0.5).astype(np.int64)
+        p2_tm = (e_str + g["atk_total"][batch["player_passive_gear"], p_elem]) * mitigation(np.asarray(batch["player_def"], dtype=np.float64) + g["def_icons"][batch["player_passive_gear"]], 1.0)
+        p2_reflect = g["reflect"][p_gear]
+        p2_reflect_dmg = np.trunc((e_str + g["atk_sum"][batch["player_passive_gear"]]) * 0.5).astype(np.int64)
+
+        p_hp = np.asarray(batch["player_hp"], dtype=np.int64).copy()
+        e_hp = np.asarray(batch["enemy_hp"], dtype=np.int64).copy()
+        outcome = np.full(n, TIMEOUT, dtype=np.int8)
+        turns = np.full(n, self.max_turns, dtype=np.int64)
+        dealt = np.zeros(n, dtype=np.int64)
+        hits = np.zeros(n, dtype=np.int64)
+
+        active = np.arange(n)
+        for turn in range(1, self.max_turns + 1):
+            if not len(active):
+                break
+            # Player 1 action, then player 2 action (damage applied after both, reflect immediately)
+            rf = active[p1_reflect[active] > 0]
+            if len(rf):
+                procs = rf[self._draw(len(rf)) <= p1_reflect[rf]]
+                p_hp[procs] -= p1_reflect_dmg[procs]
+            d1, _ = damage_kernel(p1_tm[active], 1.0, self._draw(len(active)), self._draw(len(active)))
+
+            rf = active[p2_reflect[active] > 0]
+            if len(rf):
+                procs = rf[self._draw(len(rf)) <= p2_reflect[rf]]
+                e_hp[procs] -= p2_reflect_dmg[procs]
+            d2, _ = damage_kernel(p2_tm[active], 1.0, self._draw(len(active)), self._draw(len(active)))
+
+            e_hp[active] -= d1
+            p_hp[active] -= d2
+            dealt[active] += d1
+            hits[active] += 1
+
+            p_down = p_hp[active] <= 0
+            e_down = e_hp[active] <= 0
+            done = p_down | e_down
+            outcome[active[p_down & e_down]] = DRAW
+            outcome[active[p_down & ~e_down]] = LOSS
+            outcome[active[e_down & ~p_down]] = WIN
+            turns[active[done]] = turn
+            active = active[~done]
+
+        m = len(self.gear.names)
+        return SimResult(outcome, turns,
+                         np.bincount(p_gear, weights=dealt, minlength=m),
+                         np.bincount(p_gear, weights=hits, minlength=m),
+                         self.gear.names)
+
+
+def load_creatures() -> dict:
+    creatures = get_catalog().creatures
+    return {"starter_companions": thaw(creatures.starters), "common_creatures": thaw(creatures.common)}
+
+
+def load_templates(from_db: bool = False, seed: int = 0) -> list:
+    """Item templates as combat item dicts ({"id", "name", "item_type", "stats", "effect"})"""
+    if from_db:
+        return [{"id": t.id, "name": t.name, "item_type": t.item_type, "stats": thaw(t.weapon_stats), "effect": thaw(t.effect)}
+                for t in get_catalog().items.templates]
+    from scripts.seed_items import generate_weapons
+    # A local generator: the global random state stays untouched
+    return [dict(w, id=idx + 1) for idx, w in enumerate(generate_weapons(random.Random(seed)))]
+
+
+def stat_blocks(creatures: list) -> list:
+    """Flatten creatures into (name, element, stat block) rows"""
+    return [(c["name"], c["type"], s) for c in creatures for s in c["starting_stats"]]
+
+
+def build_batch(sim: BattleSimulator, players: list, enemies: list, templates: list, battles: int, stance: str, rng) -> dict:
+    """
+    Random matchups: a player stat block carrying one gear template (or nothing)
+    against an enemy stat block. Returns per-battle arrays for run_pve/run_pvp.
+    """
+    bare = sim.gear.add(name="(no gear)")
+    gear_ids = [bare]
+    passive_ids = [bare]
+    for t in templates:
+        if t.get("item_type") == "weapon":
+            gear_ids.append(sim.gear.add(weapons=[t], name=t["name"]))
+            passive_ids.append(bare)
+        elif t.get("item_type") in ["armor", "shield"]:
+            gear_ids.append(sim.gear.add(items=[t], name=t["name"]))
+            passive_ids.append(gear_ids[-1])
+    gear_ids = np.asarray(gear_ids)
+    passive_ids = np.asarray(passive_ids)
+
+    pi = rng.integers(0, len(players), battles)
+    ei = rng.integers(0, len(enemies), battles)
+    gi = rng.integers(0, len(gear_ids), battles)
+    s_atk, s_def = STANCES[stance]
+
+    def col(rows, idx, key, default):
+        return np.asarray([r[2].get(key, default) for r in rows])[idx]
+
+    return {
+        "player_str": col(players, pi, "STR", 10),
+        "player_def": col(players, pi, "DEF", 5),
+        "player_hp": col(players, pi, "HP", 100),
+        "player_element": np.asarray([element_index(r[1]) for r in players])[pi],
+        "player_gear": gear_ids[gi],
+        "player_passive_gear": passive_ids[gi],
+        "stance_atk": np.full(battles, s_atk),
+        "stance_def": np.full(battles, s_def),
+        "enemy_str": col(enemies, ei, "STR", 5),
+        "enemy_def": col(enemies, ei, "DEF", 5),
+        "enemy_hp": col(enemies, ei, "HP", 50),
+        "enemy_element": np.asarray([element_index(r[1]) for r in enemies])[ei],
+        "enemy_gear": np.full(battles, bare),
+        "player_index": pi,
+        "enemy_index": ei,
+    }
+
+
+def report(result: SimResult, batch: dict, players: list, enemies: list, elapsed: float, top: int = 10):
+    n = len(result.outcome)
+    print(f"Simulated {n:,} battles in {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} battles/s)")
+    print(f"Win rate: {result.win_rate:.1%}  Loss: {np.mean(result.outcome == LOSS):.1%}  "
+          f"Draw: {np.mean(result.outcome == DRAW):.1%}  Timeout: {np.mean(result.outcome == TIMEOUT):.1%}")
+
+    hist = result.turn_histogram()
+    print("\nTurn count distribution:")
+    for t in range(1, len(hist)):
+        if hist[t]:
+            print(f"  {t:>3} turns: {hist[t] / n:6.1%}")
+
+    print("\nWin rate by player species vs enemy species:")
+    p_names = sorted({r[0] for r in players})
+    e_names = sorted({r[0] for r in enemies})
+    p_of = np.asarray([p_names.index(r[0]) for r in players])[batch["player_index"]]
+    e_of = np.asarray([e_names.index(r[0]) for r in enemies])[batch["enemy_index"]]
+    cell = p_of * len(e_names) + e_of
+    wins = np.bincount(cell, weights=(result.outcome == WIN), minlength=len(p_names) * len(e_names))
+    count = np.bincount(cell, minlength=len(p_names) * len(e_names))
+    rate = np.divide(wins, count, out=np.zeros_like(wins), where=count > 0).reshape(len(p_names), len(e_names))
+    print("  " + " " * 20 + " ".join(f"{e[:8]:>8}" for e in e_names))
+    for i, p in enumerate(p_names):
+        print(f"  {p[:20]:<20}" + " ".join(f"{v:8.1%}" for v in rate[i]))
+
+    print(f"\nDamage per hit by item (top/bottom {top}):")
+    used = result.hits_by_gear > 0
+    per_hit = np.divide(result.damage_by_gear, result.hits_by_gear, out=np.zeros_like(result.damage_by_gear), where=used)
+    order = [i for i in np.argsort(-per_hit) if used[i]]
+    gear_wins = np.bincount(batch["player_gear"], weights=(result.outcome == WIN), minlength=len(per_hit))
+    gear_count = np.bincount(batch["player_gear"], minlength=len(per_hit))
+    shown = order if len(order) <= 2 * top else order[:top] + [None] + order[-top:]
+    for i in shown:
+        if i is None:
+            print("  ...")
+            continue
+        print(f"  {result.gear_names[i][:28]:<28} {per_hit[i]:7.2f} dmg/hit  win {gear_wins[i] / gear_count[i]:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte-Carlo battle simulator for balance tuning")
+    parser.add_argument("--battles", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=["pve", "pvp"], default="pve")
+    parser.add_argument("--stance", choices=list(STANCES), default="normal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-turns", type=int, default=100)
+    parser.add_argument("--from-db", action="store_true", help="Use item templates from the database instead of seed_items.generate_weapons()")
+    args = parser.parse_args()
+
+    creatures = load_creatures()
+    templates = load_templates(args.from_db, args.seed)
+    players = stat_blocks(creatures.get("starter_companions", []))
+    enemies = players if args.mode == "pvp" else stat_blocks(creatures.get("common_creatures", []))
+
+    sim = BattleSimulator(seed=args.seed, max_turns=args.max_turns)
+    batch = build_batch(sim, players, enemies, templates, args.battles, args.stance, sim.rng)
+
+    start = time.perf_counter()
+    result = sim.run_pvp(batch) if args.mode == "pvp" else sim.run_pve(batch)
+    report(result, batch, players, enemies, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
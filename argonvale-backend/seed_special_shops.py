@@ -1,11 +1,14 @@
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.models.item import Item
+from app.services.template_service import seed_templates
 
 def seed_shops():
     db = SessionLocal()
     try:
-        # Clear existing shop items (System items have owner_id = None)
+        # Clear existing shop items (System items have owner_id = None). Templates go through
+        # seed_templates, so items owned from them keep their values
+        seed_templates(db, [])
         db.query(Item).filter(Item.owner_id == None).delete()
         
         shop_items = [
@@ -0,0 +1,169 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pspf.events.combat import CombatAction, CombatStarted, CombatEnded
+from pspf.processors.combat import CombatProcessor
+from scripts.simulate_battles import (
+    BattleSimulator, ELEMENTS, STANCES, WIN, LOSS, DRAW, TIMEOUT,
+    damage_kernel, element_index, mitigation,
+)
+
+# Both engines consume the same stream of uniform draws, so results must match exactly.
+class ScriptedRandom(random.Random):
+    """Processor-side RNG: every draw (including choice) comes from the shared stream"""
+    def __init__(self, source):
+        self.source = source
+        super().__init__(0)
+
+    def random(self):
+        return self.source.random()
+
+class ScriptedGenerator:
+    """Simulator-side RNG with numpy's Generator.random(n) signature"""
+    def __init__(self, source):
+        self.source = source
+
+    def random(self, n):
+        return np.array([self.source.random() for _ in range(n)])
+
+
+def random_item(rng, item_id, item_type, effect_types=()):
+    icons = {rng.choice(ELEMENTS + ["fire", "physical"]): rng.randint(1, 30) for _ in range(rng.randint(1, 2))}
+    stats = {"atk": icons} if item_type == "weapon" else {"def": icons}
+    if rng.random() < 0.3:
+        stats = {"attack": rng.randint(1, 20)} if item_type == "weapon" else {"defense": rng.randint(1, 20)}
+    effect = {}
+    if effect_types and rng.random() < 0.5:
+        effect = {"type": rng.choice(effect_types), "chance": rng.choice([0.1, 0.5, 1.0])}
+    return {"id": item_id, "name": f"{item_type}-{item_id}", "item_type": item_type, "stats": stats, "effect": effect}
+
+
+def test_damage_kernel_matches_calculate_damage():
+    processor = CombatProcessor()
+    sim = BattleSimulator()
+    rng = random.Random(1)
+    for _ in range(3000):
+        icons = {rng.choice(ELEMENTS + ["water", "Physical"]): rng.randint(0, 60) for _ in range(rng.randint(1, 4))}
+        defense = rng.randint(0, 40)
+        def_elem = rng.choice(ELEMENTS)
+        atk_mod, def_mod = rng.choice(list(STANCES.values()))
+        u = [rng.random(), rng.random()]
+
+        src = random.Random(0)
+        src.random = iter(u).__next__
+        expected, expected_crit = processor.calculate_damage(icons, defense, def_elem, atk_mod, def_mod, False, ScriptedRandom(src))
+
+        vec = np.zeros(len(ELEMENTS))
+        for k, v in icons.items():
+            vec[element_index(k)] += v
+        total = (vec @ sim.mult)[element_index(def_elem)]
+        dmg, crit = damage_kernel(np.array([total * mitigation(defense, def_mod)]), atk_mod, np.array([u[0]]), np.array([u[1]]))
+        assert (int(dmg[0]), bool(crit[0])) == (expected, expected_crit)
+
+
+def run_processor_pve(context, weapon_ids, stance, source, max_turns):
+    processor = CombatProcessor()
+    processor.process(None, CombatStarted.create(combat_id="sim-x", attacker_id=1, attacker_companion_id=1, mode="pve", context=context))
+    processor.sessions["sim-x"].rng = ScriptedRandom(source)
+    dealt = 0
+    for turn in range(1, max_turns + 1):
+        events = processor.process(None, CombatAction.create(combat_id="sim-x", actor_id=1, action_type="attack", stance=stance, item_ids=weapon_ids))
+        dealt += events[0].damage_dealt
+        ended = [e for e in events if isinstance(e, CombatEnded)]
+        if ended:
+            return (WIN if ended[0].winner_id == 1 else LOSS), turn, dealt
+    return TIMEOUT, max_turns, dealt
+
+
+def test_pve_battles_match_processor():
+    rng = random.Random(2)
+    for case in range(150):
+        weapons = [random_item(rng, 100 + i, "weapon", ["freeze"]) for i in range(rng.randint(0, 2))]
+        armor = [random_item(rng, 200 + i, rng.choice(["armor", "shield"]), ["freeze"]) for i in range(rng.randint(0, 2))]
+        enemy_weapons = [random_item(rng, 300 + i, "weapon") for i in range(rng.randint(0, 3))]
+        enemy_items = [random_item(rng, 400 + i, rng.choice(["armor", "shield"]), ["reflect"]) for i in range(rng.randint(0, 2))]
+        stance = rng.choice(list(STANCES))
+        p = {"str": rng.randint(3, 20), "def": rng.randint(1, 15), "hp": rng.randint(10, 120), "elem": rng.choice(ELEMENTS)}
+        e = {"STR": rng.randint(3, 20), "DEF": rng.randint(1, 15), "HP": rng.randint(10, 120), "elem": rng.choice(ELEMENTS)}
+        seed = rng.random()
+
+        context = {
+            "companion_element": p["elem"], "enemy_type": e["elem"],
+            "player_hp": p["hp"], "player_max_hp": p["hp"], "player_stats": {"str": p["str"], "def": p["def"]},
+            "enemy_hp": e["HP"], "enemy_max_hp": e["HP"], "enemy_stats": {"STR": e["STR"], "DEF": e["DEF"]},
+            "enemy_weapons": enemy_weapons, "enemy_items": enemy_items, "equipped_items": weapons + armor,
+        }
+        expected = run_processor_pve(context, [w["id"] for w in weapons], stance, random.Random(seed), 30)
+
+        sim = BattleSimulator(rng=ScriptedGenerator(random.Random(seed)), max_turns=30)
+        batch = {
+            "player_str": [p["str"]], "player_def": [p["def"]], "player_hp": [p["hp"]],
+            "player_element": [element_index(p["elem"])], "player_gear": [sim.gear.add(weapons=weapons, items=armor)],
+            "stance_atk": [STANCES[stance][0]], "stance_def": [STANCES[stance][1]],
+            "enemy_str": [e["STR"]], "enemy_def": [e["DEF"]], "enemy_hp": [e["HP"]],
+            "enemy_element": [element_index(e["elem"])], "enemy_gear": [sim.gear.add(weapons=enemy_weapons, items=enemy_items)],
+        }
+        result = sim.run_pve(batch)
+        actual = (int(result.outcome[0]), int(result.turns[0]), int(result.damage_by_gear.sum()))
+        assert actual == expected, f"case {case}: sim {actual} != processor {expected}"
+
+
+def test_pvp_battles_match_processor():
+    rng = random.Random(3)
+    for case in range(100):
+        p1_weapons = [random_item(rng, 100 + i, "weapon") for i in range(rng.randint(0, 2))]
+        p1_armor = [random_item(rng, 200 + i, rng.choice(["armor", "shield"]), ["reflect"]) for i in range(rng.randint(0, 2))]
+        p2_weapons = [random_item(rng, 300 + i, "weapon") for i in range(rng.randint(0, 2))]
+        p2_armor = [random_item(rng, 400 + i, rng.choice(["armor", "shield"]), ["reflect"]) for i in range(rng.randint(0, 2))]
+        a = {"str": rng.randint(3, 20), "def": rng.randint(1, 15), "hp": rng.randint(10, 120), "elem": rng.choice(ELEMENTS)}
+        b = {"str": rng.randint(3, 20), "def": rng.randint(1, 15), "hp": rng.randint(10, 120), "elem": rng.choice(ELEMENTS)}
+        seed = rng.random()
+
+        processor = CombatProcessor()
+        processor.process(None, CombatStarted.create(combat_id="pvp-x", attacker_id=1, attacker_companion_id=1, defender_id=2, defender_companion_id=2, mode="pvp", context={
+            "companion_element": a["elem"], "enemy_type": b["elem"],
+            "player_hp": a["hp"], "player_max_hp": a["hp"], "player_stats": {"str": a["str"], "def": a["def"]},
+            "enemy_hp": b["hp"], "enemy_max_hp": b["hp"], "enemy_stats": {"str": b["str"], "def": b["def"]},
+            "enemy_weapons": p2_weapons + p2_armor, "equipped_items": p1_weapons + p1_armor,
+        }))
+        processor.sessions["pvp-x"].rng = ScriptedRandom(random.Random(seed))
+        expected, dealt = (TIMEOUT, 30), 0
+        for turn in range(1, 31):
+            processor.process(None, CombatAction.create(combat_id="pvp-x", actor_id=1, action_type="attack", item_ids=[w["id"] for w in p1_weapons]))
+            events = processor.process(None, CombatAction.create(combat_id="pvp-x", actor_id=2, action_type="attack", item_ids=[w["id"] for w in p2_weapons]))
+            dealt += events[0].damage_dealt
+            ended = [e for e in events if isinstance(e, CombatEnded)]
+            if ended:
+                winner = ended[0].winner_id
+                expected = ({1: WIN, 2: LOSS, 0: DRAW}[winner], turn)
+                break
+
+        sim = BattleSimulator(rng=ScriptedGenerator(random.Random(seed)), max_turns=30)
+        batch = {
+            "player_str": [a["str"]], "player_def": [a["def"]], "player_hp": [a["hp"]],
+            "player_element": [element_index(a["elem"])],
+            "player_gear": [sim.gear.add(weapons=p1_weapons, items=p1_armor)],
+            "player_passive_gear": [sim.gear.add(items=p1_armor)],
+            "enemy_str": [b["str"]], "enemy_def": [b["def"]], "enemy_hp": [b["hp"]],
+            "enemy_element": [element_index(b["elem"])], "enemy_gear": [sim.gear.add(weapons=p2_weapons, items=p2_armor)],
+        }
+        result = sim.run_pvp(batch)
+        actual = (int(result.outcome[0]), int(result.turns[0]), int(result.damage_by_gear.sum()))
+        assert actual == expected + (dealt,), f"case {case}: sim {actual} != processor {expected + (dealt,)}"
+
+
+def test_million_battles_run_quickly():
+    import time
+    from scripts.simulate_battles import build_batch, load_creatures, load_templates, stat_blocks
+
+    creatures = load_creatures()
+    sim = BattleSimulator(seed=0)
+    batch = build_batch(sim, stat_blocks(creatures["starter_companions"]), stat_blocks(creatures["common_creatures"]),
+                        load_templates(seed=0), 1_000_000, "normal", sim.rng)
+    start = time.perf_counter()
+    result = sim.run_pve(batch)
+    assert time.perf_counter() - start < 10
+    assert len(result.outcome) == 1_000_000
+    assert 0.0 < result.win_rate <= 1.0
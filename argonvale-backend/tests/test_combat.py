@@ -66,13 +66,34 @@ def test_combat_determinism():
     assert result_event.defender_hp < 100
     
     # Determinism Check
-    # Note: Combat has random variance (0.9 to 1.1) and crit chance.
-    # So strict equality might fail unless we mock random.
-    # But for now let's just assert structure.
-    
+    # Each session owns an RNG seeded from combat_id + start event,
+    # so replaying the same events must reproduce the battle exactly.
     assert results1[0].actor_id == 1
+    assert len(results1) == len(results2)
+    for r1, r2 in zip(results1, results2):
+        assert r1.model_dump(exclude={"event_id", "timestamp"}) == r2.model_dump(exclude={"event_id", "timestamp"})
     
     print("Combat Structure Test Passed")
 
 if __name__ == "__main__":
     test_combat_determinism()
+
+
+def test_consumable_stack_is_usable_up_to_its_quantity():
+    from pspf.processors.combat_log import HEAL, SPENT
+
+    processor = CombatProcessor()
+    processor.process(None, CombatStarted.create(
+        combat_id="stack", attacker_id=1, attacker_companion_id=1, mode="pve",
+        context={
+            "player_hp": 10, "player_max_hp": 1000, "player_stats": {"str": 1},
+            "enemy_hp": 10**6, "enemy_max_hp": 10**6, "enemy_stats": {"STR": 1},
+            "equipped_items": [{"id": 7, "name": "Potion", "item_type": "potion", "stats": {"heal": 10}, "quantity": 2}],
+        },
+    ))
+    kinds = []
+    for _ in range(3):
+        turn = processor.process(None, CombatAction.create(combat_id="stack", actor_id=1, action_type="attack", item_ids=[7]))[0]
+        kinds.append(turn.log[0]["a"])
+    assert kinds == [HEAL, HEAL, SPENT]
+    assert turn.item_uses == {7: 2} and turn.used_item_ids == [7]
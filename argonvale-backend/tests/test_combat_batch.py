@@ -0,0 +1,99 @@
+import random
+import pytest
+
+pytest.importorskip("numpy")
+
+from pspf.events.combat import CombatAction, CombatStarted, CombatEnded, ForfeitCombat
+from pspf.processors.combat import CombatProcessor
+from pspf.processors.combat_batch import BatchedCombatProcessor
+
+ELEMENTS = ["Fire", "Water", "Wind", "Earth", "Light", "Shadow"]
+
+
+def random_gear(rng, base_id, count, kinds, effects=()):
+    gear = []
+    for i in range(count):
+        kind = rng.choice(kinds)
+        icons = {rng.choice(ELEMENTS + ["fire", "Phys"]): rng.randint(1, 25)}
+        stats = {"atk": icons} if kind == "weapon" else {"def": icons}
+        effect = {}
+        if effects and rng.random() < 0.4:
+            effect = {"type": rng.choice(effects), "chance": rng.choice([0.2, 0.6, 1.0]), "duration": rng.randint(1, 2)}
+        gear.append({"id": base_id + i, "name": f"{kind}-{base_id + i}", "item_type": kind, "stats": stats, "effect": effect})
+    return gear
+
+
+def random_battle(rng, combat_id):
+    equipped = random_gear(rng, 100, rng.randint(0, 3), ["weapon", "armor", "shield"], ["freeze"])
+    equipped += [
+        {"id": 150, "name": "Potion", "item_type": "potion", "stats": {"heal": 15}, "effect": {}},
+        {"id": 151, "name": "Smoke", "item_type": "consumable", "stats": {}, "effect": {"type": "stealth", "chance": 0.7, "duration": 1}},
+        {"id": 152, "name": "Ice", "item_type": "consumable", "stats": {}, "effect": {"type": "freeze", "chance": 0.5, "duration": 1}},
+    ]
+    enemy_items = random_gear(rng, 300, rng.randint(0, 2), ["armor", "shield"], ["reflect"])
+    if rng.random() < 0.5:
+        enemy_items.append({"id": 350, "name": "Herb", "type": "heal", "value": 12})
+    if rng.random() < 0.3:
+        enemy_items.append({"id": 351, "name": "Frost Orb", "type": rng.choice(["freeze", "stealth"]), "effect": {"chance": 0.5}})
+    context = {
+        "companion_element": rng.choice(ELEMENTS), "enemy_type": rng.choice(ELEMENTS), "enemy_name": "Slime",
+        "player_hp": rng.randint(30, 120), "player_max_hp": 120, "player_stats": {"str": rng.randint(3, 20), "def": rng.randint(1, 12)},
+        "enemy_hp": rng.randint(30, 120), "enemy_max_hp": 120, "enemy_stats": {"STR": rng.randint(3, 20), "DEF": rng.randint(1, 12)},
+        "enemy_weapons": random_gear(rng, 200, rng.randint(0, 3), ["weapon"]), "enemy_items": enemy_items,
+        "equipped_items": equipped,
+    }
+    return CombatStarted.create(combat_id=combat_id, attacker_id=1, attacker_companion_id=7, mode="pve", context=context)
+
+
+def random_action(rng, start):
+    ids = [i["id"] for i in start.context["equipped_items"]]
+    return CombatAction.create(combat_id=start.combat_id, actor_id=1, action_type="attack",
+                               stance=rng.choice(["normal", "berserk", "defensive"]),
+                               item_ids=rng.sample(ids, min(len(ids), rng.randint(0, 2))))
+
+
+def dump(events):
+    return [(type(e).__name__, e.model_dump(exclude={"event_id", "timestamp"})) for e in events]
+
+
+def test_batched_engine_matches_combat_processor():
+    rng = random.Random(5)
+    starts = [random_battle(rng, f"b-{i}") for i in range(200)]
+    scalar = CombatProcessor()
+    batched = BatchedCombatProcessor(capacity=16)  # forces the store to grow
+    for start in starts:
+        scalar.process(None, start)
+        batched.process(None, start)
+
+    active = {s.combat_id: s for s in starts}
+    for _ in range(40):
+        if not active:
+            break
+        expected = []
+        for combat_id, start in list(active.items()):
+            action = random_action(rng, start)
+            expected.extend(scalar.process(None, action))
+            batched.process(None, action)
+        actual = list(batched.tick())
+        assert dump(actual) == dump(expected)
+        for e in actual:
+            if isinstance(e, CombatEnded):
+                del active[e.combat_id]
+    assert len(batched) == len(active)
+
+
+def test_tick_only_resolves_pending_battles():
+    rng = random.Random(6)
+    batched = BatchedCombatProcessor()
+    a, b = random_battle(rng, "a"), random_battle(rng, "b")
+    batched.process(None, a)
+    batched.process(None, b)
+    assert list(batched.tick()) == []
+
+    batched.process(None, random_action(rng, a))
+    assert {e.combat_id for e in batched.tick()} == {"a"}
+    assert batched.get_session("b").player_hp == b.context["player_hp"]
+
+    ended = batched.process(None, ForfeitCombat.create(combat_id="b", player_id=1))
+    assert ended[0].winner_id == 0
+    assert batched.get_session("b") is None
@@ -0,0 +1,87 @@
+from pspf.events.combat import CombatAction, CombatStarted, TurnProcessed
+from pspf.processors.combat import CombatProcessor
+from app.websocket.combat_delta import CombatDeltaEncoder, STATE_FIELDS, start_state, turn_state
+
+GEAR = [
+    {"id": 101, "name": "Fire Sword", "item_type": "weapon", "stats": {"atk": {"Fire": 10}}},
+    {"id": 150, "name": "Potion", "item_type": "potion", "stats": {"heal": 15}, "effect": {}},
+]
+
+
+def start_battle(processor, mode="pve"):
+    start = CombatStarted.create(
+        combat_id="delta", attacker_id=1, attacker_companion_id=1, mode=mode,
+        defender_id=2 if mode == "pvp" else None, defender_companion_id=2 if mode == "pvp" else None,
+        context={"player_hp": 300, "player_max_hp": 300, "enemy_hp": 300, "enemy_max_hp": 300, "equipped_items": GEAR}
+    )
+    processor.process(None, start)
+    return dict(start.model_dump(mode="json"), type="CombatStarted")
+
+
+def play_turn(processor, turn, mode="pve"):
+    events = processor.process(None, CombatAction.create(combat_id="delta", actor_id=1, action_type="attack",
+                                                        item_ids=[101, 150] if turn == 2 else [101]))
+    if mode == "pvp":
+        events = processor.process(None, CombatAction.create(combat_id="delta", actor_id=2, action_type="attack", item_ids=[]))
+    return [e.model_dump(mode="json") for e in events if isinstance(e, TurnProcessed)]
+
+
+class Client:
+    """Applies TurnDelta frames the way a delta client would"""
+    def __init__(self, start_msg):
+        version, state = start_state(start_msg)
+        self.states = {version: state}
+
+    def apply(self, frame):
+        state = dict(self.states[frame["base"]])
+        state.update({k: v for k, v in frame.items() if k in STATE_FIELDS})
+        self.states[frame["v"]] = state
+        return state
+
+
+def test_delta_frames_rebuild_full_state():
+    processor = CombatProcessor()
+    start_msg = start_battle(processor)
+    encoder, client = CombatDeltaEncoder(), Client(start_msg)
+    encoder.start(start_msg)
+    for turn in range(1, 8):
+        for msg in play_turn(processor, turn):
+            frame = encoder.encode(msg)
+            assert client.apply(frame) == turn_state(msg, swap=False)
+            assert "event_id" not in frame
+            if turn == 2 and msg["actor_id"] == 1:
+                assert frame["used_item_ids"] == [150]
+            encoder.ack("delta", frame["v"])
+    # Unchanged fields are not repeated once acknowledged
+    assert "used_item_ids" not in frame and "player_frozen_until" not in frame
+
+
+def test_unacked_frames_stay_relative_to_last_ack():
+    processor = CombatProcessor()
+    start_msg = start_battle(processor)
+    encoder, client = CombatDeltaEncoder(), Client(start_msg)
+    encoder.start(start_msg)
+    frames = [encoder.encode(msg) for turn in range(1, 4) for msg in play_turn(processor, turn)]
+    assert {f["base"] for f in frames} == {0}
+    encoder.ack("delta", frames[1]["v"])
+    msg = play_turn(processor, 4)[0]
+    frame = encoder.encode(msg)
+    client.apply(frames[1])
+    assert frame["base"] == frames[1]["v"]
+    assert client.apply(frame) == turn_state(msg, swap=False)
+
+
+def test_pvp_defender_and_resume_snapshot():
+    processor = CombatProcessor()
+    start_battle(processor, "pvp")
+    play_turn(processor, 1, "pvp")
+
+    # The resume snapshot is a full baseline from the defender's side
+    resume = dict(processor.sessions["delta"].to_start_event(2).model_dump(mode="json"), type="CombatStarted")
+    encoder, client = CombatDeltaEncoder(), Client(resume)
+    encoder.start(resume)
+    msg = play_turn(processor, 2, "pvp")[0]
+    frame = encoder.encode(msg, swap=True)
+    assert frame["base"] == resume["context"]["state_version"] == msg["state_version"] - 1
+    assert client.apply(frame) == turn_state(msg, swap=True)
+    assert client.states[frame["v"]]["attacker_hp"] == msg["defender_hp"]
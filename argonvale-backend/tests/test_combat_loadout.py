@@ -0,0 +1,96 @@
+import random
+
+from pspf.events.combat import CombatAction, CombatStarted
+from pspf.processors.combat import TYPE_CHART, CombatProcessor
+from pspf.processors.combat_log import ATTACK
+
+# Icons in every shape gear has: element dicts (any case), bare numbers, atk/attack and def/defense keys
+LOADOUTS = [
+    [
+        {"id": 1, "name": "Fire Sword", "item_type": "weapon", "stats": {"atk": {"Fire": 12, "phys": 4}, "def": {"Phys": 2}}},
+        {"id": 2, "name": "Ice Spear", "item_type": "weapon", "stats": {"attack": {"water": 9}}, "effect": {"type": "freeze", "chance": 0.3}},
+        {"id": 3, "name": "Plate", "item_type": "armor", "stats": {"defense": {"Earth": 6, "Phys": 3}}},
+        {"id": 4, "name": "Frost Buckler", "item_type": "shield", "stats": {"def": 5}, "effect": {"type": "freeze", "chance": 0.1}},
+    ],
+    [
+        {"id": 5, "name": "Club", "item_type": "weapon", "stats": {"atk": 14}},
+        {"id": 6, "name": "Spiked Mail", "item_type": "armor", "stats": {"atk": {"Shadow": 3}, "def": {"Phys": 8}}},
+        {"id": 7, "name": "Light Bow", "item_type": "weapon", "stats": {"atk": {"Light": 20, "Wind": 5}}, "effect": {"type": "freeze", "chance": 0.6}},
+        {"id": 8, "name": "Potion", "item_type": "potion", "stats": {"heal": 10}},
+    ],
+]
+ENEMY_ITEMS = [
+    {"id": 20, "name": "Mirror Shield", "item_type": "shield", "stats": {"def": {"Water": 7}}, "effect": {"type": "reflect", "chance": 0.5}},
+    {"id": 21, "name": "Hide", "item_type": "armor", "stats": {"defense": 3}},
+]
+
+
+def legacy_attack(equipped, selected_ids, stance, enemy_element, rng):
+    """The player's attack as turns computed it before loadouts were compiled: (damage, crit, defence, froze, reflected)"""
+    atk_icons = {"Phys": 10}
+    def_icons = 0
+    freeze_chance = 0
+    for item in equipped:
+        is_weapon = item.get("item_type") == "weapon"
+        if (is_weapon and item.get("id") in selected_ids) or item.get("item_type") in ["armor", "shield"]:
+            stats = item.get("stats", {})
+            a_val = stats.get("atk", {}) or stats.get("attack", {})
+            d_val = stats.get("def", {}) or stats.get("defense", {})
+            if isinstance(a_val, dict):
+                for k, v in a_val.items():
+                    atk_icons[k.capitalize()] = atk_icons.get(k.capitalize(), 0) + v
+            elif isinstance(a_val, (int, float)):
+                atk_icons["Phys"] = atk_icons.get("Phys", 0) + a_val
+            if isinstance(d_val, dict): def_icons += sum(d_val.values())
+            elif isinstance(d_val, (int, float)): def_icons += d_val
+            eff = item.get("effect", {})
+            if eff.get("type") == "freeze":
+                freeze_chance = max(freeze_chance, eff.get("chance", 0))
+
+    reflect_chance = max([i["effect"]["chance"] for i in ENEMY_ITEMS if i.get("effect", {}).get("type") == "reflect"] + [0])
+    enemy_def = 4 + sum(sum(d.values()) if isinstance(d, dict) else d
+                        for d in (i["stats"].get("def") or i["stats"].get("defense") for i in ENEMY_ITEMS))
+    atk_mod = {"berserk": 1.2, "defensive": 0.8}.get(stance, 1.0)
+
+    crit = rng.random() < 0.05
+    variance = rng.uniform(0.9, 1.1)
+    total = sum(v * TYPE_CHART.get(k, {}).get(enemy_element, 1.0) for k, v in atk_icons.items())
+    damage = max(1, int(total * (20 / (20 + enemy_def)) * atk_mod * variance * (1.5 if crit else 1.0)))
+    froze = freeze_chance > 0 and rng.random() <= freeze_chance
+    reflected = int(sum(atk_icons.values()) * 0.5) if reflect_chance > 0 and rng.random() <= reflect_chance else None
+    return damage, crit, 5 + def_icons, froze, reflected
+
+
+def test_compiled_loadouts_match_per_turn_calculation():
+    cases = 0
+    for loadout in LOADOUTS:
+        weapon_ids = [i["id"] for i in loadout if i["item_type"] == "weapon"]
+        for selected in ([], weapon_ids[:1], weapon_ids, weapon_ids + weapon_ids[:1]):
+            for stance in ("normal", "berserk", "defensive"):
+                for enemy_element in ("Wind", "Water", "Shadow"):
+                    for seed in range(8):
+                        processor = CombatProcessor()
+                        combat_id = f"{loadout[0]['id']}-{selected}-{stance}-{enemy_element}-{seed}"
+                        processor.process(None, CombatStarted.create(
+                            combat_id=combat_id, attacker_id=1, attacker_companion_id=1, mode="pve",
+                            context={
+                                "companion_element": "Fire", "enemy_type": enemy_element,
+                                "player_hp": 10**6, "player_max_hp": 10**6, "player_stats": {"str": 10, "def": 5},
+                                "enemy_hp": 10**6, "enemy_max_hp": 10**6, "enemy_stats": {"STR": 5, "DEF": 4},
+                                "enemy_items": ENEMY_ITEMS, "equipped_items": loadout,
+                            },
+                        ))
+                        session = processor.sessions[combat_id]
+                        rng = random.Random()
+                        rng.setstate(session.rng.getstate())
+                        expected = legacy_attack(loadout, selected, stance, enemy_element, rng)
+
+                        turn = processor.process(None, CombatAction.create(
+                            combat_id=combat_id, actor_id=1, action_type="attack", stance=stance, item_ids=selected,
+                        ))[0]
+                        attack = next(r for r in turn.log if r["a"] == ATTACK)
+                        got = (turn.damage_dealt, attack.get("crit", False), session.current_player_def,
+                               attack.get("froze", False), attack.get("r"))
+                        assert got == expected, combat_id
+                        cases += 1
+    assert cases == 2 * 4 * 3 * 3 * 8
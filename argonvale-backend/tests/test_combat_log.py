@@ -0,0 +1,56 @@
+from pspf.events.combat import CombatAction, CombatStarted, TurnProcessed
+from pspf.processors.combat import CombatProcessor
+from pspf.processors.combat_log import render_log
+
+PLAYER = {101: "Fire Sword", 150: "Potion", 151: "Smoke"}
+ENEMY = {201: "Claw", 350: "Herb"}
+
+
+def test_render_pve_player_turn():
+    log = [
+        {"a": "spent", "i": 150},
+        {"a": "stealth", "i": 151, "ok": True},
+        {"a": "attack", "i": [101, 151], "st": "berserk", "v": 12, "crit": True, "froze": True, "r": 5},
+    ]
+    assert render_log(log, "pve", "Slime", PLAYER, ENEMY) == (
+        "Potion is already spent! Used Smoke and became INVISIBLE! "
+        "CRITICAL HIT! In berserk stance using Fire Sword, Smoke, you deal 12 damage! "
+        "The blow FROZE your opponent! The enemy REFLECTED 5 damage back to you!"
+    )
+    assert render_log([{"a": "attack", "i": [], "st": "normal", "v": 0, "hid": True}], "pve", "Slime", PLAYER, ENEMY) == \
+        "You attack, but the enemy is invisible!"
+
+
+def test_render_pve_ai_turn():
+    render = lambda rec: render_log([rec], "pve", "Slime", PLAYER, ENEMY)
+    assert render({"a": "frozen", "s": 1}) == "Slime is frozen and skips its turn!"
+    assert render({"a": "heal", "s": 1, "i": 350, "v": 12}) == "Slime used Herb and restored 12 HP!"
+    assert render({"a": "freeze", "s": 1, "i": 350, "ok": False}) == "Slime tried to use Herb but it failed!"
+    assert render({"a": "guard", "s": 1, "i": [201], "v": 3}) == "Slime takes a defensive stance with its Claw, dealing 3 damage!"
+    assert render({"a": "attack", "s": 1, "i": [201], "st": "berserk", "v": 9, "crit": True}) == \
+        "CRITICAL! Slime attacks in berserk stance using Claw for 9 damage!"
+    assert render({"a": "attack", "s": 1, "i": [], "st": "normal", "v": 0, "hid": True}) == \
+        "Slime tried to attack, but you are invisible and took 0 damage!"
+
+
+def test_render_pvp_turn():
+    log = [
+        {"a": "heal", "i": 150, "v": 15},
+        {"a": "attack", "i": [101], "r": 4, "v": 7, "crit": True},
+        {"a": "frozen", "s": 1},
+    ]
+    assert render_log(log, "pvp", "Rival", PLAYER, ENEMY) == "Healed 15 HP; Took 4 reflected damage; 7 dmg CRIT! | Frozen!"
+
+
+def test_text_log_off_keeps_records_only():
+    processor = CombatProcessor(text_log=False)
+    processor.process(None, CombatStarted.create(combat_id="quiet", attacker_id=1, mode="pve", context={
+        "equipped_items": [{"id": 101, "name": "Fire Sword", "item_type": "weapon", "stats": {"atk": {"Fire": 10}}}],
+    }))
+    events = processor.process(None, CombatAction.create(combat_id="quiet", actor_id=1, action_type="attack", item_ids=[101]))
+    turn = events[0]
+    assert isinstance(turn, TurnProcessed)
+    assert turn.description == ""
+    assert turn.log[-1]["a"] == "attack" and turn.log[-1]["i"] == [101]
+    assert turn.log[-1]["v"] == turn.damage_dealt
+    assert processor.sessions["quiet"].describe(turn.log).startswith(("CRITICAL HIT! In normal stance using Fire Sword", "In normal stance using Fire Sword"))
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every table)
+from app.core.content import CreatureCatalog, ItemCatalog, get_catalog, thaw
+from app.db.session import Base
+from app.models.item import Item
+
+
+def test_creatures_indexed_and_frozen():
+    creatures = get_catalog().creatures
+    assert get_catalog().creatures is creatures
+    emberfang = creatures.by_name["Emberfang"]
+    assert emberfang is creatures.starters_by_name["Emberfang"]
+    assert emberfang in creatures.by_type["Fire"]
+    assert all(c["type"] == "Earth" for c in creatures.by_type["Earth"])
+    with pytest.raises(TypeError):
+        emberfang["name"] = "Other"
+    with pytest.raises(TypeError):
+        emberfang["starting_stats"][0]["HP"] = 99
+    # Mutable copies for event payloads
+    stats = thaw(emberfang["starting_stats"][0])
+    stats["HP"] = 99
+    assert emberfang["starting_stats"][0]["HP"] != 99
+
+
+def test_starters_win_name_clashes_and_version_tracks_content():
+    data = {
+        "starter_companions": [{"name": "Pip", "type": "Fire", "starting_stats": [{"HP": 10}]}],
+        "common_creatures": [{"name": "Pip", "type": "Water", "starting_stats": [{"HP": 5}]}],
+    }
+    catalog = CreatureCatalog(data)
+    assert catalog.by_name["Pip"]["type"] == "Fire" and len(catalog.common) == 1
+    assert CreatureCatalog(json.loads(json.dumps(data))).version == catalog.version
+    data["common_creatures"][0]["starting_stats"][0]["HP"] = 6
+    assert CreatureCatalog(data).version != catalog.version
+
+
+def test_item_templates_by_category_and_rarity():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all([
+        Item(name="Rusty Sword", item_type="weapon", category="weapons", rarity="Common", price=50,
+             weapon_stats={"attack": {"phys": 5}}, is_template=True),
+        Item(name="Holy Blade", item_type="weapon", category="weapons", rarity="Rare", price=900, is_template=True),
+        Item(name="Apple", item_type="food", category="food", rarity="Common", price=5, is_template=True),
+        Item(name="Apple", item_type="food", category="food", rarity="Common", price=5, stock=3, is_template=False),
+    ])
+    db.commit()
+    items = ItemCatalog.load(db)
+    assert [t.name for t in items.templates] == ["Rusty Sword", "Holy Blade", "Apple"]
+    assert [t.name for t in items.by_category_rarity["weapons"]["Rare"]] == ["Holy Blade"]
+    assert items.by_name["Rusty Sword"].weapon_stats["attack"]["phys"] == 5
+    assert thaw(items.by_name["Rusty Sword"].weapon_stats) == {"attack": {"phys": 5}}
+    version = items.version
+    db.query(Item).filter(Item.name == "Holy Blade").update({"price": 950})
+    assert ItemCatalog.load(db).version != version
@@ -0,0 +1,56 @@
+import random
+from collections import Counter
+
+from pspf.events.combat import CombatStarted
+from pspf.events.movement import LootFound, PlayerMoved
+from pspf.processors.encounters import AliasTable, build_zone_table
+from app.core.content import CreatureCatalog
+from app.processors.tiled_exploration import TiledExplorationProcessor
+
+CREATURES = CreatureCatalog({"common_creatures": [
+    {"name": "Hare", "type": "Earth", "starting_stats": [{"HP": 10}, {"HP": 12}]},
+    {"name": "Spark", "type": "Fire", "encounter_weight": 3, "starting_stats": [{"HP": 8}]},
+]})
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable(["a", "b", "c", "d"], [1, 2, 0, 5])
+    rng = random.Random(3)
+    counts = Counter(table.sample(rng) for _ in range(80000))
+    assert counts["c"] == 0
+    for item, weight in (("a", 1), ("b", 2), ("d", 5)):
+        assert abs(counts[item] / 80000 - weight / 8) < 0.01
+
+
+def test_zone_rates_and_creatures_from_properties():
+    rng = random.Random(1)
+    wild = build_zone_table("wild", {"encounter_rate": 0.5, "loot_rate": 0.25, "coins_min": 5, "coins_max": 6}, CREATURES)
+    rolls = [wild.roll(rng) for _ in range(40000)]
+    assert abs(sum(1 for _, e in rolls if e) / 40000 - 0.5) < 0.01
+    assert abs(sum(1 for c, _ in rolls if c) / 40000 - 0.25) < 0.01
+    assert {c for c, _ in rolls if c} == {5, 6}
+    # Spark is 3x as common; Hare's weight is split over its two stat blocks
+    picks = Counter((e[0]["name"], e[1]["HP"]) for _, e in rolls if e)
+    assert abs(picks[("Spark", 8)] / sum(picks.values()) - 0.75) < 0.02
+    assert abs(picks[("Hare", 10)] - picks[("Hare", 12)]) < 0.05 * sum(picks.values())
+
+    only_hares = build_zone_table("meadow", {"creatures": "Hare, Ghost:2"}, CREATURES)
+    assert {only_hares.creatures.sample(rng)[0]["name"] for _ in range(200)} == {"Hare"}
+
+    safe = build_zone_table("town", {"encounter_rate": 0}, CREATURES)
+    assert not any(safe.roll(rng)[1] for _ in range(5000))
+
+
+def test_tiled_maps_configure_zones(tmp_path):
+    processor = TiledExplorationProcessor(cache_dir=str(tmp_path), seed=9)
+    assert processor.maps_data["town"].properties["encounter_rate"] == 0
+    assert processor.zone_tables["town"].encounter_rate == 0
+    assert processor.zone_tables["wild"].encounter_rate == 0.15
+
+    events = []
+    for zone in ("town", "wild"):
+        for i in range(400):
+            events += [(zone, e) for e in processor.process(None, PlayerMoved.create(player_id=1, zone_id=zone, x=5, y=5))]
+    assert not any(isinstance(e, CombatStarted) for zone, e in events if zone == "town")
+    assert any(isinstance(e, CombatStarted) for zone, e in events if zone == "wild")
+    assert any(isinstance(e, LootFound) for zone, e in events if zone == "town")
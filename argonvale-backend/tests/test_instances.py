@@ -0,0 +1,66 @@
+from app.websocket.instances import ZoneInstances, instance_id, split_instance
+from app.websocket.presence import ZonePresence
+
+
+def join(presence, instances, player_id, friends=()):
+    instance = instances.place("town", player_id, friends)
+    presence.enter(instance, {"player_id": player_id, "username": f"p{player_id}", "x": 0, "y": 0})
+    return instance
+
+
+def test_population_stays_under_soft_cap():
+    presence = ZonePresence()
+    instances = ZoneInstances(presence, soft_cap=50)
+    for player_id in range(1000):
+        join(presence, instances, player_id)
+    assert instances.channels("town") == list(range(1, 21))
+    assert max(instances.population("town", c) for c in instances.channels("town")) == 50
+    assert split_instance("town#20") == ("town", 20) and split_instance("town") == ("town", None)
+
+
+def test_friends_join_each_other_up_to_hard_cap():
+    presence = ZonePresence()
+    instances = ZoneInstances(presence, soft_cap=2, hard_cap=3)
+    for player_id in (1, 2, 3):
+        join(presence, instances, player_id)
+    assert join(presence, instances, 10, friends=[1]) == "town#1"
+    assert join(presence, instances, 11, friends=[1]) == "town#2"
+    # A freed slot is refilled before a new instance opens
+    presence.leave("town#1", 2)
+    presence.leave("town#1", 10)
+    assert join(presence, instances, 12) == "town#1"
+
+
+def test_manual_switch_limits():
+    presence = ZonePresence()
+    instances = ZoneInstances(presence, soft_cap=1, hard_cap=2)
+    join(presence, instances, 1)
+    assert instances.can_switch("town", 1)
+    join(presence, instances, 2)
+    presence.enter(instance_id("town", 1), {"player_id": 3, "username": "p3", "x": 0, "y": 0})
+    assert not instances.can_switch("town", 1)
+    assert instances.can_switch("town", 3) and not instances.can_switch("town", 4) and not instances.can_switch("town", 0)
+
+
+def test_friend_lists_load_off_the_event_loop_once_per_refresh(monkeypatch):
+    import asyncio
+    import threading
+    from app.websocket import router
+    from app.websocket.router import GameServer, UserSession
+
+    server, session = GameServer(), UserSession(7, "p7")
+    loads = []
+
+    def friend_ids(user_id):
+        loads.append(threading.current_thread() is threading.main_thread())
+        return [1, 2]
+    monkeypatch.setattr(server, "friend_ids", friend_ids)
+
+    async def joins():
+        return [await server.friends_of(session) for _ in range(3)]
+    assert asyncio.run(joins()) == [[1, 2]] * 3
+    assert loads == [False]
+    # Stale: reloaded on the next placement
+    monkeypatch.setattr(router, "FRIENDS_REFRESH_SECONDS", 0)
+    asyncio.run(joins())
+    assert len(loads) == 4
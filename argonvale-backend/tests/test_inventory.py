@@ -0,0 +1,153 @@
+import random
+
+from sqlalchemy import text
+
+from app.core import content
+from app.core.content import ContentCatalog, CreatureCatalog, ItemCatalog, get_catalog
+from app.models.item import Item
+from app.models.user import User
+from app.services.inventory_service import consume, dropped_item_fields, grant, template_fields
+
+
+def add_owner_and_template(monkeypatch, db):
+    user = User(username="hoarder", email="hoarder@x")
+    template = Item(name="Apple", item_type="food", category="food", price=15, is_template=True, stock=0, effect={"heal": 12})
+    db.add_all([user, template])
+    db.commit()
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog.load(db)))
+    return user, template
+
+
+def test_stackable_kinds_share_one_row_per_owner_and_template(monkeypatch, db):
+    user, template = add_owner_and_template(monkeypatch, db)
+    apple = {"template_id": template.id, "name": "Apple", "item_type": "food", "effect": {"heal": 12}}
+    first = grant(db, user.id, apple, 3)
+    assert grant(db, user.id, apple, 2) == first
+    # Unstackable kinds get a row per unit; kinds without a template stack by name
+    assert len(grant(db, user.id, {"name": "Sword", "item_type": "weapon"}, 2)) == 2
+    assert grant(db, user.id, {"name": "Odd Herb", "item_type": "food"}) == grant(db, user.id, {"name": "Odd Herb", "item_type": "food"})
+    db.commit()
+    rows = {(i.name, i.quantity) for i in db.query(Item).filter(Item.owner_id == user.id)}
+    assert rows == {("Apple", 5), ("Sword", 1), ("Odd Herb", 2)}
+    assert db.get(Item, first[0]).effect == {"heal": 12}
+
+
+def test_consume_decrements_then_removes_and_skips_traded_stacks(monkeypatch, db):
+    user, template = add_owner_and_template(monkeypatch, db)
+    [stack] = grant(db, user.id, {"template_id": template.id, "name": "Apple", "item_type": "food"}, 2)
+    assert consume(db, user.id, stack, 3) is None
+    assert consume(db, user.id, stack) == 1
+    assert consume(db, user.id, stack) == 0
+    assert db.query(Item).filter(Item.id == stack).count() == 0
+
+    [locked] = grant(db, user.id, {"name": "Bread", "item_type": "food"}, 4)
+    db.query(Item).filter(Item.id == locked).update({"trade_lot_id": 1})
+    assert consume(db, user.id, locked) is None
+    # A new loose stack forms next to the one in the trade lot
+    assert grant(db, user.id, {"name": "Bread", "item_type": "food"}) != [locked]
+
+
+def test_copies_store_only_overrides_and_load_from_the_catalog(monkeypatch, db):
+    user, template = add_owner_and_template(monkeypatch, db)
+    fields = {"template_id": template.id, "name": "Apple", "item_type": "food", "category": "food", "price": 15,
+              "effect": {"heal": 12}, "description": "", "rarity": "Common"}
+    [plain] = grant(db, user.id, fields)
+    [cursed] = grant(db, user.id, {**fields, "template_id": None, "effect": {"heal": -5}})
+    db.commit()
+    raw = db.execute(text("SELECT effect, price, category, description, quantity FROM items WHERE id = :id"), {"id": plain}).one()
+    assert raw == (None, None, None, None, 1)
+
+    db.expire_all()
+    apple = db.get(Item, plain)
+    assert (apple.effect, apple.price, apple.category, apple.image_url) == ({"heal": 12}, 15, "food", "default_item.png")
+    assert db.get(Item, cursed).effect == {"heal": -5}
+    # Filled-in fields aren't dirty: a flush writes only what changed
+    apple.quantity = 4
+    db.commit()
+    assert db.execute(text("SELECT effect, quantity FROM items WHERE id = :id"), {"id": plain}).one() == (None, 4)
+
+
+def test_reseeding_templates_keeps_owned_items(monkeypatch, capsys, db, session_factory):
+    from scripts import seed_items
+
+    monkeypatch.setattr(seed_items, "SessionLocal", session_factory)
+    random.seed(1)
+    seed_items.seed_items()
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog.load(db)))
+    user = User(username="keeper", email="keeper@x")
+    db.add(user)
+    db.commit()
+    templates = {t.name: t for t in get_catalog().items.templates}
+    # Every generated row is its own template (weapon names are drawn distinct)
+    assert f"Successfully seeded {len(templates)} item templates ({len(templates)} new" in capsys.readouterr().out
+    relic = next(t for name, t in templates.items() if name.startswith("Relic:"))
+    [sword] = grant(db, user.id, template_fields(relic))
+    [elixirs] = grant(db, user.id, template_fields(templates["Full Elixir"]), 3)
+    db.commit()
+    before = {i.id: (i.weapon_stats, i.price, i.rarity, i.category) for i in db.query(Item).filter(Item.owner_id == user.id)}
+
+    # Weapons are rerolled, so the relic's stats change; Full Elixir keeps its (name, rarity), values and id
+    random.seed(2)
+    seed_items.seed_items()
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog.load(db)))
+    db.expire_all()
+    assert get_catalog().items.by_name["Full Elixir"].id == templates["Full Elixir"].id
+    after = {i.id: (i.weapon_stats, i.price, i.rarity, i.category) for i in db.query(Item).filter(Item.owner_id == user.id)}
+    assert after == before
+    assert db.get(Item, elixirs).template_id == templates["Full Elixir"].id
+
+
+def test_missing_template_loads_defaults(monkeypatch, caplog, db):
+    user, template = add_owner_and_template(monkeypatch, db)
+    [apple] = grant(db, user.id, template_fields(get_catalog().items.by_id[template.id]))
+    db.commit()
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog([])))
+    db.expire_all()
+    item = db.get(Item, apple)
+    assert (item.price, item.weapon_stats, item.rarity) == (0, {}, "Common")
+    assert "not in the catalog" in caplog.text
+
+
+def test_combat_turns_consume_one_unit_per_use(monkeypatch, caplog, db):
+    from app.websocket.router import GameServer
+    from pspf.events.combat import TurnProcessed
+
+    user, template = add_owner_and_template(monkeypatch, db)
+    [apples] = grant(db, user.id, {"template_id": template.id, "name": "Apple", "item_type": "food"}, 3)
+    [herb] = grant(db, user.id, {"name": "Odd Herb", "item_type": "food"})
+    stranger = User(username="stranger", email="stranger@x")
+    db.add(stranger)
+    db.flush()
+    [theirs] = grant(db, stranger.id, {"name": "Odd Herb", "item_type": "food"})
+    db.commit()
+    server = GameServer()
+
+    def turn(uses):
+        return TurnProcessed.create(combat_id="c1", turn_number=1, actor_id=user.id, damage_dealt=0, attacker_hp=10,
+                                    defender_hp=10, attacker_id=user.id, defender_id=0, item_uses=uses)
+
+    # item_uses counts over the battle: each turn costs the uses added since the last one
+    server.consume_used_items(db, turn({apples: 1}))
+    server.consume_used_items(db, turn({apples: 2, herb: 1, theirs: 1}))
+    server.consume_used_items(db, turn({apples: 2, herb: 1, theirs: 1}))
+    db.expire_all()
+    assert db.get(Item, apples).quantity == 1
+    assert db.get(Item, herb) is None
+    # Not the attacker's: left alone, not counted as consumed, and logged
+    assert db.get(Item, theirs).quantity == 1
+    assert server.consumed_items["c1"] == {apples: 2, herb: 1}
+    assert f"could not consume 1 of item {theirs}" in caplog.text
+
+
+def test_drops_match_templates_by_name_and_rarity(monkeypatch, db):
+    user, template = add_owner_and_template(monkeypatch, db)
+    golden = Item(name="Apple", item_type="food", category="food", rarity="Rare", price=90, is_template=True, stock=0)
+    db.add(golden)
+    db.commit()
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog.load(db)))
+
+    assert dropped_item_fields({"name": "Apple", "item_type": "food", "rarity": "Rare"})["template_id"] == golden.id
+    assert dropped_item_fields({"name": "Apple", "item_type": "food"})["template_id"] == template.id
+    assert dropped_item_fields({"name": "Apple", "template_id": golden.id})["template_id"] == golden.id
+    # No such template: the drop keeps its own data
+    assert dropped_item_fields({"name": "Apple", "item_type": "food", "rarity": "Relic"}).get("template_id") is None
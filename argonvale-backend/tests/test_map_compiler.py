@@ -0,0 +1,66 @@
+import json
+import os
+
+from app.processors.map_compiler import CompiledMap, compile_tiled_map, load_map
+from app.processors.tiled_exploration import MAPS_DIR, TiledExplorationProcessor
+from pspf.events.movement import PlayerMoved, TeleportPlayer
+
+
+def tiled_map():
+    return {
+        "width": 4, "height": 3, "tilewidth": 16, "tileheight": 16,
+        "layers": [
+            {"type": "tilelayer", "name": "Ground", "data": [1] * 12},
+            {"type": "tilelayer", "name": "Walls", "properties": [{"name": "collision", "value": True}],
+             "data": [0, 7, 0, 0,
+                      0, 0, 0, 0,
+                      0, 0, 0, 9]},
+            {"type": "objectgroup", "name": "Warps", "objects": [
+                {"x": 32, "y": 16, "width": 32, "height": 16,
+                 "properties": [{"name": "target_zone", "value": "wild"}, {"name": "target_y", "value": 5}]},
+            ]},
+        ],
+    }
+
+
+def test_compiled_grid_and_warps():
+    compiled = CompiledMap(compile_tiled_map(tiled_map()))
+    blocked = {(x, y) for y in range(3) for x in range(4) if compiled.is_blocked(x, y)}
+    assert blocked == {(1, 0), (3, 2)}
+    assert not compiled.is_walkable(-1, 0) and not compiled.is_walkable(4, 0) and compiled.is_walkable(0, 0)
+    assert compiled.warp_at(2, 1) == compiled.warp_at(3, 1) == ("wild", 0, 5)
+    assert compiled.warp_at(1, 1) is None
+
+
+def test_artifact_cached_by_source_hash(tmp_path):
+    source = tmp_path / "arena.tmj"
+    source.write_text(json.dumps(tiled_map()))
+    cache = tmp_path / "cache"
+    first = load_map(str(source), str(cache))
+    artifact = next(cache.iterdir())
+    mtime = artifact.stat().st_mtime_ns
+    assert load_map(str(source), str(cache)).source_hash == first.source_hash
+    assert artifact.stat().st_mtime_ns == mtime
+
+    # An edited map gets a new artifact and the old one is dropped
+    data = tiled_map()
+    data["layers"][1]["data"][0] = 3
+    source.write_text(json.dumps(data))
+    edited = load_map(str(source), str(cache))
+    assert edited.is_blocked(0, 0) and edited.source_hash != first.source_hash
+    assert [p.name for p in cache.iterdir()] == [f"arena-{edited.source_hash}.avmap"]
+
+
+def test_real_maps_match_source_layers(tmp_path):
+    processor = TiledExplorationProcessor(cache_dir=str(tmp_path))
+    for map_id in ("town", "wild"):
+        with open(os.path.join(MAPS_DIR, f"{map_id}.tmj")) as f:
+            data = json.load(f)
+        compiled = processor.maps_data[map_id]
+        walls = [l for l in data["layers"] if l["type"] == "tilelayer" and l["name"].lower() == "collision"]
+        expected = {i for layer in walls for i, gid in enumerate(layer["data"]) if gid}
+        assert {i for i in range(compiled.width * compiled.height) if compiled.is_blocked(i % compiled.width, i // compiled.width)} == expected
+
+    x, y = next(iter(processor.maps_data["town"].warps.items()))[0] % 30, 0
+    events = processor.process(None, PlayerMoved.create(player_id=1, zone_id="town", x=x, y=y))
+    assert any(isinstance(e, TeleportPlayer) and e.zone_id == "wild" for e in events)
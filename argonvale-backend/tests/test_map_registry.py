@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import time
+
+from app.processors.map_registry import MapRegistry
+from app.processors.zone_shards import LocalZoneWorker, ZoneShardMap
+from scripts.generate_world import generate
+
+
+def arena(walls=()):
+    data = [0] * 16
+    for x, y in walls:
+        data[y * 4 + x] = 1
+    return {"width": 4, "height": 4, "tilewidth": 16, "tileheight": 16, "layers": [
+        {"type": "tilelayer", "name": "Collision", "data": data},
+    ]}
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+    # Bump mtime explicitly: edits within one clock tick would look unchanged
+    stamp = time.time_ns() + 10 ** 9
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_reload_swaps_only_changed_maps(tmp_path):
+    maps = tmp_path / "maps"
+    maps.mkdir()
+    write(maps / "arena.json", arena())
+    write(maps / "hut.json", arena([(0, 0)]))
+    registry = MapRegistry(str(maps), str(tmp_path / "cache"))
+    assert registry.version == 1 and registry.versions == {"arena": 1, "hut": 1}
+    hut, before = registry.maps["hut"], registry.maps
+
+    assert registry.reload() == []
+    write(maps / "arena.json", arena([(2, 2)]))
+    assert registry.reload() == ["arena"]
+    assert registry.maps is not before and registry.maps["hut"] is hut
+    assert registry.maps["arena"].is_blocked(2, 2) and not before["arena"].is_blocked(2, 2)
+    assert (registry.version, registry.versions) == (2, {"arena": 2, "hut": 1})
+
+    # Touched but identical, broken, then removed
+    write(maps / "hut.json", arena([(0, 0)]))
+    assert registry.reload() == [] and registry.maps["hut"] is hut
+    (maps / "hut.json").write_text("{not json")
+    os.utime(maps / "hut.json", ns=(time.time_ns() + 2 * 10 ** 9,) * 2)
+    assert registry.reload() == [] and registry.maps["hut"] is hut
+    os.remove(maps / "hut.json")
+    assert registry.reload() == ["hut"] and "hut" not in registry.maps and registry.version == 3
+
+
+def test_async_reload_keeps_event_loop_responsive(tmp_path):
+    maps = tmp_path / "maps"
+    maps.mkdir()
+    write(maps / "arena.json", arena())
+    registry = MapRegistry(str(maps), str(tmp_path / "cache"))
+    write(maps / "frontier.tmj", generate(512))
+
+    async def run():
+        gaps = []
+        done = False
+
+        async def tick():
+            last = time.perf_counter()
+            while not done:
+                await asyncio.sleep(0.001)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticker = asyncio.create_task(tick())
+        swapped = await registry.reload_async()
+        done = True
+        await ticker
+        return swapped, max(gaps)
+
+    swapped, worst = asyncio.run(run())
+    assert swapped == ["frontier"] and registry.maps["frontier"].width == 512
+    # The big parse runs in a child process; the loop only waits on the thread
+    assert worst < 0.02
+
+
+def test_workers_pick_up_reloaded_maps(tmp_path):
+    maps = tmp_path / "maps"
+    maps.mkdir()
+    write(maps / "arena.json", arena())
+    shards = ZoneShardMap([LocalZoneWorker(seed=1, maps_dir=str(maps))])
+    assert asyncio.run(shards.move("arena#1", "arena", 1, 1, 1)) is not None
+
+    write(maps / "arena.json", arena([(1, 1)]))
+    asyncio.run(shards.reload_maps(["arena"]))
+    assert asyncio.run(shards.move("arena#1", "arena", 1, 1, 1)) is None
@@ -0,0 +1,73 @@
+import gc
+import tracemalloc
+
+from app.websocket.router import UserSession
+from pspf.events.combat import CombatStarted
+from pspf.processors.combat import CombatProcessor
+
+SESSIONS = 100_000
+
+
+def retained_bytes_per_session(build) -> float:
+    """Bytes still allocated per session once everything but the sessions themselves is dropped"""
+    gc.collect()
+    tracemalloc.start()
+    kept = None
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        return (tracemalloc.get_traced_memory()[0] - before) / SESSIONS
+    finally:
+        tracemalloc.stop()
+        del kept
+
+
+def make_context(i: int) -> dict:
+    # Fresh dicts per battle, as the router builds them from DB rows
+    return {
+        "enemy_name": "Cave Slime", "enemy_hp": 60, "enemy_max_hp": 60, "enemy_type": "Water",
+        "enemy_stats": {"STR": 6, "DEF": 3},
+        "enemy_weapons": [{"id": 1, "name": "Slime Lash", "item_type": "weapon", "stats": {"atk": {"Water": 4}}}],
+        "enemy_items": [{"id": 2, "name": "Herb", "type": "heal", "value": 12}],
+        "enemy_image": "slime.png",
+        "companion_name": "Pip", "companion_element": "Fire", "companion_image": "pip.png",
+        "player_hp": 80, "player_max_hp": 80, "player_stats": {"str": 12, "def": 6, "spd": 9},
+        "equipped_items": [
+            {"id": 10 + i, "name": "Ember Blade", "item_type": "weapon", "stats": {"atk": {"Fire": 8}}, "effect": {}},
+            {"id": 11 + i, "name": "Buckler", "item_type": "shield", "stats": {"def": {"Phys": 4}}, "effect": {"type": "reflect", "chance": 0.1}},
+        ],
+    }
+
+
+def test_user_session_budget():
+    def build():
+        return [UserSession(user_id=i, username=f"user{i}") for i in range(SESSIONS)]
+    assert retained_bytes_per_session(build) < 250
+
+
+def test_combat_session_budget():
+    processor = CombatProcessor()
+
+    def build():
+        for i in range(SESSIONS):
+            event = CombatStarted.model_construct(event_id=f"e{i}", combat_id=f"c{i}", attacker_id=i, attacker_companion_id=i,
+                                                  defender_id=None, defender_companion_id=None, mode="pve", context=make_context(i))
+            processor.process(None, event)
+        return processor.sessions
+    assert retained_bytes_per_session(build) < 8193
+
+
+def test_resume_context_rebuilt_without_initial_copy():
+    processor = CombatProcessor()
+    context = make_context(0)
+    processor.process(None, CombatStarted.create(combat_id="r1", attacker_id=1, attacker_companion_id=1, mode="pve", context=context))
+    session = processor.get_session("r1")
+    session.player_hp, session.enemy_hp = 50, 20
+
+    resumed = session.to_start_event(1).context
+    assert resumed == dict(context, player_hp=50, enemy_hp=20, turn_number=1, resumed=True, state_version=0, used_item_ids=[],
+                           player_frozen_until=0, enemy_frozen_until=0, player_stealth_until=0, enemy_stealth_until=0)
+    # The resume snapshot must not reset the live session
+    assert processor.process(None, session.to_start_event(1)) == []
+    assert processor.get_session("r1").player_hp == 50
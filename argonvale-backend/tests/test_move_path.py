@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from pspf.events.combat import CombatStarted
+from app.processors.zone_shards import ZoneWorker
+from app.websocket.router import deplete_hunger
+
+
+def test_path_stops_at_first_blocked_step():
+    worker = ZoneWorker(seed=5)
+    town = worker.exploration.maps_data["town"]
+    # A free tile with a wall (or the map edge) directly to its left
+    x, y = next((x, y) for y in range(town.height) for x in range(town.width)
+                if worker.exploration.is_valid_move("town", x, y) and not worker.exploration.is_valid_move("town", x - 1, y))
+    taken, end_x, end_y, _, blocked = worker.move_path("town#1", "town", 1, x, y, [[-1, 0], [0, 1]])
+    assert (taken, end_x, end_y, blocked) == (0, x, y, True)
+    # Diagonal or multi-tile steps are never legal
+    assert worker.move_path("town#1", "town", 1, x, y, [[1, 1]])[4] is True
+
+
+def test_path_stops_at_first_encounter():
+    worker = ZoneWorker(seed=5)
+    steps = [[1, 0], [-1, 0]] * 8
+    taken, x, y, events, blocked = worker.move_path("wilderness#1", "wilderness", 1, 5, 5, steps * 4)
+    assert not blocked and taken < len(steps) * 4
+    assert isinstance(events[-1], CombatStarted)
+    assert sum(isinstance(e, CombatStarted) for e in events) == 1
+    assert (x, y) == (5 + taken % 2, 5)
+
+
+def test_hunger_per_step_matches_single_moves():
+    def companion(hunger):
+        return SimpleNamespace(is_active=True, status="active", hunger=hunger, hp=30)
+    batched = SimpleNamespace(companions=[companion(3)])
+    single = SimpleNamespace(companions=[companion(3)])
+    deplete_hunger(batched, 5)
+    for _ in range(5):
+        deplete_hunger(single)
+    assert (batched.companions[0].hunger, batched.companions[0].hp) == (single.companions[0].hunger, single.companions[0].hp) == (0, 26)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+from pspf.events.combat import CombatAction, CombatStarted, TurnProcessed
+from pspf.processors.combat import CombatProcessor
+from app.websocket.combat_delta import CombatDeltaEncoder
+from app.websocket.outbound import OutboundEvent, Outbox
+from app.websocket.router import UserSession
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+
+def client(log_codes=False, deltas=False):
+    session = UserSession(user_id=1, username="tester")
+    session.log_codes = log_codes
+    session.combat_deltas = CombatDeltaEncoder() if deltas else None
+    return session
+
+
+def pvp_battle():
+    processor = CombatProcessor()
+    start = CombatStarted.create(combat_id="duel", attacker_id=1, attacker_companion_id=1, defender_id=2,
+                                 defender_companion_id=2, mode="pvp", context={"player_hp": 80, "enemy_hp": 60})
+    processor.process(None, start)
+    processor.process(None, CombatAction.create(combat_id="duel", actor_id=1, action_type="attack"))
+    events = processor.process(None, CombatAction.create(combat_id="duel", actor_id=2, action_type="attack"))
+    return start, [e for e in events if isinstance(e, TurnProcessed)]
+
+
+def test_recipients_share_one_encoding_per_perspective():
+    _, turns = pvp_battle()
+    out = OutboundEvent(turns[0])
+    sessions = [client() for _ in range(3)]
+    assert len({id(out.for_client(s)) for s in sessions}) == 1
+    assert out.for_client(client(), swap=True) is out.encoded(False, True)
+    assert out.for_client(client(log_codes=True)) is not out.encoded()
+    swapped = json.loads(out.encoded(swap=True))
+    assert swapped["attacker_hp"] == out.msg["defender_hp"]
+    # One dump and at most one encoding per (log format, side)
+    assert set(out.frames) == {(False, False), (False, True), (True, False)}
+
+
+def test_delta_frames_stay_per_client():
+    start, turns = pvp_battle()
+    start_out = OutboundEvent(start)
+    fresh, legacy = client(log_codes=True, deltas=True), client()
+    for session in (fresh, legacy):
+        start_out.for_client(session)
+    out = OutboundEvent(turns[0])
+    frame = json.loads(out.for_client(fresh))
+    assert frame["type"] == "TurnDelta" and frame["base"] == 0
+    assert out.for_client(legacy) is out.encoded()
+
+
+def test_outbox_sends_one_frame_per_socket():
+    _, turns = pvp_battle()
+    actor, opponent = FakeSocket(), FakeSocket()
+    outbox = Outbox()
+    for evt in turns:
+        out = OutboundEvent(evt)
+        outbox.add(actor, out.for_client(None))
+        outbox.add(opponent, out.for_client(None, swap=True))
+    outbox.add_message(actor, {"type": "Info", "message": "done"})
+    asyncio.run(outbox.flush())
+
+    assert len(actor.sent) == len(opponent.sent) == 1
+    messages = json.loads(actor.sent[0])
+    assert [m["type"] for m in messages] == ["TurnProcessed"] * len(turns) + ["Info"]
+    assert [m["attacker_hp"] for m in json.loads(opponent.sent[0])] == [m["defender_hp"] for m in messages[:-1]]
+    # Flushing again sends nothing
+    asyncio.run(outbox.flush())
+    assert len(actor.sent) == 1
@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from app.websocket.presence import ZonePresence
+from app.websocket.router import SyncManager
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+
+def player(player_id, x=8, y=8):
+    return {"player_id": player_id, "username": f"p{player_id}", "x": x, "y": y,
+            "avatar_url": "default_avatar.png", "title": "Novice Adventurer"}
+
+
+def test_snapshot_is_cached_per_zone_version():
+    presence = ZonePresence()
+    presence.enter("town", player(1))
+    first = presence.snapshot("town")
+    assert presence.snapshot("town") is first
+    presence.move("town", 1, 9, 8)
+    moved = json.loads(presence.snapshot("town"))
+    rows = [dict(zip(moved["fields"], row)) for row in moved["players"]]
+    assert rows[0]["x"] == 9 and rows[0]["username"] == "p1"
+
+
+def test_player_stays_present_until_last_socket_leaves():
+    presence = ZonePresence()
+    presence.enter("town", player(1))
+    presence.enter("town", player(1))
+    assert presence.leave("town", 1) is False and presence.count("town") == 1
+    assert presence.leave("town", 1) is True and presence.count("town") == 0
+    assert presence.leave("town", 1) is False
+
+
+def test_burst_of_joins_shares_one_snapshot():
+    sync = SyncManager()
+    sockets = [FakeSocket() for _ in range(50)]
+
+    async def burst():
+        for i, ws in enumerate(sockets):
+            sync.subscribe("town", ws, player(i, x=i))
+        await asyncio.sleep(0.1)
+
+    asyncio.run(burst())
+    assert all(len(ws.sent) == 1 for ws in sockets)
+    assert len({id(ws.sent[0]) for ws in sockets}) == 1
+    snapshot = json.loads(sockets[0].sent[0])[0]
+    assert snapshot["type"] == "ZoneSnapshot" and len(snapshot["players"]) == 50
+
+    # Leaving the zone removes the player from the next snapshot
+    assert sync.unsubscribe("town", sockets[0]) is True
+    assert 0 not in sync.presence.players["town"]
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from app.core.readiness import Readiness
+
+
+def test_ready_once_every_step_finished():
+    async def run():
+        readiness = Readiness("schema", "maps")
+        waiter = asyncio.create_task(readiness.wait(5))
+        await readiness.run("schema", time.sleep, 0.05)
+        assert not readiness.ready and readiness.status()["pending"] == ["maps"]
+
+        async def load_maps():
+            await asyncio.sleep(0.01)
+        await readiness.run("maps", load_maps)
+        return readiness, await waiter
+
+    readiness, waited = asyncio.run(run())
+    status = readiness.status()
+    assert waited and readiness.ready and status["pending"] == [] and status["failed"] == {}
+    assert status["timings"]["schema"] >= 0.05
+
+
+def test_failed_step_keeps_instance_unready():
+    def broken():
+        raise RuntimeError("no database")
+
+    async def run():
+        readiness = Readiness("schema")
+        # Blocking steps run in a thread: the loop keeps serving meanwhile
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+        ticker = asyncio.create_task(tick())
+        await readiness.run("schema", time.sleep, 0.1)
+        ticker.cancel()
+
+        failing = Readiness("schema")
+        await failing.run("schema", broken)
+        return ticks, failing, await failing.wait(0.05)
+
+    ticks, failing, waited = asyncio.run(run())
+    assert ticks >= 5
+    assert not waited and not failing.ready and failing.status()["failed"] == {"schema": "no database"}
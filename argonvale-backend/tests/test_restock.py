@@ -0,0 +1,99 @@
+import random
+
+from sqlalchemy import inspect
+
+from app.core.content import ItemCatalog
+from app.models.item import Item, SHOP_LISTING_INDEX
+from app.services.restock_service import CATEGORIES, PER_CATEGORY, restock_shop, select_templates
+
+
+def add_templates(db, templates_per_category=15):
+    rarities = ["Common", "Uncommon", "Rare", "Relic"]
+    for cat in CATEGORIES:
+        for i in range(templates_per_category):
+            db.add(Item(name=f"{cat}-{i}", item_type="misc", category=cat, rarity=rarities[i % 4],
+                        price=10, stock=0, is_template=True, effect={"heal": i}))
+    db.commit()
+
+
+def listings(db):
+    return db.query(Item).filter(Item.owner_id == None, Item.is_template == False).all()
+
+
+def test_restock_upserts_unique_listings_per_category(db):
+    add_templates(db)
+    catalog = ItemCatalog.load(db)
+    random.seed(3)
+    assert restock_shop(db, catalog) == {"merged": 0, "restocked": PER_CATEGORY * len(CATEGORIES)}
+    first = {(i.name, i.rarity): i.stock for i in listings(db)}
+    assert len(first) == PER_CATEGORY * len(CATEGORIES)
+    assert all(stock == 1 for (name, rarity), stock in first.items() if rarity == "Relic")
+
+    # A second restock adds to existing listings instead of duplicating them
+    restock_shop(db, catalog)
+    db.expire_all()
+    second = {(i.name, i.rarity): i.stock for i in listings(db)}
+    assert len(listings(db)) == len(second)
+    assert all(second[key] >= stock for key, stock in first.items())
+    assert sum(second.values()) > sum(first.values())
+    # Listings copy the template's JSON columns
+    assert all(i.effect == {"heal": int(i.name.split("-")[1])} for i in listings(db))
+
+def test_restock_merges_legacy_duplicates_then_indexes(engine, db):
+    add_templates(db, templates_per_category=2)
+    SHOP_LISTING_INDEX.drop(bind=engine)
+    for stock in (4, 5, 6):
+        db.add(Item(name="Old Sword", item_type="weapon", category="weapons", rarity="Rare", stock=stock))
+    db.add(Item(name="Old Sword", item_type="weapon", category="weapons", rarity="Common", stock=2))
+    db.commit()
+
+    result = restock_shop(db, ItemCatalog.load(db))
+    assert result["merged"] == 2
+    swords = {i.rarity: i.stock for i in listings(db) if i.name == "Old Sword"}
+    assert swords == {"Rare": 15, "Common": 2}
+    assert "uq_items_shop_listing" in {ix["name"] for ix in inspect(engine).get_indexes("items")}
+
+
+def test_select_templates_falls_back_when_rarity_is_used_up(db):
+    add_templates(db, templates_per_category=3)
+    picked = select_templates(ItemCatalog.load(db), random.Random(1))
+    # Only three templates per category: all of them, once each
+    assert sorted(t.name for t in picked) == sorted(f"{c}-{i}" for c in CATEGORIES for i in range(3))
+
+
+def test_restock_picks_up_templates_seeded_since_the_catalog_loaded(monkeypatch, db):
+    from app.core import content
+    from app.core.content import ContentCatalog, CreatureCatalog, get_catalog
+
+    add_templates(db, templates_per_category=2)
+    monkeypatch.setattr(content, "_catalog", ContentCatalog(CreatureCatalog({}), ItemCatalog.load(db)))
+    loaded = get_catalog().items
+    # Reseeded by another process: one template goes, another comes
+    gone = db.query(Item).filter(Item.name == "food-0").one()
+    db.delete(gone)
+    db.add(Item(name="Honey Cake", item_type="food", category="food", rarity="Common", price=5, stock=0, is_template=True))
+    db.commit()
+
+    restock_shop(db)
+    assert get_catalog().items is not loaded
+    names = {i.name: i.template_id for i in listings(db)}
+    assert "Honey Cake" in names and "food-0" not in names
+    assert names["Honey Cake"] == get_catalog().items.by_name["Honey Cake"].id
+    # Unchanged templates keep the loaded catalog
+    current = get_catalog().items
+    restock_shop(db)
+    assert get_catalog().items is current
+
+
+def test_failed_restock_is_logged_not_raised(monkeypatch, caplog):
+    import app.main as main
+
+    def broken(db):
+        raise RuntimeError("database is locked")
+
+    closed = []
+    monkeypatch.setattr(main, "SessionLocal", lambda: type("S", (), {"close": lambda self: closed.append(True)})())
+    monkeypatch.setattr(main, "restock_shop", broken)
+    main.run_restock()
+    assert closed == [True]
+    assert "Shop restock failed" in caplog.text
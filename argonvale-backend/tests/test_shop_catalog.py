@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api import shop
+from app.db.session import Base
+from app.models.item import Item
+from app.models.user import User
+from app.services.shop_catalog import ShopCatalog
+
+
+def make_catalog(db, session_factory):
+    db.add_all([
+        Item(name="Template", item_type="weapon", category="weapons", stock=0, is_template=True),
+        Item(name="Sword", item_type="weapon", category="weapons", price=50, stock=3),
+        Item(name="Bread", item_type="food", category="food", price=5, stock=0),
+    ])
+    db.commit()
+    return ShopCatalog(session_factory=session_factory, ttl=3600)
+
+
+def test_snapshot_generations_and_stock_feed(db, session_factory):
+    catalog = make_catalog(db, session_factory)
+    catalog.refresh()
+    start = catalog.generation
+    etag, body = catalog.body()
+    assert etag == f'"{start}"' and b'"Sword"' in body and b"Bread" not in body and b"Template" not in body
+    assert catalog.body()[1] is body
+
+    # A rebuild that finds nothing new keeps the generation (and the client's ETag)
+    catalog.refresh(force=True)
+    assert catalog.generation == start and catalog.changes_since(start) is None
+
+    # A purchase commits, then updates the snapshot in place
+    sword = db.query(Item).filter(Item.name == "Sword").one()
+    sword.stock = 2
+    db.commit()
+    catalog.set_stock(sword.id, 2)
+    bread = db.query(Item).filter(Item.name == "Bread").one()
+    bread.stock = 7
+    db.commit()
+    catalog.refresh(force=True)
+    assert catalog.generation == start + 2
+    feed = catalog.changes_since(start)
+    assert feed["stock"] == [[sword.id, 2]] and [l["name"] for l in feed["listings"]] == ["Bread"]
+    assert catalog.changes_since(start + 1) == {"generation": start + 2, "stock": [], "listings": feed["listings"]}
+
+    catalog.set_stock(sword.id, 0)
+    assert sword.id not in catalog.listings and catalog.changes_since(start + 2)["stock"] == [[sword.id, 0]]
+    assert catalog.changes_since(start - 5) == {"generation": catalog.generation, "reset": True}
+
+
+def test_items_endpoint_answers_304_for_current_etag(monkeypatch, db, session_factory):
+    catalog = make_catalog(db, session_factory)
+    monkeypatch.setattr(shop, "shop_catalog", catalog)
+    api = FastAPI()
+    api.include_router(shop.router, prefix="/api/shop")
+    client = TestClient(api)
+
+    first = client.get("/api/shop/items")
+    assert first.status_code == 200 and [i["name"] for i in first.json()] == ["Sword"]
+    etag = first.headers["etag"]
+    assert client.get("/api/shop/items", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/shop/stock", params={"since": etag.strip('"')}).status_code == 304
+
+
+def test_reserve_admits_up_to_stock_and_rejects_sold_out(db, session_factory):
+    catalog = make_catalog(db, session_factory)
+    catalog.refresh()
+    sword = db.query(Item).filter(Item.name == "Sword").one()
+    assert [catalog.reserve(sword.id) for _ in range(4)] == [True, True, True, False]
+    catalog.release(sword.id)
+    assert catalog.reserve(sword.id)
+    # Unknown listings go to the database; known sold-out ones don't
+    assert catalog.reserve(999)
+    catalog.set_stock(999, 0)
+    assert not catalog.reserve(999)
+
+
+def test_concurrent_buyers_never_oversell(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shop.db'}", connect_args={"check_same_thread": False}, poolclass=NullPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([User(username=f"b{i}", email=f"b{i}@x", coins=100) for i in range(30)])
+    db.add(User(username="poor", email="poor@x", coins=10))
+    relic = Item(name="Relic", item_type="armor", category="armor", rarity="Relic", price=60, stock=2)
+    db.add(relic)
+    db.commit()
+    monkeypatch.setattr(shop, "shop_catalog", ShopCatalog(session_factory=Session, ttl=3600))
+
+    def buy(username):
+        session = Session()
+        try:
+            user = session.query(User).filter(User.username == username).one()
+            shop.buy_item(relic.id, session, user)
+            return 200
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            session.close()
+
+    assert buy("poor") == 400
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        codes = list(pool.map(buy, [f"b{i}" for i in range(30)]))
+    db.expire_all()
+    assert codes.count(200) == 2 and codes.count(404) == 28
+    assert db.query(Item).filter(Item.name == "Relic", Item.owner_id != None).count() == 2
+    assert db.get(Item, relic.id).stock == 0
+    assert sorted(u.coins for u in db.query(User).filter(User.coins < 100)) == [10, 40, 40]
@@ -0,0 +1,83 @@
+from app.api import shop
+from app.api.shop import BulkOrder
+from app.models.item import Item
+from app.models.user import User
+from app.services.shop_catalog import ShopCatalog
+
+
+def make_shop(monkeypatch, db, session_factory, coins=100):
+    user = User(username="buyer", email="buyer@x", coins=coins)
+    potion = Item(name="Potion", item_type="potion", category="utility", price=10, stock=20, effect={"heal": 20})
+    relic = Item(name="Relic", item_type="armor", category="armor", rarity="Relic", price=500, stock=1)
+    db.add_all([user, potion, relic])
+    db.commit()
+    monkeypatch.setattr(shop, "shop_catalog", ShopCatalog(session_factory=session_factory, ttl=3600))
+    return user, potion, relic
+
+
+def test_bulk_buy_settles_lines_in_one_transaction(monkeypatch, db, session_factory):
+    user, potion, relic = make_shop(monkeypatch, db, session_factory)
+    order = BulkOrder(lines=[
+        {"item_id": potion.id, "quantity": 4},
+        {"item_id": relic.id},                    # over budget
+        {"item_id": 999},                         # no such listing
+        {"item_id": potion.id, "quantity": 30},   # more than the stock
+        {"item_id": potion.id, "quantity": 5},
+    ])
+    result = shop.buy_items(order, db, user)
+    assert [line["ok"] for line in result["lines"]] == [True, False, False, False, True]
+    assert result["lines"][1]["detail"] == "Insufficient coins"
+    assert result["status"] == "partial" and result["spent"] == 90 and result["new_balance"] == 10
+    # Potions stack: both lines land on one row
+    assert result["lines"][0]["item_ids"] == result["lines"][4]["item_ids"]
+    db.expire_all()
+    assert db.get(Item, potion.id).stock == 11 and db.get(Item, relic.id).stock == 1
+    assert [(i.name, i.quantity) for i in db.query(Item).filter(Item.owner_id == user.id)] == [("Potion", 9)]
+    assert shop.shop_catalog.listings[potion.id]["stock"] == 11
+
+
+def test_bulk_sell_skips_unsellable_lines(monkeypatch, db, session_factory):
+    user, _, _ = make_shop(monkeypatch, db, session_factory, coins=0)
+    potions = [Item(name="Potion", item_type="potion", price=10, owner_id=user.id, quantity=n) for n in (1, 3)]
+    sword = Item(name="Sword", item_type="weapon", price=80, owner_id=user.id, is_equipped=True)
+    db.add_all(potions + [sword])
+    db.commit()
+
+    result = shop.sell_items(BulkOrder(lines=[
+        {"item_id": potions[0].id},
+        {"item_id": sword.id},
+        {"item_id": potions[0].id},
+        {"item_id": potions[1].id, "quantity": 2},
+        {"item_id": 999},
+    ]), db, user)
+    assert [line["ok"] for line in result["lines"]] == [True, False, False, True, False]
+    assert result["lines"][1]["detail"] == "Cannot sell equipped items"
+    assert result["lines"][2]["detail"] == "Only 0 left to sell"
+    assert result["earned"] == 15 and result["new_balance"] == 15
+    db.expire_all()
+    assert [(i.name, i.quantity) for i in db.query(Item).filter(Item.owner_id == user.id)] == [("Potion", 1), ("Sword", 1)]
+
+
+def test_bulk_buy_of_a_listing_sold_elsewhere_updates_the_snapshot(monkeypatch, db, session_factory):
+    user, potion, relic = make_shop(monkeypatch, db, session_factory, coins=1000)
+    shop.shop_catalog.refresh()
+    # Sold by another process since the snapshot was built
+    db.query(Item).filter(Item.id == relic.id).update({"stock": 0})
+    db.query(Item).filter(Item.id == potion.id).update({"stock": 2})
+    db.commit()
+    result = shop.buy_items(BulkOrder(lines=[{"item_id": relic.id}, {"item_id": potion.id, "quantity": 5}]), db, user)
+    assert result["status"] == "failed"
+    assert relic.id not in shop.shop_catalog.listings and not shop.shop_catalog.reserve(relic.id)
+    # Short of the line's quantity, not sold out: the snapshot gets the real stock
+    assert shop.shop_catalog.listings[potion.id]["stock"] == 2
+
+
+def test_bulk_sell_refuses_items_in_a_trade_offer(monkeypatch, db, session_factory):
+    user, _, _ = make_shop(monkeypatch, db, session_factory, coins=0)
+    offered = Item(name="Potion", item_type="potion", price=10, owner_id=user.id, quantity=2, trade_offer_id=1)
+    db.add(offered)
+    db.commit()
+    result = shop.sell_items(BulkOrder(lines=[{"item_id": offered.id}]), db, user)
+    assert result["lines"][0]["ok"] is False and result["new_balance"] == 0
+    db.expire_all()
+    assert db.get(Item, offered.id).quantity == 2
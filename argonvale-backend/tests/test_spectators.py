@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from pspf.events.combat import CombatAction, CombatEnded, CombatStarted, TurnProcessed
+from pspf.processors.combat import CombatProcessor
+from app.websocket.outbound import OutboundEvent
+from app.websocket.router import SpectatorChannels
+
+
+class FakeSocket:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+
+    async def send_text(self, data):
+        if self.fail:
+            raise RuntimeError("closed")
+        self.sent.append(data)
+
+
+def pvp_turn():
+    processor = CombatProcessor()
+    processor.process(None, CombatStarted.create(combat_id="duel", attacker_id=1, attacker_companion_id=1, defender_id=2,
+                                                 defender_companion_id=2, mode="pvp", context={"player_hp": 80, "enemy_hp": 60}))
+    processor.process(None, CombatAction.create(combat_id="duel", actor_id=1, action_type="attack"))
+    evt = processor.process(None, CombatAction.create(combat_id="duel", actor_id=2, action_type="attack"))[0]
+    assert isinstance(evt, TurnProcessed)
+    return OutboundEvent(evt)
+
+
+def test_fan_out_encodes_once_per_group():
+    channels = SpectatorChannels()
+    attacker_side = [FakeSocket() for _ in range(2000)]
+    defender_side = [FakeSocket() for _ in range(50)]
+    for ws in attacker_side:
+        channels.subscribe("duel", ws)
+    for ws in defender_side:
+        channels.subscribe("duel", ws, swap=True, log_codes=True)
+    out = pvp_turn()
+    msg = out.msg
+    asyncio.run(channels.publish("duel", out))
+
+    # Every watcher in a group got the very same string
+    assert len({id(ws.sent[0]) for ws in attacker_side}) == 1
+    assert len({id(ws.sent[0]) for ws in defender_side}) == 1
+    seen_by_attacker = json.loads(attacker_side[0].sent[0])[0]
+    seen_by_defender = json.loads(defender_side[0].sent[0])[0]
+    assert "description" in seen_by_attacker and "log" not in seen_by_attacker
+    assert "log" in seen_by_defender and "description" not in seen_by_defender
+    assert (seen_by_defender["attacker_hp"], seen_by_defender["defender_hp"]) == (msg["defender_hp"], msg["attacker_hp"])
+
+
+def test_dead_and_leaving_watchers_are_dropped():
+    channels = SpectatorChannels()
+    alive, dead, leaving = FakeSocket(), FakeSocket(fail=True), FakeSocket()
+    for ws in (alive, dead, leaving):
+        channels.subscribe("duel", ws)
+    channels.unsubscribe(leaving)
+    asyncio.run(channels.publish("duel", pvp_turn()))
+    assert channels.watchers("duel") == 1 and leaving.sent == []
+
+    ended = CombatEnded.create(combat_id="duel", winner_id=1, attacker_id=1, attacker_companion_id=1, defender_id=2, defender_companion_id=2, mode="pvp")
+    asyncio.run(channels.publish("duel", OutboundEvent(ended)))
+    assert len(alive.sent) == 2
+    assert channels.watchers("duel") == 0
@@ -0,0 +1,62 @@
+import json
+
+from app.processors.map_compiler import CompiledMap, load_map
+from app.processors.world_chunks import ChunkedWorld
+from scripts.generate_world import generate
+
+
+def test_infinite_map_matches_source(tmp_path):
+    data = generate(96, seed=4)
+    source = tmp_path / "frontier.tmj"
+    source.write_text(json.dumps(data))
+    world = load_map(str(source), str(tmp_path / "cache"))
+    assert isinstance(world, ChunkedWorld) and (world.width, world.height) == (96, 96)
+
+    expected = set()
+    for chunk in data["layers"][1]["chunks"]:
+        for i, gid in enumerate(chunk["data"]):
+            if gid:
+                expected.add((chunk["x"] + i % 16, chunk["y"] + i // 16))
+    assert {(x, y) for y in range(96) for x in range(96) if not world.is_walkable(x, y)} == expected
+    assert not world.is_walkable(96, 0) and not world.is_walkable(0, -1)
+    assert world.warp_at(0, 0) == ("town", 0, 0) and world.warp_at(1, 0) is None
+    # Reloading uses the compiled chunks
+    assert load_map(str(source), str(tmp_path / "cache")).path == world.path
+
+
+def test_large_finite_map_is_chunked(tmp_path):
+    size = 300
+    walls = [0] * (size * size)
+    walls[299 * size + 299] = 3
+    source = tmp_path / "plains.json"
+    source.write_text(json.dumps({"width": size, "height": size, "tilewidth": 16, "tileheight": 16, "layers": [
+        {"type": "tilelayer", "name": "Ground", "data": [1] * (size * size)},
+        {"type": "tilelayer", "name": "Collision", "data": walls},
+    ]}))
+    world = load_map(str(source), str(tmp_path))
+    assert isinstance(world, ChunkedWorld)
+    assert world.blocked_count() == 1 and world.is_blocked(299, 299)
+
+    small = tmp_path / "hut.json"
+    small.write_text(json.dumps({"width": 4, "height": 4, "tilewidth": 16, "tileheight": 16, "layers": []}))
+    assert isinstance(load_map(str(small), str(tmp_path)), CompiledMap)
+
+
+def test_chunk_cache_bounded_and_frames_shared(tmp_path):
+    source = tmp_path / "frontier.tmj"
+    source.write_text(json.dumps(generate(512, seed=2)))
+    load_map(str(source), str(tmp_path / "cache"))
+    world = ChunkedWorld(next((tmp_path / "cache").iterdir()).as_posix(), cache_size=4)
+    for i in range(512):
+        world.is_walkable(i, i)
+    assert len(world.bits) == 4 and (7, 7) in world.bits
+
+    frame = world.chunk_frame("frontier", 1, 2)
+    assert world.chunk_frame("frontier", 1, 2) is frame
+    msg = json.loads(frame)
+    assert (msg["type"], msg["cx"], msg["cy"], msg["size"]) == ("MapChunk", 1, 2, 64)
+    assert msg["layers"]["Ground"] == [1] * 64 * 64 and "Collision" not in msg["layers"]
+
+    assert world.chunks_around(0, 0) == {(0, 0), (1, 0), (0, 1), (1, 1)}
+    assert len(world.chunks_around(200, 200)) == 9
+    assert world.chunks_around(511, 511, radius=2) == {(i, j) for i in (5, 6, 7) for j in (5, 6, 7)}
@@ -0,0 +1,93 @@
+import asyncio
+
+from pspf.events.movement import LootFound
+from app.processors.zone_shards import LocalZoneWorker, ProcessZoneWorker, ZoneShardMap
+
+
+def rolls(events):
+    return [(type(e).__name__, getattr(e, "coins_found", None)) for e in events]
+
+
+def walk(shards, zone, player_id, steps):
+    async def run():
+        return [await shards.move(zone, "wilderness", player_id, 5 + i % 2, 5) for i in range(steps)]
+    return asyncio.run(run())
+
+
+def test_zones_spread_over_workers_and_keep_state_on_rebalance():
+    shards = ZoneShardMap([LocalZoneWorker(seed=7), LocalZoneWorker(seed=7)])
+    walk(shards, "wilderness#1", 1, 30)
+    walk(shards, "wilderness#2", 2, 5)
+    assert {shards.owner("wilderness#1"), shards.owner("wilderness#2")} == {0, 1}
+    # Only the owner keeps a zone's state
+    hot = shards.owner("wilderness#1")
+    assert "wilderness#1" in shards.workers[hot].worker.zones
+    assert "wilderness#1" not in shards.workers[1 - hot].worker.zones
+
+    reference = ZoneShardMap([LocalZoneWorker(seed=7)])
+    expected = walk(reference, "wilderness#1", 1, 60)
+
+    asyncio.run(shards.rebalance("wilderness#1", 1 - hot))
+    assert shards.owner("wilderness#1") == 1 - hot
+    assert set(shards.workers[1 - hot].worker.zones["wilderness#1"].rngs) == {1}
+    # The encounter streams moved with the zone: rolls continue where they left off
+    after = walk(shards, "wilderness#1", 1, 30)
+    assert [rolls(e) for e in after] == [rolls(e) for e in expected[30:]]
+    assert any(isinstance(e, LootFound) for events in expected for e in events)
+
+
+def test_rebalance_hottest_moves_busiest_zone():
+    shards = ZoneShardMap([LocalZoneWorker(seed=1), LocalZoneWorker(seed=1)])
+    walk(shards, "wilderness#1", 1, 40)
+    walk(shards, "wilderness#2", 2, 30)
+    walk(shards, "wilderness#3", 3, 2)
+    # #3 landed on #2's worker: 32 vs 40 moves, moving either zone wouldn't even it out
+    assert asyncio.run(shards.rebalance_hottest()) is None
+    shards.reset_load()
+    walk(shards, "wilderness#2", 2, 30)
+    walk(shards, "wilderness#3", 3, 20)
+    moved = asyncio.run(shards.rebalance_hottest())
+    assert moved == {"zone": "wilderness#2", "from": shards.owner("wilderness#3"), "to": shards.owner("wilderness#1")}
+
+
+def test_process_worker_matches_local_worker():
+    local = ZoneShardMap([LocalZoneWorker(seed=3)])
+    remote = ZoneShardMap([ProcessZoneWorker(seed=3)])
+    try:
+        assert [rolls(e) for e in walk(remote, "wilderness#1", 4, 40)] == [rolls(e) for e in walk(local, "wilderness#1", 4, 40)]
+        # Illegal moves are rejected by the owner
+        assert asyncio.run(remote.move("town#1", "town", 4, -1, 0)) is None
+    finally:
+        remote.close()
+
+
+def test_load_decays_and_empty_zones_are_dropped():
+    shards = ZoneShardMap([LocalZoneWorker(seed=5), LocalZoneWorker(seed=5)])
+    first = walk(shards, "wilderness#1", 1, 20)
+    walk(shards, "wilderness#1", 2, 3)
+    shards.decay_load()
+    assert shards.moves == {"wilderness#1": 11}
+    shards.decay_load(factor=0.05)
+    assert shards.moves == {}
+
+    asyncio.run(shards.leave("wilderness#1", 1))
+    assert "wilderness#1" in shards.owners
+    asyncio.run(shards.leave("wilderness#1", 2))
+    assert not (shards.owners or shards.epochs or shards.players)
+    assert not any(w.worker.zones for w in shards.workers)
+    # A new incarnation of the zone: the same player's rolls don't replay
+    again = walk(shards, "wilderness#1", 1, 20)
+    assert [rolls(e) for e in again] != [rolls(e) for e in first]
+
+
+def test_dead_worker_process_is_replaced():
+    shards = ZoneShardMap([ProcessZoneWorker(seed=3, timeout=30)])
+    try:
+        dead = shards.workers[0]
+        walk(shards, "wilderness#1", 4, 2)
+        dead.process.kill()
+        dead.process.join()
+        assert len(walk(shards, "wilderness#1", 4, 3)) == 3
+        assert shards.workers[0] is not dead
+    finally:
+        shards.close()
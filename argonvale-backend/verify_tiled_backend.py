@@ -23,7 +23,7 @@ def test_tiled_loading():
     
     # Check dimensions
     town = processor.maps_data["town"]
-    print(f"Town Dimensions: {town['width']}x{town['height']}")
+    print(f"Town Dimensions: {town.width}x{town.height}")
     
     # Check Collision Logic
     # In town.json (converted), we know there are collision tiles.
@@ -41,18 +41,18 @@ def test_tiled_loading():
         
     # Test valid move (assuming 0,0 is not solid, though in town it might be wall? Let's assume middle is safe)
     # Town center is usually safe.
-    safe_x = town['width'] // 2
-    safe_y = town['height'] // 2
+    safe_x = town.width // 2
+    safe_y = town.height // 2
     if processor.is_valid_move("town", safe_x, safe_y):
         print(f"SUCCESS: Center move ({safe_x}, {safe_y}) is valid.")
     else:
         print(f"WARNING: Center move ({safe_x}, {safe_y}) is invalid (Could be solid?).")
 
     # Check collision layer parsing
-    if not town["collision_mask"]:
+    if not town.blocked_count():
          print("WARNING: No collision tiles found in town map.")
     else:
-         print(f"SUCCESS: Found {len(town['collision_mask'])} collision tiles.")
+         print(f"SUCCESS: Found {town.blocked_count()} collision tiles.")
 
 if __name__ == "__main__":
     test_tiled_loading()
@@ -11,6 +11,7 @@ export interface Item {
     weapon_stats: any;
     effect?: any;
     is_equipped: boolean;
+    quantity: number; // units in this stack (1 for gear)
 }
 
 export const equipmentApi = {
@@ -16,17 +16,86 @@ export interface ShopItem {
     stock: number;
 }
 
+export interface StockChanges {
+    generation: number;
+    reset?: boolean;
+    stock?: [number, number][];
+    listings?: ShopItem[];
+}
+
+export interface OrderLine {
+    item_id: number;
+    quantity?: number;
+}
+
+export interface OrderLineResult {
+    item_id: number;
+    quantity: number;
+    ok: boolean;
+    detail: string;
+    coins: number;
+    item_ids?: number[];
+}
+
+export interface OrderResult {
+    status: 'success' | 'partial' | 'failed';
+    lines: OrderLineResult[];
+    spent?: number;
+    earned?: number;
+    new_balance: number;
+}
+
+// Last catalog we got, revalidated with its ETag (the server's catalog generation)
+let cached: { etag: string; items: ShopItem[] } | null = null;
+
+const authHeaders = () => ({ Authorization: `Bearer ${localStorage.getItem('token')}` });
+
 export const shopApi = {
     getItems: async () => {
         const response = await axios.get(`${API_URL}/api/shop/items`, {
-            headers: { Authorization: `Bearer ${localStorage.getItem('token')}` }
+            headers: { ...authHeaders(), ...(cached ? { 'If-None-Match': cached.etag } : {}) },
+            validateStatus: status => status === 200 || status === 304
         });
+        if (response.status === 304 && cached) return cached.items;
+        const etag = response.headers['etag'];
+        cached = etag ? { etag, items: response.data } : null;
         return response.data as ShopItem[];
     },
+    generation: () => (cached ? Number(cached.etag.replace(/"/g, '')) : null),
+    // Changes since the catalog we hold; null when there are none
+    getStockChanges: async (since: number) => {
+        const response = await axios.get(`${API_URL}/api/shop/stock`, {
+            params: { since },
+            headers: authHeaders(),
+            validateStatus: status => status === 200 || status === 304
+        });
+        return response.status === 304 ? null : (response.data as StockChanges);
+    },
+    applyStockChanges: (items: ShopItem[], changes: StockChanges) => {
+        const byId = new Map(items.map(i => [i.id, i]));
+        for (const [id, stock] of changes.stock || []) {
+            const item = byId.get(id);
+            if (stock <= 0) byId.delete(id);
+            else if (item) byId.set(id, { ...item, stock });
+        }
+        for (const listing of changes.listings || []) byId.set(listing.id, listing);
+        const updated = [...byId.values()].sort((a, b) => a.id - b.id);
+        cached = { etag: `"${changes.generation}"`, items: updated };
+        return updated;
+    },
     buyItem: async (itemId: number) => {
         const response = await axios.post(`${API_URL}/api/shop/buy/${itemId}`, {}, {
-            headers: { Authorization: `Bearer ${localStorage.getItem('token')}` }
+            headers: authHeaders()
         });
         return response.data;
+    },
+    // Several lines in one request and one transaction; results come back per line
+    buyItems: async (lines: OrderLine[]) => {
+        const response = await axios.post(`${API_URL}/api/shop/buy`, { lines }, { headers: authHeaders() });
+        return response.data as OrderResult;
+    },
+    sellItems: async (lines: OrderLine[]) => {
+        const response = await axios.post(`${API_URL}/api/shop/sell`, { lines }, { headers: authHeaders() });
+        return response.data as OrderResult;
     }
 };
@@ -57,6 +57,8 @@ const ExplorationView: React.FC = () => {
         }
     }, [loading, profile]);
     const [mapData, setMapData] = useState<TilemapData | null>(null);
+    // Bumped by the server (MapReloaded) when the current map was edited
+    const [mapVersion, setMapVersion] = useState(0);
     const [tilesetImage, setTilesetImage] = useState<HTMLImageElement | null>(null);
     const [playerPos, setPlayerPos] = useState({ x: profile?.last_x ?? 8, y: profile?.last_y ?? 8 });
     const [isMobile, setIsMobile] = useState(window.innerWidth < 768);
@@ -118,21 +120,24 @@ const ExplorationView: React.FC = () => {
 
 
 
-    // Initial Load & Zone Change
+    // Clear other players when changing zones
+    useEffect(() => {
+        setOtherPlayers({});
+    }, [currentZoneId]);
+
+    // Initial Load, Zone Change & Map Reload
     useEffect(() => {
         const loadMap = async () => {
             try {
-                // Clear other players when changing zones
-                setOtherPlayers({});
-
                 // Load Map JSON (Try .tmj first, then .json)
                 console.log(`Attempting to load map: ${currentZoneId}`);
-                let res = await fetch(`/maps/${currentZoneId}.tmj`);
+                const query = mapVersion ? `?v=${mapVersion}` : '';
+                let res = await fetch(`/maps/${currentZoneId}.tmj${query}`);
                 console.log(`Fetch .tmj status: ${res.status}`);
 
                 if (!res.ok) {
                     console.log(`Falling back to .json for ${currentZoneId}`);
-                    res = await fetch(`/maps/${currentZoneId}.json`);
+                    res = await fetch(`/maps/${currentZoneId}.json${query}`);
                     console.log(`Fetch .json status: ${res.status}`);
                     if (!res.ok) throw new Error(`Map not found: ${currentZoneId}`);
                 }
@@ -184,7 +189,7 @@ const ExplorationView: React.FC = () => {
             }
         };
         loadMap();
-    }, [currentZoneId]);
+    }, [currentZoneId, mapVersion]);
 
     // Listen for Messages
     const [initialMsgCount, setInitialMsgCount] = useState(() => messages.length);
@@ -216,8 +221,25 @@ const ExplorationView: React.FC = () => {
                 }));
             }
 
+            // Who was already in the zone when we joined (rows follow msg.fields)
+            if (msg.type === 'ZoneSnapshot' && msg.zone_id === currentZoneIdRef.current) {
+                const players: Record<number, { x: number, y: number, username: string }> = {};
+                msg.players.forEach((row: any[]) => {
+                    const p = Object.fromEntries(msg.fields.map((f: string, i: number) => [f, row[i]]));
+                    if (p.player_id != profile?.id) {
+                        players[p.player_id] = { x: p.x, y: p.y, username: p.username };
+                    }
+                });
+                setOtherPlayers(players);
+            }
+
+            // The server swapped in an edited version of this map
+            if (msg.type === 'MapReloaded' && msg.zone_id === currentZoneIdRef.current) {
+                setMapVersion(msg.version);
+            }
+
             // 3. Disconnections
-            if (msg.type === 'PlayerDisconnected') {
+            if (msg.type === 'PlayerDisconnected' || msg.type === 'PlayerLeft') {
                 setOtherPlayers(prev => {
                     const next = { ...prev };
                     delete next[msg.player_id];
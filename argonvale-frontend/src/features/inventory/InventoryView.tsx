@@ -195,7 +195,10 @@ const InventoryView: React.FC = () => {
                                 </div>
 
                                 <div className="flex-1">
-                                    <h3 className="font-medieval text-white text-base leading-tight mb-1">{item.name}</h3>
+                                    <h3 className="font-medieval text-white text-base leading-tight mb-1">
+                                        {item.name}
+                                        {item.quantity > 1 && <span className="ml-2 text-xs font-sans font-bold text-gold">×{item.quantity}</span>}
+                                    </h3>
                                     <div className="flex items-center gap-2 mb-2">
                                         <span className="text-[9px] uppercase font-bold tracking-widest text-primary/70">{item.item_type}</span>
                                         {item.category !== 'misc' && (
@@ -24,8 +24,24 @@ const ShopView: React.FC = () => {
         }
     };
 
+    // Catch up with purchases and restocks through the stock feed instead of refetching everything
+    const refreshStock = async () => {
+        const since = shopApi.generation();
+        if (since === null) return fetchItems();
+        try {
+            const changes = await shopApi.getStockChanges(since);
+            if (!changes) return;
+            if (changes.reset) return fetchItems();
+            setItems(current => shopApi.applyStockChanges(current, changes));
+        } catch (err) {
+            console.error('Failed to refresh shop stock:', err);
+        }
+    };
+
     useEffect(() => {
         fetchItems();
+        const timer = setInterval(refreshStock, 30000);
+        return () => clearInterval(timer);
     }, []);
 
     const handleBuy = async (item: ShopItem) => {
@@ -36,7 +52,7 @@ const ShopView: React.FC = () => {
             await shopApi.buyItem(item.id);
             await Promise.all([
                 refreshProfile(),
-                fetchItems()
+                refreshStock()
             ]);
             alert(`Successfully purchased ${item.name}!`);
         } catch (err: any) {